@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        if getattr(settings, "LLM_WARM_UP", False):
+            from . import llm
+            llm.warm_up(background=True)
@@ -0,0 +1,293 @@
+"""
+Typeahead suggestions for recipe titles and ingredients.
+
+Every visible recipe title and every ingredient in the frontend's vocabulary
+(``Frontend/public/data/ingredients.json``) is indexed under each of its
+word suffixes ("chicken biryani", "biryani") in one sorted list, so a prefix
+lookup is two ``bisect`` calls plus a short slice instead of an ``icontains``
+scan.  Suggestions are ranked by popularity: views and favorites for recipes,
+the number of recipes using them for ingredients.
+
+The index is built lazily per process, kept current in-process by the Meal
+signals in ``api/signals.py``, picks up meals created by other workers every
+``AUTOCOMPLETE_REFRESH_SECONDS`` and is rebuilt (refreshing popularity) every
+``AUTOCOMPLETE_REBUILD_SECONDS``.  Rebuilds run outside the index lock and are
+swapped in whole, so other requests keep answering from the old index.
+Visibility changes made by other workers aren't swept, so recipe suggestions
+are re-checked against the database before they are returned.
+"""
+import heapq
+import json
+import threading
+import time
+from bisect import bisect_left, insort
+from functools import lru_cache
+
+from django.conf import settings
+from django.db.models import Count
+
+from core.models import Favorite, Meal, MealIngredient, RecipeView
+from .ingredients import canonical_name
+from .similarity import candidate_filter
+from .trigram_search import normalize_title
+
+
+# Results kept per cached prefix; requests may ask for fewer
+MAX_SUGGESTIONS = 20
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _is_visible(meal):
+    return meal.user_id is None or meal.is_public
+
+
+def _suffixes(text):
+    words = text.split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+def load_ingredient_names(path=None):
+    path = path or _setting(
+        "AUTOCOMPLETE_INGREDIENTS_PATH",
+        settings.BASE_DIR.parent / "Frontend" / "public" / "data" / "ingredients.json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            return [name for name in json.load(f) if isinstance(name, str)]
+    except (OSError, ValueError) as e:
+        print(f"Autocomplete: ingredient vocabulary not loaded: {e}")
+        return []
+
+
+class AutocompleteIndex:
+    # Attributes replaced wholesale when a rebuilt index is swapped in
+    STATE = ("keys", "suggestions", "by_text", "meal_suggestion", "swept_id")
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
+        # meal id -> (mealid, title) or None, for signals seen while rebuilding
+        self._changed = None
+        self._built_at = None
+        self._refreshed_at = 0.0
+        self._generation = 0
+        self._reset()
+
+    def _reset(self):
+        self._generation += 1
+        self.keys = []          # sorted "suffix\x00<suggestion id>" strings
+        self.suggestions = []   # suggestion id -> dict
+        self.by_text = {}       # (type, normalized text) -> suggestion id
+        self.meal_suggestion = {}
+        # Highest Meal id seen by a DB sweep.  Signal updates don't move it:
+        # other processes may have committed lower ids not loaded here yet
+        self.swept_id = 0
+        # While building, keys are appended and sorted once at the end
+        self._batch = False
+
+    # -- maintenance -----------------------------------------------------
+
+    def _suggest(self, kind, text, weight, mealid=None):
+        norm = normalize_title(text)
+        if not norm:
+            return None
+        sid = self.by_text.get((kind, norm))
+        if sid is None:
+            sid = len(self.suggestions)
+            self.suggestions.append({"text": text, "type": kind, "mealid": mealid,
+                                     "weight": weight, "norm": norm, "meals": {}})
+            self.by_text[(kind, norm)] = sid
+            if self._batch:
+                self.keys.extend(f"{suffix}\x00{sid}" for suffix in _suffixes(norm))
+            else:
+                for suffix in _suffixes(norm):
+                    insort(self.keys, f"{suffix}\x00{sid}")
+            self._generation += 1
+        else:
+            entry = self.suggestions[sid]
+            if weight > entry["weight"]:
+                # The most popular meal with this title is the one linked
+                entry.update(text=text, weight=weight, mealid=mealid or entry["mealid"])
+                self._generation += 1
+        return sid
+
+    def _drop(self, sid):
+        entry = self.suggestions[sid]
+        for suffix in _suffixes(entry["norm"]):
+            key = f"{suffix}\x00{sid}"
+            pos = bisect_left(self.keys, key)
+            if pos < len(self.keys) and self.keys[pos] == key:
+                del self.keys[pos]
+        del self.by_text[(entry["type"], entry["norm"])]
+        self._generation += 1
+
+    def _put_meal(self, meal_id, mealid, title, weight=1.0):
+        sid = self._suggest("recipe", title, weight, mealid)
+        if sid is not None:
+            self.suggestions[sid]["meals"][meal_id] = mealid
+            self.meal_suggestion[meal_id] = sid
+
+    def _remove_meal(self, meal_id):
+        sid = self.meal_suggestion.pop(meal_id, None)
+        if sid is None:
+            return
+        entry = self.suggestions[sid]
+        mealid = entry["meals"].pop(meal_id, None)
+        if not entry["meals"]:
+            self._drop(sid)
+        elif entry["mealid"] == mealid:
+            entry["mealid"] = next(iter(entry["meals"].values()))
+
+    def _meal_popularity(self):
+        weight = _setting("RECOMMENDATION_FAVORITE_WEIGHT", 3.0)
+        popularity = {}
+        for meal_id, n in (RecipeView.objects.values("meal_id")
+                           .annotate(n=Count("id")).values_list("meal_id", "n")):
+            popularity[meal_id] = popularity.get(meal_id, 0) + n
+        for meal_id, n in (Favorite.objects.values("meal_id")
+                           .annotate(n=Count("id")).values_list("meal_id", "n")):
+            popularity[meal_id] = popularity.get(meal_id, 0) + n * weight
+        return popularity
+
+    def _sweep(self, popularity=None):
+        """Load meals with ids above ``swept_id``."""
+        # Private meals are skipped but must not be re-scanned on every sweep
+        last_id = Meal.objects.order_by("-id").values_list("id", flat=True).first() or 0
+        if last_id <= self.swept_id:
+            return
+        rows = (Meal.objects.filter(candidate_filter(), id__gt=self.swept_id, id__lte=last_id)
+                .order_by("id").values_list("id", "mealid", "title"))
+        for meal_id, mealid, title in rows.iterator(chunk_size=2000):
+            self._put_meal(meal_id, mealid, title,
+                           1.0 + (popularity or {}).get(meal_id, 0))
+        self.swept_id = last_id
+
+    def _build(self):
+        self._reset()
+        self._batch = True
+        try:
+            self._sweep(self._meal_popularity())
+            usage = dict(MealIngredient.objects.values("name").annotate(
+                n=Count("meal_id", distinct=True)).values_list("name", "n"))
+            for name in load_ingredient_names():
+                self._suggest("ingredient", name, 1.0 + usage.get(canonical_name(name), 0))
+        finally:
+            self._batch = False
+            self.keys.sort()
+
+    def _stale(self, now):
+        return (self._built_at is None or
+                now - self._built_at >= _setting("AUTOCOMPLETE_REBUILD_SECONDS", 3600))
+
+    def _rebuild(self):
+        # One builder at a time; the others keep serving the current index,
+        # except before the first build, when there is nothing to serve
+        if not self._build_lock.acquire(blocking=self._built_at is None):
+            return
+        try:
+            with self._lock:
+                if not self._stale(time.monotonic()):
+                    return
+                self._changed = {}
+            fresh = AutocompleteIndex()
+            fresh._build()
+            with self._lock:
+                for name in self.STATE:
+                    setattr(self, name, getattr(fresh, name))
+                self._generation += 1
+                # Replay signal updates the fresh index may have missed
+                changed, self._changed = self._changed, None
+                for meal_id, meal in changed.items():
+                    self._remove_meal(meal_id)
+                    if meal is not None:
+                        self._put_meal(meal_id, *meal)
+                self._built_at = self._refreshed_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._changed = None
+            self._build_lock.release()
+
+    def ensure_fresh(self):
+        now = time.monotonic()
+        with self._lock:
+            stale = self._stale(now)
+            if not stale and now - self._refreshed_at >= _setting(
+                    "AUTOCOMPLETE_REFRESH_SECONDS", 30):
+                self._sweep()
+                self._refreshed_at = now
+        if stale:
+            self._rebuild()
+
+    def update(self, meal):
+        """Re-index one meal (called from the Meal post_save signal)."""
+        with self._lock:
+            if self._changed is not None:
+                self._changed[meal.id] = (meal.mealid, meal.title) if _is_visible(meal) else None
+            if self._built_at is None:
+                return
+            self._remove_meal(meal.id)
+            if _is_visible(meal):
+                self._put_meal(meal.id, meal.mealid, meal.title)
+
+    def remove(self, meal_id):
+        with self._lock:
+            if self._changed is not None:
+                self._changed[meal_id] = None
+            if self._built_at is not None:
+                self._remove_meal(meal_id)
+
+    # -- querying --------------------------------------------------------
+
+    @lru_cache(maxsize=4096)
+    def _top(self, prefix, kind, generation):
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + "\uffff", lo)
+        sids = set()
+        for key in self.keys[lo:hi]:
+            sid = int(key.rsplit("\x00", 1)[1])
+            if kind is None or self.suggestions[sid]["type"] == kind:
+                sids.add(sid)
+        # Most popular first; a match at the start of the name beats a later word
+        return tuple(heapq.nsmallest(
+            MAX_SUGGESTIONS, sids,
+            key=lambda sid: (not self.suggestions[sid]["norm"].startswith(prefix),
+                             -self.suggestions[sid]["weight"],
+                             self.suggestions[sid]["norm"])))
+
+    def suggest(self, query, limit=8, kind=None):
+        """Return ``[{"text", "type", "mealid"}, ...]`` for a typed prefix."""
+        prefix = normalize_title(query)
+        if not prefix:
+            return []
+        self.ensure_fresh()
+        with self._lock:
+            entries = [dict(self.suggestions[sid], meals=dict(self.suggestions[sid]["meals"]))
+                       for sid in self._top(prefix, kind, self._generation)]
+
+        # Another worker may have made a recipe private since it was indexed
+        meal_ids = [meal_id for entry in entries for meal_id in entry["meals"]]
+        visible = set(Meal.objects.filter(candidate_filter(), id__in=meal_ids)
+                      .values_list("id", flat=True)) if meal_ids else set()
+        hidden = set(meal_ids) - visible
+        if hidden:
+            with self._lock:
+                for meal_id in hidden:
+                    self._remove_meal(meal_id)
+
+        results = []
+        for entry in entries:
+            item = {"text": entry["text"], "type": entry["type"]}
+            if entry["type"] == "recipe":
+                live = [mealid for meal_id, mealid in entry["meals"].items() if meal_id in visible]
+                if not live:
+                    continue
+                item["mealid"] = entry["mealid"] if entry["mealid"] in live else live[0]
+            results.append(item)
+            if len(results) == limit:
+                break
+        return results
+
+
+index = AutocompleteIndex()
@@ -0,0 +1,560 @@
+"""
+Reproducible HTTP benchmark for every route in ``api/urls.py`` and
+``core/urls.py`` (used by ``manage.py run_benchmark``).
+
+The run is fully offline:
+
+* the app talks to its own SQLite file under ``var/benchmark``, seeded once
+  from a fixed random seed (see ``api.synthetic``);
+* the LLM backend is ``llm.FakeBackend`` and Spoonacular an in-process stub,
+  both sleeping for a configurable latency (optionally with a slow tail) and
+  returning canned, well-formed payloads;
+* the Django WSGI app is served on 127.0.0.1 by a fixed pool of worker
+  threads (like gunicorn's gthread worker), so DB connections are reused the
+  way they are in production.
+
+Each scenario is driven at every requested concurrency level; the report
+holds p50/p95/p99 latency, throughput and SQL queries per request (counted
+server side and returned in ``X-Bench-Queries``), and can be saved as a
+baseline and compared against later runs.
+"""
+import io
+import itertools
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from types import SimpleNamespace
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import requests
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+
+from core.models import Favorite, GroceryList, Meal, Profile, RecipeView, User
+
+
+QUERIES_HEADER = "X-Bench-Queries"
+USER_PREFIX = "bench-user-"
+ADMIN_EMAIL = "bench-admin@example.com"
+
+
+def bench_dir():
+    return str(getattr(settings, "BENCHMARK_DIR", settings.BASE_DIR / "var" / "benchmark"))
+
+
+# -- database -----------------------------------------------------------------
+
+def use_database(path):
+    """Point the default connection at ``path`` (before anything has queried it)."""
+    from .db_router import REPLICA
+
+    connection = connections["default"]
+    connection.close()
+    connection.settings_dict["NAME"] = path
+    settings.DATABASES["default"]["NAME"] = path
+    # Reads must hit the benchmark file too, not a configured replica
+    settings.DATABASES.pop(REPLICA, None)
+
+
+def seed_catalog(meals, users, favorites_per_user, views, seed, stdout=None):
+    """Fill an empty, migrated database with the benchmark catalog."""
+    from . import synthetic
+
+    rng = random.Random(seed)
+    synthetic.bulk_insert(User, synthetic.make_users(rng, users, prefix=USER_PREFIX))
+    User.objects.create_user(email=ADMIN_EMAIL, password=synthetic.BENCH_PASSWORD,
+                             name="Bench Admin", is_staff=True)
+    user_ids = list(User.objects.filter(is_staff=False).values_list("id", flat=True))
+    synthetic.bulk_insert(Profile, synthetic.make_profiles(rng, user_ids))
+    with synthetic.explicit_timestamps(Meal, "created_at"):
+        synthetic.bulk_insert(Meal, synthetic.make_meals(rng, meals, prefix="B", owners=user_ids,
+                                                         owned_fraction=0.05))
+    rows = list(Meal.objects.filter(user__isnull=True).order_by("id")
+                .values_list("id", "mealid"))
+    meal_ids = [meal_id for meal_id, _ in rows]
+    mealids = [mealid for _, mealid in rows]
+    with synthetic.explicit_timestamps(Favorite, "created_at"):
+        synthetic.bulk_insert(Favorite, synthetic.make_favorites(rng, user_ids, meal_ids,
+                                                                 favorites_per_user))
+    with synthetic.explicit_timestamps(RecipeView, "viewed_at"):
+        synthetic.bulk_insert(RecipeView, synthetic.make_views(rng, user_ids, meal_ids, mealids,
+                                                               views))
+    synthetic.refresh_indexes(stdout=stdout)
+
+
+# -- upstream stubs -------------------------------------------------------------
+
+class _Latency:
+    """Sleeps ``base`` seconds +/- ``jitter`` (a fraction), from a seeded RNG."""
+
+    def __init__(self, base, jitter=0.2, seed=0):
+        self.base = base
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sleep(self):
+        if self.base <= 0:
+            return
+        with self._lock:
+            factor = self._rng.uniform(1 - self.jitter, 1 + self.jitter)
+        time.sleep(self.base * factor)
+
+
+STUB_RECIPE = {
+    "idMeal": "BENCH1",
+    "strMeal": "Benchmark Chicken Curry",
+    "strCategory": "Chicken",
+    "strArea": "Indian",
+    "strInstructions": "Fry the onions.\r\nAdd the chicken.\r\nSimmer for 20 minutes.",
+    "strMealThumb": "",
+    "strIngredient1": "Chicken",
+    "strMeasure1": "500 g",
+    "strIngredient2": "Onion",
+    "strMeasure2": "2",
+    "strIngredient3": "Garam Masala",
+    "strMeasure3": "2 tsp",
+}
+
+
+def stub_reply(system_instruction, contents):
+    """What the fake LLM answers: the shape each AI view expects."""
+    if '"meals"' in (system_instruction or ""):
+        return json.dumps({"meals": [STUB_RECIPE]})
+    if isinstance(contents, str) and contents.startswith("Sort and structure"):
+        items = json.loads(contents.split("\n", 1)[1])
+        return json.dumps([{"quantity": "1", "unit": "pcs", "ingredient_name": str(item),
+                            "shop_type": "Supermarket"} for item in items])
+    return "Simmer it gently for twenty minutes and season to taste."
+
+
+class _StubHTTPResponse:
+    def __init__(self, payload, status_code=200):
+        self._payload = payload
+        self.status_code = status_code
+
+    def json(self):
+        return self._payload
+
+
+def _stub_spoonacular_get(latency):
+    def get(url, params=None, **kwargs):
+        latency.sleep()
+        if url.endswith("/findByIngredients"):
+            return _StubHTTPResponse([
+                {"id": 1000 + n, "title": f"Stub recipe {n}", "image": "",
+                 "usedIngredientCount": 2, "missedIngredientCount": n}
+                for n in range(5)])
+        recipe_id = url.rstrip("/").split("/")[-2]
+        return _StubHTTPResponse({"id": int(recipe_id), "title": f"Stub recipe {recipe_id}",
+                                  "readyInMinutes": 30, "servings": 4,
+                                  "extendedIngredients": [], "instructions": ""})
+    return get
+
+
+class _StubImageResponse:
+    status_code = 200
+
+    def __init__(self, data):
+        self._data = data
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self._data), chunk_size):
+            yield self._data[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+def _stub_image_get(latency):
+    """A 1200x800 JPEG per URL, tinted by its hash, like a typical recipe photo."""
+    from PIL import Image
+
+    def get(url, **kwargs):
+        latency.sleep()
+        tint = zlib.crc32(url.encode("utf-8"))
+        image = Image.new("RGB", (1200, 800), (tint & 255, (tint >> 8) & 255, (tint >> 16) & 255))
+        out = io.BytesIO()
+        image.save(out, "JPEG", quality=90)
+        return _StubImageResponse(out.getvalue())
+    return get
+
+
+def install_stubs(llm_latency, spoonacular_latency, seed=0, tail_latency=0.0, tail_rate=0.0):
+    """Route LLM, Spoonacular and recipe image calls to local stubs."""
+    from . import enrichment, image_proxy, llm, views
+
+    llm.set_backend(llm.FakeBackend(latency=llm_latency, jitter=0.2, tail_latency=tail_latency,
+                                    tail_rate=tail_rate, responder=stub_reply, seed=seed))
+    views.requests = enrichment.requests = SimpleNamespace(
+        get=_stub_spoonacular_get(_Latency(spoonacular_latency, seed=seed + 1)),
+        exceptions=requests.exceptions)
+    image_proxy.requests = SimpleNamespace(
+        get=_stub_image_get(_Latency(spoonacular_latency, seed=seed + 2)),
+        exceptions=requests.exceptions)
+
+
+# -- server -------------------------------------------------------------------
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class PooledWSGIServer(WSGIServer):
+    """Hands each connection to a fixed pool of threads."""
+    request_queue_size = 256
+    threads = 8
+
+    def server_activate(self):
+        super().server_activate()
+        self.pool = ThreadPoolExecutor(self.threads, thread_name_prefix="bench-server")
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+def counting_app(app):
+    """Wrap a WSGI app so each response reports how many SQL queries it ran."""
+    def wrapped(environ, start_response):
+        queries = [0]
+
+        def count_query(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        def start(status, headers, exc_info=None):
+            return start_response(status, headers + [(QUERIES_HEADER, str(queries[0]))],
+                                  exc_info)
+
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(count_query))
+            return app(environ, start)
+    return wrapped
+
+
+def start_server(threads=8):
+    """Serve the project on an ephemeral port. Returns ``(server, base_url)``."""
+    server_class = type("BenchServer", (PooledWSGIServer,), {"threads": threads})
+    server = make_server("127.0.0.1", 0, counting_app(get_wsgi_application()),
+                         server_class=server_class, handler_class=_QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+# -- scenarios ------------------------------------------------------------------
+
+class Scenario:
+    """
+    One endpoint under load.  ``path`` and ``body`` may be callables taking
+    ``(ctx, i, item)``; ``prepare(ctx, count)`` may create ``count`` objects
+    the requests consume (``item`` is the i-th of them).
+    """
+
+    def __init__(self, name, method, path, auth="user", body=None, prepare=None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.auth = auth
+        self.body = body
+        self.prepare = prepare
+
+    def build(self, ctx, i, item):
+        path = self.path(ctx, i, item) if callable(self.path) else self.path
+        body = self.body(ctx, i, item) if callable(self.body) else self.body
+        headers = {}
+        if self.auth == "user":
+            headers["Authorization"] = f"Bearer {ctx.user_token(i)}"
+        elif self.auth == "admin":
+            headers["Authorization"] = f"Bearer {ctx.admin_token}"
+        return self.method, path, body, headers
+
+
+class BenchContext:
+    """Ids and tokens the scenarios pick from, drawn from the seeded catalog."""
+
+    def __init__(self, base_url, users=50, seed=0):
+        from rest_framework_simplejwt.tokens import RefreshToken
+        from . import synthetic
+
+        self.base_url = base_url
+        self.rng = random.Random(seed)
+        self.run_id = f"{int(time.time())}{os.getpid()}"
+        self.serial = itertools.count()
+        bench_users = list(User.objects.filter(email__startswith=USER_PREFIX)
+                           .order_by("id")[:users])
+        self.users = bench_users
+        refresh = [RefreshToken.for_user(user) for user in bench_users]
+        self.tokens = [str(token.access_token) for token in refresh]
+        self.refresh_tokens = [str(token) for token in refresh]
+        admin = User.objects.get(email=ADMIN_EMAIL)
+        self.admin_token = str(RefreshToken.for_user(admin).access_token)
+        self.password = synthetic.BENCH_PASSWORD
+
+        # Popular meals come up more often, as in real traffic
+        self.mealids = list(Meal.objects.filter(user__isnull=True).order_by("id")
+                            .values_list("mealid", flat=True)[:5000])
+        self._meal_weights = synthetic.zipf_weights(len(self.mealids))
+        self.ingredients, self.categories, self.areas = synthetic.load_vocabulary()
+        self.title_words = ["chicken", "curry", "spicy", "stew", "pie", "salmon",
+                            "creamy", "soup", "roast", "tacos", "biryni", "lasgna"]
+        self.profile_id = None
+        self.job_id = None
+
+    def user_token(self, i):
+        return self.tokens[i % len(self.tokens)]
+
+    def user(self, i):
+        return self.users[i % len(self.users)]
+
+    def mealid(self, i):
+        return self.rng.choices(self.mealids, cum_weights=self._meal_weights)[0]
+
+    def pick(self, values, i):
+        return values[i % len(values)]
+
+    def setup(self):
+        """Objects some read endpoints need to exist (a job, a stored profile)."""
+        from . import jobs, profiling
+
+        self.job_id = str(jobs.enqueue("grocery_list", {"ingredients": ["1 Onion"]}).id)
+        admin = User.objects.get(email=ADMIN_EMAIL)
+        response = requests.get(f"{self.base_url}/api/homerecipes/",
+                                headers={profiling.HEADER: profiling.issue_token(admin)})
+        self.profile_id = response.headers.get(f"{profiling.HEADER}-Id")
+
+
+def _own_meals(ctx, count, is_public):
+    meals = [Meal(mealid=f"BENCH{ctx.run_id}-{next(ctx.serial)}",
+                  title=f"Bench AI recipe {n}", category=["Chicken"], area="Indian",
+                  instructions="Cook.", ingredients=["1 Onion"], is_user_added=True,
+                  user=ctx.user(n), is_public=is_public)
+             for n in range(count)]
+    return Meal.objects.bulk_create(meals, batch_size=2000)
+
+
+def _grocery_items(ctx, count):
+    items = [GroceryList(user=ctx.user(n), ingredient_name=f"Bench item {next(ctx.serial)}",
+                         quantity=1, unit="pcs")
+             for n in range(count)]
+    return GroceryList.objects.bulk_create(items, batch_size=2000)
+
+
+def _image_urls(ctx, count):
+    """Proxy URLs of the system meals requests ``0..count`` would pick."""
+    from . import image_proxy
+
+    mealids = [ctx.mealid(i) for i in range(count)]
+    meals = {meal.mealid: meal for meal in Meal.objects.filter(
+        mealid__in=set(mealids), user__isnull=True).only('id', 'mealid', 'image')}
+    return [image_proxy.proxy_url(meals[mealid]) for mealid in mealids]
+
+
+def _chat(question):
+    return {"messages": [{"role": "user", "content": question}]}
+
+
+CHAT_QUESTIONS = ["How long should I rest a steak?", "What can I use instead of buttermilk?",
+                  "How do I stop rice sticking?", "Can I freeze cooked pasta?",
+                  "Why did my bread not rise?"]
+
+
+def scenarios():
+    """Every route in api/urls.py and core/urls.py, plus /metrics."""
+    return [
+        # Catalog reads
+        Scenario("home_recipes", "GET", "/api/homerecipes/", auth=None),
+        Scenario("home_feed", "GET", "/api/homerecipes/for-you/"),
+        Scenario("recipe_detail", "GET", lambda c, i, _: f"/api/recipedetail/{c.mealid(i)}/"),
+        Scenario("recipe_image", "GET", lambda c, i, url: url, auth=None, prepare=_image_urls),
+        Scenario("batch_recipe_detail", "GET",
+                 lambda c, i, _: "/api/recipes/batch/?mealids="
+                                 + ",".join(c.mealid(i) for _ in range(20))),
+        Scenario("batch_recipe_detail_compact", "GET",
+                 lambda c, i, _: "/api/recipes/batch/?compact=true&mealids="
+                                 + ",".join(c.mealid(i) for _ in range(20))),
+        Scenario("recipe_bundle", "GET",
+                 lambda c, i, _: f"/api/recipedetail/{c.mealid(i)}/bundle/?include=spoonacular"),
+        Scenario("recipe_nutrition", "GET", lambda c, i, _: f"/api/nutrition/{c.mealid(i)}/"),
+        Scenario("similar_recipes", "GET",
+                 lambda c, i, _: f"/api/similarrecipes/{c.mealid(i)}/", auth=None),
+        Scenario("ingredient_filter", "GET",
+                 lambda c, i, _: "/api/ingredientfilter/"
+                                 f"{c.pick(c.ingredients[20:200], i)},{c.pick(c.ingredients[:20], i)}/",
+                 auth=None),
+        Scenario("pantry_recipes", "GET",
+                 lambda c, i, _: "/api/pantry/?ingredients="
+                                 + ",".join(c.rng.sample(c.ingredients[:150], 6)), auth=None),
+        Scenario("recipe_filter", "GET",
+                 lambda c, i, _: f"/api/recipefilter/{c.pick(c.title_words, i)}/", auth=None),
+        Scenario("autocomplete", "GET",
+                 lambda c, i, _: f"/api/autocomplete/?q={c.pick(c.ingredients, i)[:3]}",
+                 auth=None),
+        Scenario("browse_recipes", "GET",
+                 lambda c, i, _: f"/api/browse/?category={c.pick(c.categories, i)}"
+                                 f"&area={c.pick(c.areas, i // 3)}", auth=None),
+        # AI (stubbed upstream)
+        Scenario("chatbot", "POST", "/api/chatbot/",
+                 body=lambda c, i, _: _chat(c.pick(CHAT_QUESTIONS, i))),
+        Scenario("recipe_ai", "POST", "/api/recipe-ai/",
+                 body=lambda c, i, _: {"prompt": f"A quick dinner with {c.pick(c.ingredients, i)}"}),
+        Scenario("detail_page_ai", "POST", "/api/detail-page-ai/",
+                 body=lambda c, i, _: dict(_chat("How much protein is in this?"),
+                                           mealid=c.mealid(i))),
+        Scenario("grocery_list", "POST", "/api/grocery-list/",
+                 body={"ingredients": ["2 Onions", "1 tsp Cumin", "500 g Chicken"]}),
+        Scenario("job_status", "GET", lambda c, i, _: f"/api/jobs/{c.job_id}/", auth=None),
+        Scenario("chatbot_cache_purge", "DELETE", "/api/chatbot/cache/", auth="admin"),
+        # Spoonacular (stubbed upstream)
+        Scenario("spoonacular_recipes", "GET",
+                 lambda c, i, _: f"/api/spooncularrecipes/?ingredients={c.pick(c.ingredients, i)}"),
+        Scenario("spoonacular_recipe_detail", "GET",
+                 lambda c, i, _: f"/api/spoonculardetail/{1000 + i % 5}/"),
+        # Profiling admin
+        Scenario("profile_token", "POST", "/api/profiles/token/", auth="admin"),
+        Scenario("list_profiles", "GET", "/api/profiles/", auth="admin"),
+        Scenario("profile_detail", "GET", lambda c, i, _: f"/api/profiles/{c.profile_id}/",
+                 auth="admin"),
+        # Per-user data
+        Scenario("grocery_list_create", "POST", "/api/grocery-list-create/",
+                 body=lambda c, i, _: {"ingredients": [
+                     {"ingredient_name": c.pick(c.ingredients, i), "quantity": "1",
+                      "unit": "g", "shop_type": "Supermarket"}]}),
+        Scenario("grocery_list_list", "GET", "/api/grocery-list-create/"),
+        Scenario("grocery-list-delete", "DELETE",
+                 lambda c, i, item: f"/api/grocery-list-create/{item.pk}/",
+                 prepare=_grocery_items),
+        Scenario("list_favorites", "GET", "/api/favorites/"),
+        Scenario("toggle_favorite", "POST", "/api/favorites/toggle/",
+                 body=lambda c, i, _: {"mealid": c.mealid(i)}),
+        Scenario("favorite_status", "GET",
+                 lambda c, i, _: "/api/favorites/status/?mealids="
+                                 + ",".join(c.mealid(i) for _ in range(24))),
+        Scenario("bulk_favorites", "POST", "/api/favorites/bulk/",
+                 body=lambda c, i, _: {"add": [c.mealid(i) for _ in range(5)],
+                                       "remove": [c.mealid(i) for _ in range(5)]}),
+        Scenario("recent_views", "GET", "/api/recent-views/"),
+        Scenario("save_ai_recipe", "POST", "/api/ai-recipes/save/",
+                 body=lambda c, i, _: dict(STUB_RECIPE, idMeal=f"SV{c.run_id}{i}")),
+        Scenario("list_ai_recipes", "GET", "/api/ai-recipes/"),
+        Scenario("list_public_ai_recipes", "GET", "/api/ai-recipes/?public=true"),
+        Scenario("share_ai_recipe", "POST", "/api/ai-recipes/share/",
+                 body=lambda c, i, item: {"meal_id": item.pk},
+                 prepare=lambda c, n: _own_meals(c, n, False)),
+        Scenario("unshare_ai_recipe", "POST", "/api/ai-recipes/unshare/",
+                 body=lambda c, i, item: {"meal_id": item.pk},
+                 prepare=lambda c, n: _own_meals(c, n, True)),
+        Scenario("delete_ai_recipe", "DELETE",
+                 lambda c, i, item: f"/api/ai-recipes/{item.pk}/",
+                 prepare=lambda c, n: _own_meals(c, n, False)),
+        # Auth
+        Scenario("register", "POST", "/auth/register/", auth=None,
+                 body=lambda c, i, _: {"email": f"bench-new-{c.run_id}-{next(c.serial)}@example.com",
+                                       "password": "Bench-password-1", "name": "Bench",
+                                       "country": "India", "age": 30, "isCook": False}),
+        Scenario("token_obtain_pair", "POST", "/auth/login/", auth=None,
+                 body=lambda c, i, _: {"email": c.user(i).email, "password": c.password}),
+        Scenario("token_refresh", "POST", "/auth/token/refresh", auth=None,
+                 body=lambda c, i, _: {"refresh": c.pick(c.refresh_tokens, i)}),
+        Scenario("user_profile", "GET", "/auth/profile/"),
+        Scenario("user_profile_update", "PATCH", "/auth/profile/",
+                 body=lambda c, i, _: {"bio": f"Benchmark bio {i}"}),
+        Scenario("metrics", "GET", "/metrics", auth=None),
+    ]
+
+
+# -- load generation -------------------------------------------------------------
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(ctx, scenario, concurrency, count, warmup=0):
+    """Fire ``count`` requests ``concurrency`` at a time; returns the summary dict."""
+    items = scenario.prepare(ctx, count + warmup) if scenario.prepare else None
+    local = threading.local()
+
+    def fire(i):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        method, path, body, headers = scenario.build(ctx, i, items[i] if items else None)
+        started = time.perf_counter()
+        response = session.request(method, ctx.base_url + path, json=body, headers=headers)
+        elapsed = time.perf_counter() - started
+        return elapsed, response.status_code, int(response.headers.get(QUERIES_HEADER, 0))
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(fire, range(warmup)))
+        started = time.perf_counter()
+        results = list(pool.map(fire, range(warmup, warmup + count)))
+        wall = time.perf_counter() - started
+
+    latencies = sorted(r[0] for r in results)
+    statuses = {}
+    for _, code, _ in results:
+        statuses[str(code)] = statuses.get(str(code), 0) + 1
+    return {
+        "requests": count,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "rps": round(count / wall, 1) if wall else 0.0,
+        "queries": round(sum(r[2] for r in results) / count, 1),
+        "errors": sum(1 for _, code, _ in results if code >= 500),
+        "statuses": statuses,
+    }
+
+
+def compare(current, baseline, max_regression):
+    """
+    ``(rows, regressions)``: one row per scenario/level present in both runs.
+    A regression is p95 growing, or throughput falling, by more than
+    ``max_regression`` (a fraction); p95 changes under 2 ms are noise.
+    """
+    rows, regressions = [], []
+    for key, now in current.items():
+        before = baseline.get(key)
+        if before is None:
+            continue
+        p95_change = (now["p95_ms"] - before["p95_ms"]) / before["p95_ms"] if before["p95_ms"] else 0.0
+        rps_change = (now["rps"] - before["rps"]) / before["rps"] if before["rps"] else 0.0
+        regressed = ((p95_change > max_regression and now["p95_ms"] - before["p95_ms"] > 2)
+                     or rps_change < -max_regression)
+        rows.append((key, before, now, p95_change, rps_change, regressed))
+        if regressed:
+            regressions.append(key)
+    return rows, regressions
+
+
+def load_baseline(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_report(path, config, results):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"config": config, "results": results}, f, indent=2, sort_keys=True)
@@ -0,0 +1,239 @@
+"""
+Near-duplicate answer cache for single-turn chatbot questions.
+
+Questions are normalized (accent-folded, lowercased, stop words removed,
+light suffix stemming) and broken into character trigrams.  An in-process
+inverted index over those trigrams scores candidates by TF-IDF cosine
+similarity, so "how long to boil an egg" and "boiled egg time?" resolve to
+the same stored answer without calling Gemini.
+
+Answers themselves live in the ``ChatAnswer`` table so every worker process
+shares them; each process only keeps the (small) trigram index in memory and
+rebuilds it from the table every ``CHAT_CACHE_REFRESH_SECONDS``.
+"""
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import ChatAnswer
+
+
+STOP_WORDS = frozenset("""
+    a an the and or of to for in on at by with from into about
+    how what whats when where which who why is are was were be been do does
+    did can could should would will i me my we you your it its this that
+    please tell much many long give some any there
+""".split())
+
+NGRAM = 3
+# Long, specific questions are not FAQ material; don't index them
+MAX_QUESTION_CHARS = 500
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _stem(word):
+    # Very small suffix stripper: enough to fold "boiled"/"boiling"/"boils"
+    for suffix in ("ing", "ed", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def normalize_question(text):
+    """Return the canonical form of a question used for matching."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    kept = [_stem(w) for w in words if w not in STOP_WORDS]
+    # Fall back to the raw words if the question was nothing but stop words
+    return " ".join(kept or words)
+
+
+def _ngrams(normalized):
+    padded = f" {normalized} "
+    return Counter(padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1))
+
+
+class ChatAnswerIndex:
+    """Per-process TF-IDF index over the normalized cached questions."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded_at = 0.0
+        self._docs = {}                   # answer id -> {ngram: count}
+        self._postings = defaultdict(set)  # ngram -> {answer id}
+        self._norms = {}
+
+    def _idf(self, gram):
+        df = len(self._postings.get(gram, ()))
+        return math.log((1 + len(self._docs)) / (1 + df)) + 1.0
+
+    def _add(self, answer_id, normalized):
+        grams = _ngrams(normalized)
+        self._docs[answer_id] = grams
+        for gram in grams:
+            self._postings[gram].add(answer_id)
+
+    def _discard(self, answer_id):
+        grams = self._docs.pop(answer_id, None)
+        self._norms.pop(answer_id, None)
+        if not grams:
+            return
+        for gram in grams:
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(answer_id)
+                if not ids:
+                    del self._postings[gram]
+
+    def _weights(self, grams):
+        return {g: c * self._idf(g) for g, c in grams.items()}
+
+    def _norm(self, answer_id):
+        norm = self._norms.get(answer_id)
+        if norm is None:
+            weights = self._weights(self._docs[answer_id])
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            self._norms[answer_id] = norm
+        return norm
+
+    def _refresh(self, force=False):
+        interval = _setting("CHAT_CACHE_REFRESH_SECONDS", 60)
+        if not force and time.monotonic() - self._loaded_at < interval:
+            return
+        rows = ChatAnswer.objects.values_list("id", "normalized_question")
+        self._docs.clear()
+        self._postings.clear()
+        self._norms.clear()
+        for answer_id, normalized in rows.iterator():
+            self._add(answer_id, normalized)
+        self._loaded_at = time.monotonic()
+
+    def best_match(self, normalized):
+        """Return ``(answer_id, similarity)`` for the closest question, or ``(None, 0.0)``."""
+        grams = _ngrams(normalized)
+        with self._lock:
+            self._refresh()
+            candidates = set()
+            for gram in grams:
+                candidates |= self._postings.get(gram, set())
+            if not candidates:
+                return None, 0.0
+
+            query = self._weights(grams)
+            query_norm = math.sqrt(sum(w * w for w in query.values())) or 1.0
+            best_id, best_score = None, 0.0
+            for answer_id in candidates:
+                doc = self._docs[answer_id]
+                dot = sum(w * doc[g] * self._idf(g)
+                          for g, w in query.items() if g in doc)
+                score = dot / (query_norm * self._norm(answer_id))
+                if score > best_score:
+                    best_id, best_score = answer_id, score
+            return best_id, best_score
+
+    def add(self, answer_id, normalized):
+        with self._lock:
+            self._discard(answer_id)
+            self._add(answer_id, normalized)
+            # IDF shifts with every document, so cached norms go stale
+            self._norms.clear()
+
+    def discard(self, answer_id):
+        with self._lock:
+            self._discard(answer_id)
+            self._norms.clear()
+
+    def clear(self):
+        with self._lock:
+            self._docs.clear()
+            self._postings.clear()
+            self._norms.clear()
+            self._loaded_at = time.monotonic()
+
+
+_index = ChatAnswerIndex()
+
+
+def single_turn_question(messages):
+    """
+    Return the user's question if the conversation is single-turn, else None.
+    Canned assistant greetings before the question don't count as turns.
+    """
+    user_messages = [m for m in messages if m.get("role") == "user"]
+    if len(user_messages) != 1 or messages[-1] is not user_messages[0]:
+        return None
+    content = user_messages[0].get("content")
+    return content.strip() if isinstance(content, str) and content.strip() else None
+
+
+def lookup(question):
+    """
+    Find a cached answer for a near-duplicate question.
+    Returns ``(answer_text, similarity)`` or ``(None, similarity)`` on a miss.
+    """
+    if not _setting("CHAT_CACHE_ENABLED", True):
+        return None, 0.0
+
+    normalized = normalize_question(question)
+    if not normalized or len(normalized) > MAX_QUESTION_CHARS:
+        return None, 0.0
+
+    answer_id, score = _index.best_match(normalized)
+    if answer_id is None or score < _setting("CHAT_CACHE_THRESHOLD", 0.7):
+        return None, score
+
+    updated = ChatAnswer.objects.filter(id=answer_id).update(
+        hits=F("hits") + 1, last_used_at=timezone.now())
+    if not updated:
+        # Evicted or purged by another process since our last refresh
+        _index.discard(answer_id)
+        return None, score
+    answer = ChatAnswer.objects.filter(
+        id=answer_id).values_list("answer", flat=True).first()
+    return answer, score
+
+
+def store(question, answer):
+    """Remember an answer and evict the least recently used overflow."""
+    if not _setting("CHAT_CACHE_ENABLED", True) or not answer:
+        return None
+
+    normalized = normalize_question(question)
+    if not normalized or len(normalized) > MAX_QUESTION_CHARS:
+        return None
+
+    entry, _ = ChatAnswer.objects.update_or_create(
+        normalized_question=normalized,
+        defaults={"question": question, "answer": answer,
+                  "last_used_at": timezone.now()},
+    )
+    _index.add(entry.id, normalized)
+
+    max_entries = _setting("CHAT_CACHE_MAX_ENTRIES", 2000)
+    overflow = list(
+        ChatAnswer.objects.order_by("-last_used_at")
+        .values_list("id", flat=True)[max_entries:]
+    )
+    if overflow:
+        ChatAnswer.objects.filter(id__in=overflow).delete()
+        for answer_id in overflow:
+            _index.discard(answer_id)
+    return entry
+
+
+def purge():
+    """Delete every cached answer. Returns the number of rows removed."""
+    deleted, _ = ChatAnswer.objects.all().delete()
+    _index.clear()
+    return deleted
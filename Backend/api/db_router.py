@@ -0,0 +1,90 @@
+"""
+Primary / read-replica routing.
+
+Writes always go to ``default``.  Reads go to the ``replica`` alias only
+inside views that opt in with ``ReplicaReadMixin`` (safe methods only), and
+only when ``settings.DATABASES`` defines a replica.  After a user makes a
+successful write request, ``ReadYourWritesMiddleware`` pins them to the
+primary for ``READ_YOUR_WRITES_SECONDS`` so replica lag never hides their own
+changes.  The pin lives in the shared cache so every worker honours it.
+
+Locally the replica is a second SQLite file refreshed with
+``manage.py sync_replica``.
+"""
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+
+REPLICA = "replica"
+
+_read_alias = ContextVar("db_read_alias", default=None)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def _pin_key(user_id):
+    return f"db-pin:{user_id}"
+
+
+def pin_to_primary(user_id):
+    cache.set(_pin_key(user_id), True, getattr(settings, "READ_YOUR_WRITES_SECONDS", 10))
+
+
+def is_pinned(user):
+    return user.is_authenticated and bool(cache.get(_pin_key(user.id)))
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica is a copy of the primary, so rows relate freely
+        return {obj1._state.db, obj2._state.db} <= {"default", REPLICA}
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema with the data from sync_replica
+        return db != REPLICA
+
+
+class ReplicaReadMixin:
+    """For APIViews whose GET is read-only: serve its queries from the replica."""
+
+    def use_replica(self, request):
+        return True
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._read_alias_token = None
+        if (request.method in SAFE_METHODS and replica_configured()
+                and self.use_replica(request) and not is_pinned(request.user)):
+            self._read_alias_token = _read_alias.set(REPLICA)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, "_read_alias_token", None)
+        if token is not None:
+            _read_alias.reset(token)
+            self._read_alias_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ReadYourWritesMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        # DRF copies the JWT-authenticated user back onto the Django request
+        user = getattr(request, "user", None)
+        if (request.method not in SAFE_METHODS and response.status_code < 400
+                and user is not None and user.is_authenticated):
+            pin_to_primary(user.id)
+        return response
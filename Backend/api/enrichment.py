@@ -0,0 +1,90 @@
+"""
+Optional external data for the recipe page bundle (``RecipeBundle``).
+
+Each enrichment is a function of plain recipe data (no ORM access, so it can
+run on a pool thread) returning JSON-able data.  ``start`` submits the
+requested ones before the view does its own queries, so the upstream calls
+overlap the local work; ``collect`` waits for them until a shared deadline
+and reports the ones that missed it instead of holding the response.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from django.conf import settings
+
+from . import metrics
+from .ingredients import ingredient_key
+from .throttling import upstream_slots
+
+
+_pool = ThreadPoolExecutor(max_workers=getattr(settings, "ENRICHMENT_WORKERS", 8),
+                           thread_name_prefix="enrichment")
+
+
+class Unavailable(Exception):
+    """The enrichment was skipped (no upstream slot, nothing to look up, ...)."""
+
+
+def spoonacular_matches(recipe, timeout):
+    """Spoonacular recipes sharing this recipe's main ingredients."""
+    names = []
+    for line in recipe.get("ingredients") or []:
+        key = ingredient_key(line)
+        if key and key not in names:
+            names.append(key)
+        if len(names) >= 3:
+            break
+    if not names:
+        raise Unavailable("no ingredients to match")
+
+    slots = upstream_slots("spoonacular")
+    slot = slots.acquire() if slots is not None else None
+    if slots is not None and slot is None:
+        raise Unavailable("spoonacular is busy")
+    try:
+        with metrics.track_upstream("spoonacular"):
+            response = requests.get(
+                "https://api.spoonacular.com/recipes/findByIngredients",
+                params={"ingredients": ",".join(names), "number": 5,
+                        "apiKey": settings.SPOONACULAR_API_KEY},
+                timeout=timeout)
+        metrics.record_http_error("spoonacular", response)
+        if response.status_code >= 400:
+            raise Unavailable(f"spoonacular answered {response.status_code}")
+        return response.json()
+    finally:
+        if slot is not None:
+            slots.release(slot)
+
+
+ENRICHMENTS = {
+    "spoonacular": spoonacular_matches,
+}
+
+
+def start(names, recipe, deadline):
+    """Submit the named enrichments; returns ``{name: future}``."""
+    return {name: _pool.submit(ENRICHMENTS[name], recipe,
+                               max(0.1, deadline - time.monotonic()))
+            for name in names}
+
+
+def collect(futures, deadline):
+    """``(results, missing)``: finished data, and ``{name: reason}`` for the rest."""
+    wait(futures.values(), timeout=max(0.0, deadline - time.monotonic()))
+    results, missing = {}, {}
+    for name, future in futures.items():
+        if not future.done():
+            # The call keeps its own timeout; we just stop waiting for it
+            future.cancel()
+            missing[name] = "timeout"
+            continue
+        try:
+            results[name] = future.result()
+        except Unavailable as e:
+            missing[name] = str(e)
+        except Exception as e:
+            print(f"Enrichment {name} failed: {e}")
+            missing[name] = "error"
+    return results, missing
@@ -0,0 +1,147 @@
+"""
+Category / area facets for browsing.
+
+``Meal.category`` (a JSON list) is mirrored into the indexed ``MealCategory``
+table so filters are plain joins, and ``FacetCount`` holds how many visible
+(system or public) meals carry each category and area.  The Meal signals in
+``api/signals.py`` keep both current: the facets a meal contributed before a
+save are diffed against the ones it contributes after, and only the changed
+counters are bumped.  ``Meal.area`` is stored trimmed (``clean_area``, on
+save) so ``?area=`` filters match the counted values exactly.
+``manage.py rebuild_facets`` recomputes everything after bulk imports, which
+bypass signals, and trims any areas they brought in.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F
+
+from core.models import Category, FacetCount, Meal, MealCategory
+
+
+_category_ids = {}   # name -> Category id, per process
+
+
+def category_names(category):
+    """Clean, de-duplicated category names from a Meal.category value."""
+    if isinstance(category, str):
+        category = [category]
+    names = []
+    for name in category or []:
+        if isinstance(name, str) and name.strip() and name.strip() not in names:
+            names.append(name.strip()[:100])
+    return names
+
+
+def clean_area(area):
+    """The stored / counted form of a Meal.area value."""
+    return area.strip()[:200] if isinstance(area, str) else area
+
+
+def meal_facets(category, area, user_id, is_public):
+    """Set of ``(facet, value)`` pairs a meal adds to the public counts."""
+    if user_id is not None and not is_public:
+        return set()
+    facets = {("category", name) for name in category_names(category)}
+    area = clean_area(area)
+    if area:
+        facets.add(("area", area))
+    return facets
+
+
+def snapshot(meal):
+    return meal_facets(meal.category, meal.area, meal.user_id, meal.is_public)
+
+
+def category_ids(names):
+    missing = [name for name in names if name not in _category_ids]
+    if missing:
+        Category.objects.bulk_create(
+            [Category(name=name) for name in missing], ignore_conflicts=True)
+        _category_ids.update(
+            Category.objects.filter(name__in=missing).values_list("name", "id"))
+    return [_category_ids[name] for name in names]
+
+
+def _bump(counts):
+    for (facet, value), delta in counts.items():
+        if not delta:
+            continue
+        updated = FacetCount.objects.filter(facet=facet, value=value).update(
+            count=F("count") + delta)
+        if not updated:
+            FacetCount.objects.bulk_create(
+                [FacetCount(facet=facet, value=value, count=0)], ignore_conflicts=True)
+            FacetCount.objects.filter(facet=facet, value=value).update(
+                count=F("count") + delta)
+
+
+def sync_meal(meal, before=frozenset()):
+    """
+    Bring one meal's category links and the facet counters up to date.
+    ``before`` is the meal's ``snapshot`` prior to the save (empty if new).
+    """
+    after = snapshot(meal)
+    wanted = set(category_ids(category_names(meal.category)))
+    with transaction.atomic():
+        current = set(MealCategory.objects.filter(meal=meal)
+                      .values_list("category_id", flat=True))
+        if current - wanted:
+            MealCategory.objects.filter(
+                meal=meal, category_id__in=current - wanted).delete()
+        MealCategory.objects.bulk_create(
+            [MealCategory(meal=meal, category_id=cid) for cid in wanted - current],
+            ignore_conflicts=True)
+        delta = Counter(dict.fromkeys(after - before, 1))
+        delta.subtract(dict.fromkeys(before - after, 1))
+        _bump(delta)
+
+
+def remove_meal(before):
+    """Subtract a deleted meal's facets (its category links cascade away)."""
+    with transaction.atomic():
+        _bump(Counter(dict.fromkeys(before, -1)))
+
+
+def rebuild(chunk_size=2000, stdout=None):
+    """Recreate every category link and counter. Returns ``(meals, links)``."""
+    counts = Counter()
+    total_meals = total_links = 0
+    last_id = 0
+    with transaction.atomic():
+        MealCategory.objects.all().delete()
+        while True:
+            chunk = list(Meal.objects.filter(id__gt=last_id).order_by("id")
+                         .values_list("id", "category", "area", "user_id", "is_public")
+                         [:chunk_size])
+            if not chunk:
+                break
+            links, untrimmed = [], []
+            for meal_id, category, area, user_id, is_public in chunk:
+                names = category_names(category)
+                links.extend(MealCategory(meal_id=meal_id, category_id=cid)
+                             for cid in category_ids(names))
+                counts.update(meal_facets(category, area, user_id, is_public))
+                if clean_area(area) != area:
+                    untrimmed.append(Meal(id=meal_id, area=clean_area(area)))
+            MealCategory.objects.bulk_create(links, batch_size=5000)
+            Meal.objects.bulk_update(untrimmed, ["area"], batch_size=5000)
+            total_meals += len(chunk)
+            total_links += len(links)
+            last_id = chunk[-1][0]
+            if stdout is not None:
+                stdout.write(f"  {total_meals} meals linked")
+        FacetCount.objects.all().delete()
+        FacetCount.objects.bulk_create(
+            [FacetCount(facet=facet, value=value, count=n)
+             for (facet, value), n in counts.items()], batch_size=5000)
+    return total_meals, total_links
+
+
+def facet_counts():
+    """``{"category": [{"value", "count"}, ...], "area": [...]}``, largest first."""
+    result = {"category": [], "area": []}
+    rows = FacetCount.objects.filter(count__gt=0).order_by("-count", "value")
+    for facet, value, count in rows.values_list("facet", "value", "count"):
+        result[facet].append({"value": value, "count": count})
+    return result
@@ -0,0 +1,66 @@
+"""
+Sparse fieldsets for the meal list endpoints.
+
+``RecipeFilter``, ``IngredientsFilter``, ``ListFavorites`` and ``ListAIRecipes``
+return the "summary" representation by default: what a recipe card shows,
+without ``instructions`` and ``ingredients``, which were most of the bytes.
+``?fields=title,image,...`` picks ``MealSerializer`` fields, and
+``?fields=full`` returns everything.  ``only`` makes the query load just the
+columns the selected fields need, so the rest are never read either.
+"""
+from core.serializers import MEAL_SUMMARY_FIELDS, MealSerializer
+
+
+SUMMARY = "summary"
+FULL = "full"
+
+# Serializer fields computed from other columns
+DERIVED = {
+    "thumbnail": ("image",),
+    "user_name": ("is_public", "user", "user__name", "user__email"),
+}
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def requested(request):
+    """The ``MealSerializer`` fields asked for with ``?fields=``, in serializer order."""
+    available = list(MealSerializer.Meta.fields)
+    value = request.GET.get("fields", "").strip() or SUMMARY
+    if value == FULL:
+        return available
+    if value == SUMMARY:
+        return list(MEAL_SUMMARY_FIELDS)
+    names = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = sorted(names - set(available))
+    if unknown:
+        raise InvalidFields(f"Unknown fields: {', '.join(unknown)}. Available: "
+                            f"{', '.join(available)}, or '{SUMMARY}' / '{FULL}'.")
+    return [name for name in available if name in names]
+
+
+def columns(fields, prefix=""):
+    """Model fields to pass to ``only()``; ``prefix`` is e.g. ``"meal__"`` for a relation."""
+    needed = {"id"}
+    for name in fields:
+        needed.update(DERIVED.get(name, (name,)))
+    return [prefix + name for name in sorted(needed)]
+
+
+def load_only(queryset, fields, prefix="", extra=()):
+    """
+    Restrict a Meal queryset to the columns ``fields`` need.  For a model that
+    points at Meal, pass the relation as ``prefix`` and its own columns as ``extra``.
+    """
+    if prefix:
+        queryset = queryset.select_related(prefix.rstrip("_"))
+    if "user_name" in fields:
+        queryset = queryset.select_related(prefix + "user")
+    return queryset.only(*extra, *columns(fields, prefix))
+
+
+def context(fields):
+    """Serializer context that makes ``MealSerializer`` emit only ``fields``."""
+    return {"meal_fields": set(fields)}
@@ -0,0 +1,287 @@
+"""
+Resized copies of recipe images, served from our own origin.
+
+``Meal.image`` points at third-party hosts and full-size originals.  Meal
+serializers also return ``thumbnail``, a URL of ``RecipeImage``
+(``/api/images/<meal id>/<digest>-<width>.<ext>``, where ``digest`` hashes
+the source URL).  On the first request the original is fetched once and
+every width in ``IMAGE_PROXY_WIDTHS`` is written as WebP and JPEG.  The
+files land in an on-disk LRU under ``IMAGE_PROXY_DIR``; once it grows past
+``IMAGE_PROXY_MAX_BYTES``, the least recently served files are removed.
+
+Only hosts in ``IMAGE_PROXY_ALLOWED_HOSTS`` (and their subdomains) are
+fetched, without following redirects: ``Meal.image`` can be set by users
+through ``SaveAIRecipe``, and the proxy must not become a way to reach
+internal services.  Meals with other hosts get no ``thumbnail`` URL.
+
+Concurrent misses for one image wait for a single fetch in this process.
+Other processes may fetch the same image too, which is harmless: files are
+written atomically under the same name.  Editing ``Meal.image`` changes
+the digest, so a URL always means the same bytes and is served as
+immutable.
+"""
+import hashlib
+import io
+import os
+import re
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.urls import reverse
+from PIL import Image, ImageOps
+
+from . import metrics
+
+
+FORMATS = {"webp": "WEBP", "jpg": "JPEG"}
+NAME = re.compile(r"^([0-9a-f]{32})-(\d+)\.(webp|jpg)$")
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class ImageUnavailable(Exception):
+    """The source image could not be fetched or decoded."""
+
+
+def digest(source_url):
+    return hashlib.sha256(source_url.encode("utf-8")).hexdigest()[:32]
+
+
+def widths():
+    return sorted(int(width) for width in _setting("IMAGE_PROXY_WIDTHS", (160, 320, 640)))
+
+
+def parse(name):
+    """``(digest, width, ext)`` for a variant file name, or None."""
+    match = NAME.match(name)
+    if not match or int(match.group(2)) not in widths():
+        return None
+    return match.group(1), int(match.group(2)), match.group(3)
+
+
+def allowed(source_url):
+    """True for an http(s) URL on one of ``IMAGE_PROXY_ALLOWED_HOSTS`` or a subdomain."""
+    try:
+        parts = urlsplit(source_url)
+        host = (parts.hostname or "").rstrip(".")
+    except ValueError:
+        return False
+    if parts.scheme not in ("http", "https") or not host:
+        return False
+    hosts = _setting("IMAGE_PROXY_ALLOWED_HOSTS", ("themealdb.com", "spoonacular.com"))
+    return any(host == entry or host.endswith("." + entry) for entry in hosts)
+
+
+def proxy_url(meal, width=None, ext="webp"):
+    """Where ``RecipeImage`` serves ``meal.image``; None when there is nothing to proxy."""
+    if not meal.image or not allowed(meal.image):
+        return None
+    width = width or _setting("IMAGE_PROXY_DEFAULT_WIDTH", 320)
+    return reverse("recipe_image", args=[meal.id, f"{digest(meal.image)}-{width}.{ext}"])
+
+
+# -- cache --------------------------------------------------------------------
+
+class DiskLRU:
+    """
+    Files in one directory, bounded by total size.  A hit bumps the file's
+    mtime, so mtime order is recency order (also across processes).
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size = None
+        self._lock = threading.Lock()
+
+    def open(self, name):
+        """The cached file opened for reading, or None.  Safe against eviction."""
+        path = os.path.join(self.directory, name)
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return f
+
+    def put(self, name, data):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, name)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data)
+            over = self._size > self.max_bytes
+        if over:
+            self.evict()
+
+    def _entries(self):
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _scan_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Drop least recently used files until the cache is at 90% of its budget."""
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            target = self.max_bytes * 0.9
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+            self._size = total
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            directory = _setting("IMAGE_PROXY_DIR",
+                                 os.path.join(settings.BASE_DIR, "var", "image-cache"))
+            _cache = DiskLRU(directory, _setting("IMAGE_PROXY_MAX_BYTES", 256 * 1024 * 1024))
+        return _cache
+
+
+# -- fetch and render ---------------------------------------------------------
+
+def fetch(source_url):
+    """The original image bytes, capped at ``IMAGE_PROXY_MAX_SOURCE_BYTES``."""
+    if not allowed(source_url):
+        raise ImageUnavailable("Image host is not allowed.")
+    limit = _setting("IMAGE_PROXY_MAX_SOURCE_BYTES", 10 * 1024 * 1024)
+    try:
+        with metrics.track_upstream("image_origin"):
+            # A redirect could point anywhere, including internal addresses
+            response = requests.get(source_url, stream=True, allow_redirects=False,
+                                    timeout=_setting("IMAGE_PROXY_TIMEOUT_SECONDS", 10))
+            try:
+                metrics.record_http_error("image_origin", response)
+                if response.status_code >= 300:
+                    raise ImageUnavailable(f"Image host answered {response.status_code}.")
+                data = io.BytesIO()
+                for chunk in response.iter_content(64 * 1024):
+                    data.write(chunk)
+                    if data.tell() > limit:
+                        raise ImageUnavailable("Image is too large.")
+            finally:
+                response.close()
+    except requests.exceptions.RequestException as e:
+        raise ImageUnavailable(f"Could not fetch image: {str(e)}")
+    return data.getvalue()
+
+
+def render(data):
+    """``{(width, ext): bytes}`` for every configured width; metadata is dropped."""
+    try:
+        image = Image.open(io.BytesIO(data))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ImageUnavailable(f"Could not decode image: {str(e)}")
+
+    quality = _setting("IMAGE_PROXY_QUALITY", 80)
+    variants = {}
+    for width in widths():
+        resized = image.copy()
+        # Never upscale: a small original is served at its own size
+        resized.thumbnail((width, width * 4), Image.LANCZOS)
+        for ext, fmt in FORMATS.items():
+            variant = resized
+            if ext == "jpg" and variant.mode != "RGB":
+                background = Image.new("RGB", variant.size, (255, 255, 255))
+                background.paste(variant, mask=variant.getchannel("A"))
+                variant = background
+            out = io.BytesIO()
+            variant.save(out, fmt, quality=quality, optimize=True)
+            variants[(width, ext)] = out.getvalue()
+    return variants
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def variant(source_url, name):
+    """
+    The variant ``name`` of ``source_url`` as an open file, fetching and
+    rendering on a miss.  Raises ``ImageUnavailable``.
+    """
+    store = cache()
+    f = store.open(name)
+    if f is not None:
+        metrics.cache_result("image_proxy", True)
+        return f
+    metrics.cache_result("image_proxy", False)
+
+    key = digest(source_url)
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        # Someone is already fetching this image; share their result
+        flight.done.wait(_setting("IMAGE_PROXY_TIMEOUT_SECONDS", 10) * 2)
+        if flight.error is not None:
+            raise flight.error
+        f = store.open(name)
+        if f is None:
+            raise ImageUnavailable("Image is not ready yet.")
+        return f
+
+    try:
+        for (width, ext), data in render(fetch(source_url)).items():
+            store.put(f"{key}-{width}.{ext}", data)
+    except ImageUnavailable as e:
+        flight.error = e
+        raise
+    except Exception as e:
+        flight.error = ImageUnavailable(str(e))
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+    f = store.open(name)
+    if f is None:
+        raise ImageUnavailable("Image cache is too small to hold this image.")
+    return f
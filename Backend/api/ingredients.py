@@ -0,0 +1,237 @@
+"""
+Helpers for turning raw ingredient lines ("¼ cup Vegetable oil",
+"200g Chicken Breast, diced") into quantity, unit and a canonical name.
+"""
+import re
+import unicodedata
+from decimal import Decimal, InvalidOperation
+from fractions import Fraction
+from functools import lru_cache
+
+from django.db import transaction
+
+from core.models import MealIngredient
+
+
+UNICODE_FRACTIONS = {
+    "¼": "1/4", "½": "1/2", "¾": "3/4", "⅓": "1/3", "⅔": "2/3",
+    "⅛": "1/8", "⅜": "3/8", "⅝": "5/8", "⅞": "7/8", "⅕": "1/5",
+}
+
+# Alias -> unit code from core.models.UNIT_CHOICES
+UNIT_ALIASES = {
+    "mg": "mg", "milligram": "mg", "milligrams": "mg",
+    "g": "g", "gr": "g", "gram": "g", "grams": "g", "grammes": "g",
+    "kg": "kg", "kilo": "kg", "kilogram": "kg", "kilograms": "kg",
+    "oz": "oz", "ounce": "oz", "ounces": "oz",
+    "lb": "lb", "lbs": "lb", "pound": "lb", "pounds": "lb",
+    "ml": "ml", "milliliter": "ml", "milliliters": "ml", "millilitre": "ml",
+    "millilitres": "ml",
+    "l": "l", "liter": "l", "liters": "l", "litre": "l", "litres": "l",
+    "tsp": "tsp", "tsps": "tsp", "teaspoon": "tsp", "teaspoons": "tsp",
+    "tbsp": "tbsp", "tbsps": "tbsp", "tbs": "tbsp", "tblsp": "tbsp",
+    "tablespoon": "tbsp", "tablespoons": "tbsp",
+    "cup": "cup", "cups": "cup",
+    "pinch": "pinch", "pinches": "pinch",
+    "dash": "dash", "dashes": "dash",
+    "pc": "pcs", "pcs": "pcs", "piece": "pcs", "pieces": "pcs",
+    "packet": "packet", "packets": "packet", "pack": "packet",
+    "can": "can", "cans": "can", "tin": "can", "tins": "can",
+    "bottle": "bottle", "bottles": "bottle",
+}
+
+# Words that describe preparation or size rather than the ingredient itself
+DESCRIPTORS = frozenset("""
+    chopped diced minced sliced grated crushed ground peeled fresh freshly
+    finely roughly thinly large small medium whole halved quartered beaten
+    softened melted boneless skinless cubed shredded to taste of handful
+    optional about approx heaped level rounded
+""".split())
+
+_FRACTION_CHARS = "".join(UNICODE_FRACTIONS)
+_QUANTITY_RE = re.compile(
+    r"^\s*(\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?)"   # 1 1/2, 1/2, 1.5
+    r"(?:\s*(?:-|to)\s*\d+(?:\.\d+)?)?"            # ranges: keep the low end
+)
+
+
+def fold(text):
+    """Lowercase and strip accents."""
+    text = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def _expand_fractions(text):
+    for char, frac in UNICODE_FRACTIONS.items():
+        # "1½" -> "1 1/2", "½" -> "1/2"
+        text = re.sub(rf"(\d){char}", rf"\1 {frac}", text)
+        text = text.replace(char, f" {frac} ")
+    return text.strip()
+
+
+IRREGULAR_PLURALS = {"leaves": "leaf", "loaves": "loaf", "halves": "half"}
+
+
+def _singular(word):
+    if word in IRREGULAR_PLURALS:
+        return IRREGULAR_PLURALS[word]
+    if len(word) <= 3 or word.endswith(("ss", "us")):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("oes"):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def canonical_name(name):
+    """
+    Reduce an ingredient name to a comparable key:
+    "Chicken Breasts, diced" -> "chicken breast".
+    """
+    name = fold(name)
+    name = re.sub(r"\(.*?\)", " ", name).split(",")[0]
+    words = [_singular(w) for w in re.findall(r"[a-z]+", name)
+             if w not in DESCRIPTORS]
+    return " ".join(words)
+
+
+def parse_ingredient_line(line):
+    """
+    Split a raw ingredient line into ``(quantity, unit, name)``.
+
+    ``quantity`` is a string such as "1 1/2" (or None), ``unit`` is a code
+    from ``UNIT_CHOICES`` (or None) and ``name`` is the remaining text,
+    untouched apart from whitespace.
+    """
+    return _parse_line(str(line or ""))
+
+
+# Lines repeat heavily across recipes ("1 tsp Salt"), so parse each once
+@lru_cache(maxsize=65536)
+def _parse_line(line):
+    text = _expand_fractions(line)
+    quantity = None
+    match = _QUANTITY_RE.match(text)
+    if match:
+        quantity = " ".join(match.group(1).split())
+        text = text[match.end():].strip()
+
+    unit = None
+    # Unit may be glued to the number ("200g") or the next word ("2 cups")
+    word_match = re.match(r"([A-Za-z]+)\.?(?:\s+|$)", text)
+    if word_match and word_match.group(1).lower() in UNIT_ALIASES:
+        unit = UNIT_ALIASES[word_match.group(1).lower()]
+        text = text[word_match.end():].strip()
+        if text.lower().startswith("of "):
+            text = text[3:].strip()
+
+    return quantity, unit, " ".join(text.split())
+
+
+def ingredient_key(line):
+    """Canonical ingredient name for a raw ingredient line."""
+    return _line_key(str(line or ""))
+
+
+@lru_cache(maxsize=65536)
+def _line_key(line):
+    return canonical_name(_parse_line(line)[2])
+
+
+def parse_quantity_to_decimal(q):
+    """
+    Accepts numbers or strings like: "100", "1.5", "1/2", "1 1/2"
+    Returns a Decimal or raises ValueError on invalid input.
+    """
+    if q is None or (isinstance(q, str) and q.strip() == ""):
+        raise ValueError("Quantity is required")
+
+    # if already Decimal or int/float
+    if isinstance(q, Decimal):
+        return q
+    if isinstance(q, (int, float)):
+        return Decimal(str(q))
+
+    s = str(q).strip()
+    # Mixed number like "1 1/2"
+    if " " in s:
+        parts = s.split()
+        if len(parts) == 2:
+            whole, frac = parts
+            try:
+                f = Fraction(frac)
+                total = Fraction(int(whole)) + f
+                return Decimal(total.numerator) / Decimal(total.denominator)
+            except Exception:
+                pass
+
+    # simple fraction like "1/2"
+    if "/" in s:
+        try:
+            f = Fraction(s)
+            return Decimal(f.numerator) / Decimal(f.denominator)
+        except Exception as e:
+            raise ValueError(f"Invalid fraction quantity: {q}") from e
+
+    # decimal or integer string
+    try:
+        return Decimal(s)
+    except (InvalidOperation, ValueError) as e:
+        raise ValueError(f"Invalid numeric quantity: {q}") from e
+
+
+# MealIngredient.quantity has 3 decimal places
+QUANTITY_STEP = Decimal("0.001")
+
+
+def structured_ingredients(meal):
+    """Parse a meal's raw ingredient lines into unsaved MealIngredient rows."""
+    rows = []
+    for position, line in enumerate(meal.ingredients or []):
+        text = str(line or "").strip()
+        if not text:
+            continue
+        quantity, unit, name = parse_ingredient_line(text)
+        try:
+            quantity = parse_quantity_to_decimal(quantity).quantize(QUANTITY_STEP)
+        except (ValueError, InvalidOperation):
+            quantity = None
+        rows.append(MealIngredient(
+            meal_id=meal.id,
+            position=position,
+            quantity=quantity,
+            unit=unit or "",
+            name=canonical_name(name)[:255],
+            original_text=text,
+        ))
+    return rows
+
+
+def store_meal_ingredients(meals, batch_size=5000):
+    """
+    Replace the structured ingredient rows of ``meals`` in one delete and
+    batched inserts. Returns the number of rows written.
+    """
+    meals = list(meals)
+    rows = [row for meal in meals for row in structured_ingredients(meal)]
+    with transaction.atomic():
+        MealIngredient.objects.filter(meal_id__in=[m.id for m in meals]).delete()
+        MealIngredient.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def ingredient_names(meals):
+    """
+    ``{meal_id: [canonical name, ...]}`` in line order, read from the stored
+    rows instead of re-parsing.  ``meals`` is a Meal queryset or a list of ids.
+    """
+    names = {}
+    rows = MealIngredient.objects.filter(meal__in=meals).order_by(
+        "meal_id", "position").values_list("meal_id", "name")
+    for meal_id, name in rows.iterator(chunk_size=5000):
+        if name:
+            names.setdefault(meal_id, []).append(name)
+    return names
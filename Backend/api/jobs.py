@@ -0,0 +1,182 @@
+"""
+DB-backed queue for slow AI requests.
+
+``GeminiRecipeDetail`` and ``GenerateGroceryList`` accept ``"async": true``:
+instead of holding a web worker while Gemini answers, they ``enqueue`` a
+``Job`` and return its id.  ``manage.py run_job_workers`` processes claim
+jobs with a lease (an atomic conditional UPDATE, so no two workers run the
+same job), run the same code path the synchronous endpoint uses and store
+its response.  A worker that dies mid-job simply lets the lease expire and
+the job is picked up again; 5xx outcomes and exceptions are retried with
+backoff up to ``max_attempts``.
+
+Handlers that call an upstream API hold one of its ``UPSTREAM_CONCURRENCY``
+slots, shared with the web workers, while they run.  When every slot is busy
+the job goes back on the queue without using up an attempt.
+
+The same queue renders profile picture thumbnails (``thumbnails.build``),
+enqueued when a profile's picture changes.
+"""
+import os
+import socket
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.models import Job
+from .throttling import upstream_slots
+
+
+FINISHED = ("succeeded", "failed")
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _handlers():
+    """``{kind: (handler, upstream name or None)}``"""
+    # Imported lazily: the views import this module to enqueue
+    from . import thumbnails
+    from .views import GeminiRecipeDetail, GenerateGroceryList
+    return {
+        "recipe_detail": (GeminiRecipeDetail().generate, GeminiRecipeDetail.upstream),
+        "grocery_list": (GenerateGroceryList().generate, GenerateGroceryList.upstream),
+        "profile_thumbnails": (thumbnails.build, None),
+    }
+
+
+def wants_async(request):
+    """``"async": true`` in the body or ``?async=true``."""
+    flag = request.data.get("async") if hasattr(request.data, "get") else None
+    return str(flag if flag is not None else request.GET.get("async", "")).lower() == "true"
+
+
+def enqueue(kind, payload, user=None):
+    return Job.objects.create(
+        kind=kind, payload=payload,
+        user=user if user is not None and user.is_authenticated else None,
+        max_attempts=_setting("JOB_MAX_ATTEMPTS", 3))
+
+
+def enqueue_once(kind, payload, user=None):
+    """``enqueue``, unless a job of ``kind`` with the same payload is still queued."""
+    waiting = Job.objects.filter(
+        kind=kind, status="queued",
+        **{f"payload__{key}": value for key, value in payload.items()}).first()
+    return waiting or enqueue(kind, payload, user)
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim(worker):
+    """Lease the oldest runnable job for ``worker``; None if the queue is empty."""
+    now = timezone.now()
+    expired = Q(status="running", lease_until__lt=now)
+    # A worker died holding the last attempt: give up instead of running it again
+    Job.objects.filter(expired, attempts__gte=F("max_attempts")).update(
+        status="failed", lease_until=None, finished_at=now,
+        error="Worker lease expired on the last attempt.")
+    runnable = (Q(status="queued", run_after__lte=now)
+                | (expired & Q(attempts__lt=F("max_attempts"))))
+    lease = timedelta(seconds=_setting("JOB_LEASE_SECONDS", 120))
+    for job_id in Job.objects.filter(runnable).order_by("run_after").values_list(
+            "id", flat=True)[:10]:
+        # Only succeeds if nobody claimed it since the SELECT
+        claimed = Job.objects.filter(runnable, id=job_id).update(
+            status="running", lease_until=now + lease, leased_by=worker,
+            attempts=F("attempts") + 1)
+        if claimed:
+            return Job.objects.get(id=job_id)
+    return None
+
+
+def _finish(job, worker, **fields):
+    # Guard on leased_by: if our lease expired and another worker took over,
+    # its outcome wins
+    return Job.objects.filter(id=job.id, leased_by=worker, status="running").update(
+        lease_until=None, **fields)
+
+
+def run(job, worker):
+    handler, upstream = _handlers()[job.kind]
+    slots = upstream_slots(upstream)
+    slot = slots.acquire() if slots is not None else None
+    if slots is not None and slot is None:
+        # Every slot is busy: hand the attempt back and try again shortly
+        _finish(job, worker, status="queued", attempts=F("attempts") - 1,
+                run_after=timezone.now() + timedelta(
+                    seconds=_setting("UPSTREAM_RETRY_AFTER", 2)))
+        return "deferred"
+
+    try:
+        body, status_code = handler(job.payload)
+        error = body.get("error", "") if isinstance(body, dict) else ""
+        retryable = status_code >= 500
+    except Exception as e:
+        body, status_code, error, retryable = None, None, str(e), True
+    finally:
+        if slot is not None:
+            slots.release(slot)
+
+    if retryable and job.attempts < job.max_attempts:
+        backoff = _setting("JOB_RETRY_BACKOFF_SECONDS", 5) * 2 ** (job.attempts - 1)
+        _finish(job, worker, status="queued", error=error,
+                run_after=timezone.now() + timedelta(seconds=backoff))
+        return "retry"
+    outcome = "failed" if retryable else "succeeded"
+    _finish(job, worker, status=outcome, result=body, result_status=status_code,
+            error=error, finished_at=timezone.now())
+    return outcome
+
+
+def work(worker=None, once=False, stdout=None):
+    """Claim and run jobs until interrupted (or until the queue is empty if ``once``)."""
+    worker = worker or worker_name()
+    idle = _setting("JOB_POLL_INTERVAL", 1.0)
+    while True:
+        with transaction.atomic():
+            job = claim(worker)
+        if job is None:
+            if once:
+                return
+            time.sleep(idle)
+            continue
+        outcome = run(job, worker)
+        if stdout is not None:
+            stdout.write(f"  {job.kind} {job.id}: {outcome} (attempt {job.attempts})")
+
+
+def wait_for(job_id, timeout):
+    """Long-poll helper: the job once it has finished, or as it is at ``timeout``."""
+    deadline = time.monotonic() + timeout
+    interval = 0.25
+    while True:
+        job = Job.objects.filter(id=job_id).first()
+        if job is None or job.status in FINISHED or time.monotonic() >= deadline:
+            return job
+        time.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+        interval = min(interval * 2, 2.0)
+
+
+def describe(job):
+    data = {
+        "job_id": str(job.id),
+        "kind": job.kind,
+        "status": job.status,
+        "attempts": job.attempts,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+    }
+    if job.status in FINISHED:
+        data["result"] = job.result
+        data["result_status"] = job.result_status
+        if job.error:
+            data["error"] = job.error
+    return data
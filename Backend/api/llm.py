@@ -0,0 +1,299 @@
+"""
+LLM backends with deadlines and hedged requests.
+
+Views call ``generate(endpoint, system_instruction, contents)`` instead of
+talking to an SDK.  The backend is chosen by ``LLM_BACKEND`` (a dotted path):
+``GeminiBackend`` for production, ``FakeBackend`` for tests, the benchmark and
+offline development.  Backends are created on first use, so processes that
+never make an AI call (migrations, management commands) don't import any SDK.
+
+Every call has a deadline (``LLM_TIMEOUT_SECONDS``); past it the caller gets
+``LLMTimeout`` rather than waiting on a stuck connection.  Each endpoint
+keeps a window of recent call latencies.  When a call is still running after
+that window's p95 (``LLM_HEDGE_PERCENTILE``), a duplicate is sent, the
+first answer wins and the other attempt is cancelled.  Hedges spend from a
+token bucket refilled by ``LLM_HEDGE_BUDGET`` per call (0.1 = at most ~10%
+extra upstream calls), so a slow upstream can't double our spend.
+
+Cancelling is best effort: a backend gets a ``cancel`` event and an attempt
+timeout; the Gemini SDK can't abort an in-flight HTTP call, so its loser is
+abandoned and left to finish within the timeout.
+"""
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from . import metrics
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class LLMTimeout(Exception):
+    """No attempt answered before the deadline."""
+
+
+class LLMCancelled(Exception):
+    """The attempt lost a hedge race and was abandoned."""
+
+
+class LLMResponse:
+    def __init__(self, text, prompt_tokens=0, response_tokens=0):
+        self.text = text
+        self.prompt_tokens = prompt_tokens
+        self.response_tokens = response_tokens
+
+
+# -- backends -----------------------------------------------------------------
+
+class LLMBackend:
+    upstream = "llm"
+
+    def generate(self, system_instruction, contents, timeout, cancel):
+        """
+        Return an ``LLMResponse``.  ``contents`` is a prompt string or a list of
+        ``{"role", "parts"}`` messages; ``timeout`` is the seconds left before the
+        caller's deadline; ``cancel`` is set once the answer is no longer wanted.
+        """
+        raise NotImplementedError
+
+
+class GeminiBackend(LLMBackend):
+    upstream = "gemini"
+
+    def __init__(self, model_name=None):
+        # The SDK pulls in gRPC and protobuf (~1s); only pay for it on first use
+        import google.generativeai as genai
+
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        self.genai = genai
+        self.model_name = model_name or _setting("LLM_MODEL", "gemini-2.5-flash")
+
+    def generate(self, system_instruction, contents, timeout, cancel):
+        model = self.genai.GenerativeModel(model_name=self.model_name,
+                                           system_instruction=system_instruction)
+        response = model.generate_content(contents, request_options={"timeout": timeout})
+        usage = getattr(response, "usage_metadata", None)
+        return LLMResponse(response.text,
+                           getattr(usage, "prompt_token_count", 0) or 0,
+                           getattr(usage, "candidates_token_count", 0) or 0)
+
+
+class FakeBackend(LLMBackend):
+    """
+    Local stand-in.  Each call takes ``latency`` seconds (+/- ``jitter``), or
+    ``tail_latency`` for a ``tail_rate`` fraction of calls, then returns
+    ``responder(system_instruction, contents)`` (a canned reply by default).
+    """
+    upstream = "fake_llm"
+
+    def __init__(self, latency=0.0, jitter=0.0, tail_latency=0.0, tail_rate=0.0,
+                 responder=None, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.tail_latency = tail_latency
+        self.tail_rate = tail_rate
+        self.responder = responder or (lambda system_instruction, contents: "OK")
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _delay(self):
+        with self._lock:
+            self.calls += 1
+            if self.tail_rate and self._rng.random() < self.tail_rate:
+                return self.tail_latency
+            return self.latency * self._rng.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def generate(self, system_instruction, contents, timeout, cancel):
+        delay = self._delay()
+        if cancel.wait(min(delay, timeout)):
+            raise LLMCancelled()
+        if delay > timeout:
+            raise LLMTimeout(f"Fake LLM took longer than {timeout:.1f}s")
+        text = self.responder(system_instruction, contents)
+        return LLMResponse(text, len(str(contents)) // 4, len(text) // 4)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = import_string(_setting("LLM_BACKEND", "api.llm.GeminiBackend"))()
+        return _backend
+
+
+def warm_up(background=False):
+    """
+    Load the backend (and its SDK) now instead of on the first AI request.
+    Called from ``ApiConfig.ready`` when ``LLM_WARM_UP`` is set, or from a
+    gunicorn ``post_fork`` hook.
+    """
+    def load():
+        try:
+            get_backend()
+        except Exception as e:
+            print(f"LLM warm-up failed: {e}")
+
+    if background:
+        threading.Thread(target=load, name="llm-warm-up", daemon=True).start()
+    else:
+        load()
+
+
+def set_backend(backend):
+    """Swap the process-wide backend (tests, benchmark); returns the previous one."""
+    global _backend
+    with _backend_lock:
+        previous, _backend = _backend, backend
+        return previous
+
+
+# -- hedging ------------------------------------------------------------------
+
+class LatencyWindow:
+    """The last ``size`` successful call latencies of one endpoint."""
+
+    def __init__(self, size=200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct, min_samples):
+        with self._lock:
+            if len(self._samples) < max(1, min_samples):
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class HedgeBudget:
+    """Each call adds ``rate`` tokens (up to ``burst``); a hedge costs one."""
+
+    def __init__(self, rate, burst=5.0):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = 0.0
+        self._lock = threading.Lock()
+
+    def earn(self):
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + self.rate)
+
+    def spend(self):
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+_windows = defaultdict(lambda: LatencyWindow(_setting("LLM_LATENCY_WINDOW", 200)))
+_budget = None
+_pool = None
+_state_lock = threading.Lock()
+
+
+def _shared():
+    global _budget, _pool
+    with _state_lock:
+        if _pool is None:
+            _budget = HedgeBudget(_setting("LLM_HEDGE_BUDGET", 0.1),
+                                  _setting("LLM_HEDGE_BURST", 5.0))
+            _pool = ThreadPoolExecutor(_setting("LLM_MAX_WORKERS", 32),
+                                       thread_name_prefix="llm")
+        return _budget, _pool
+
+
+def hedge_delay(endpoint):
+    """Seconds to wait before hedging a call to ``endpoint``; None to never hedge."""
+    if not _setting("LLM_HEDGE_ENABLED", True):
+        return None
+    p = _windows[endpoint].percentile(_setting("LLM_HEDGE_PERCENTILE", 95),
+                                      _setting("LLM_HEDGE_MIN_SAMPLES", 20))
+    if p is None:
+        return None
+    return max(p, _setting("LLM_HEDGE_MIN_DELAY", 0.1))
+
+
+def _attempt(pool, backend, endpoint, system_instruction, contents, deadline):
+    cancel = threading.Event()
+
+    def call():
+        started = time.monotonic()
+        with metrics.track_upstream(backend.upstream):
+            response = backend.generate(system_instruction, contents,
+                                        max(0.1, deadline - started), cancel)
+        metrics.record_llm_usage(backend.upstream, response.prompt_tokens,
+                                 response.response_tokens)
+        _windows[endpoint].add(time.monotonic() - started)
+        return response
+
+    future = pool.submit(call)
+    future.cancel_event = cancel
+    return future
+
+
+def generate(endpoint, system_instruction, contents, timeout=None):
+    """
+    Ask the configured backend; returns an ``LLMResponse``.
+    Raises ``LLMTimeout`` past the deadline, or the last attempt's error.
+    """
+    backend = get_backend()
+    budget, pool = _shared()
+    timeout = timeout or _setting("LLM_TIMEOUT_SECONDS", 30)
+    deadline = time.monotonic() + timeout
+    budget.earn()
+
+    primary = _attempt(pool, backend, endpoint, system_instruction, contents, deadline)
+    pending = {primary}
+    hedge = None
+    delay = hedge_delay(endpoint)
+    if delay is not None and delay < timeout:
+        done, _ = wait(pending, timeout=delay)
+        if not done:
+            if budget.spend():
+                hedge = _attempt(pool, backend, endpoint, system_instruction, contents,
+                                 deadline)
+                pending.add(hedge)
+                metrics.inc(metrics.LLM_HEDGES, endpoint=endpoint, outcome="sent")
+            else:
+                metrics.inc(metrics.LLM_HEDGES, endpoint=endpoint, outcome="over_budget")
+
+    winner, error = None, None
+    while pending and winner is None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                winner = future
+                break
+            error = future.exception()
+
+    for future in pending:
+        future.cancel_event.set()
+        future.cancel()
+    if hedge is not None and winner is not None:
+        metrics.inc(metrics.LLM_HEDGES, endpoint=endpoint,
+                    outcome="won" if winner is hedge else "lost")
+
+    if winner is not None:
+        return winner.result()
+    if error is not None and not pending:
+        raise error
+    raise LLMTimeout(f"No answer from {backend.upstream} within {timeout:.0f}s")
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.ingredients import store_meal_ingredients
+from core.models import Meal
+
+
+class Command(BaseCommand):
+    help = "Parse Meal.ingredients into MealIngredient rows (run after importing meals)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Re-parse every meal, not just meals without structured rows.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Meals parsed and written per transaction.')
+
+    def handle(self, *args, **options):
+        meals = Meal.objects.order_by('id').only('id', 'ingredients')
+        if not options['all']:
+            meals = meals.filter(ingredient_items__isnull=True)
+
+        started = time.perf_counter()
+        chunk_size = options['chunk_size']
+        total_meals = total_rows = 0
+        last_id = 0
+        while True:
+            # Keyset pagination: the filter above changes as rows are written
+            chunk = list(meals.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+            with transaction.atomic():
+                total_rows += store_meal_ingredients(chunk)
+            total_meals += len(chunk)
+            last_id = chunk[-1].id
+            self.stdout.write(f"  {total_meals} meals parsed")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {total_rows} ingredients for {total_meals} meals in {elapsed:.1f}s"))
@@ -0,0 +1,119 @@
+import os
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.sqlite_tuning import apply_pragmas, configured_pragmas
+
+
+# Roughly what the busiest endpoints do: HomeRecipes / RecentRecipeViews
+# reads against RecipeDetail's view logging
+READ_SQL = [
+    "SELECT id, title, image FROM core_meal ORDER BY id DESC LIMIT 20",
+    "SELECT meal_id, viewed_at FROM core_recipeview WHERE user_id = ? "
+    "ORDER BY viewed_at DESC LIMIT 10",
+]
+WRITE_SQL = ("INSERT INTO core_recipeview (user_id, meal_id, mealid, viewed_at) "
+             "VALUES (?, ?, ?, datetime('now'))")
+
+# Django's stock SQLite setup: rollback journal, 5 s Python-level timeout
+STOCK_PRAGMAS = {"journal_mode": "delete", "synchronous": "full"}
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = ("Compare read/write concurrency on a copy of the SQLite database "
+            "with stock settings and with SQLITE_PRAGMAS.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=5.0,
+                            help='Duration of each run.')
+        parser.add_argument('--timeout', type=float, default=5.0,
+                            help='sqlite3 connect() timeout for the stock run.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            self.stderr.write("The default database is not SQLite.")
+            return
+
+        workdir = tempfile.mkdtemp(prefix="sqlite-bench-")
+        try:
+            source = sqlite3.connect(connection.settings_dict["NAME"])
+            user_id, meal_id, mealid = source.execute(
+                "SELECT u.id, m.id, m.mealid FROM core_user u, core_meal m LIMIT 1"
+            ).fetchone() or (1, 1, "bench")
+            runs = [("stock", STOCK_PRAGMAS, options['timeout']),
+                    ("tuned", configured_pragmas(), 0)]
+            for label, pragmas, timeout in runs:
+                path = os.path.join(workdir, f"{label}.sqlite3")
+                target = sqlite3.connect(path)
+                source.backup(target)
+                apply_pragmas(target, pragmas)   # journal_mode sticks to the file
+                target.close()
+                stats = self.run(path, pragmas, timeout, user_id, meal_id, mealid, options)
+                self.report(label, stats, options['seconds'])
+            source.close()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def run(self, path, pragmas, timeout, user_id, meal_id, mealid, options):
+        stats = {"read": [], "write": [], "read_errors": 0, "write_errors": 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['seconds']
+
+        def worker(role):
+            db = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+            apply_pragmas(db, {k: v for k, v in pragmas.items() if k != "journal_mode"})
+            latencies, errors = [], 0
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    if role == "read":
+                        db.execute(READ_SQL[0]).fetchall()
+                        db.execute(READ_SQL[1], (user_id,)).fetchall()
+                    else:
+                        db.execute(WRITE_SQL, (user_id, meal_id, mealid))
+                        db.commit()
+                    latencies.append(time.perf_counter() - started)
+                except sqlite3.OperationalError:
+                    # "database is locked"
+                    errors += 1
+                    db.rollback()
+            db.close()
+            with lock:
+                stats[role].extend(latencies)
+                stats[f"{role}_errors"] += errors
+
+        threads = ([threading.Thread(target=worker, args=("read",))
+                    for _ in range(options['readers'])] +
+                   [threading.Thread(target=worker, args=("write",))
+                    for _ in range(options['writers'])])
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return stats
+
+    def report(self, label, stats, seconds):
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        for role in ("read", "write"):
+            samples = stats[role]
+            self.stdout.write(
+                f"  {role:5}  {len(samples) / seconds:8.0f} ops/s  "
+                f"p50 {statistics.median(samples) * 1000 if samples else 0:7.2f} ms  "
+                f"p95 {_percentile(samples, 95) * 1000:7.2f} ms  "
+                f"locked errors {stats[f'{role}_errors']}")
@@ -0,0 +1,71 @@
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# What a web worker does before serving its first request
+STARTUP = ("import os, django; "
+           "os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chefgenie.settings'); "
+           "django.setup(); import chefgenie.urls")
+WARM_UP = "; from api import llm; llm.warm_up()"
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+\d+ \| \s*(\S+)")
+
+
+class Command(BaseCommand):
+    help = ("Measure process startup (settings, apps, URLconf) in fresh interpreters "
+            "and list the slowest packages, with and without loading the LLM SDK.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Cold starts per variant; the median is reported.')
+        parser.add_argument('--top', type=int, default=15,
+                            help='Slowest packages to list.')
+
+    def run_once(self, code):
+        env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        elapsed = time.perf_counter() - started
+        if result.returncode != 0:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+        return elapsed, result.stderr
+
+    def by_package(self, report):
+        """Import time per top-level package: the sum of its modules' own (self) time."""
+        totals = {}
+        for line in report.splitlines():
+            match = IMPORT_LINE.match(line)
+            if match:
+                package = match.group(2).split(".")[0]
+                totals[package] = totals.get(package, 0) + int(match.group(1))
+        return sorted(((us, package) for package, us in totals.items()), reverse=True)
+
+    def handle(self, *args, **options):
+        repeat = max(1, options['repeat'])
+        variants = [("startup", STARTUP), ("startup + LLM warm-up", STARTUP + WARM_UP)]
+        medians = {}
+        reports = {}
+        for label, code in variants:
+            self.run_once(code)   # let the OS page cache settle
+            runs = [self.run_once(code) for _ in range(repeat)]
+            medians[label] = statistics.median(elapsed for elapsed, _ in runs)
+            reports[label] = runs[-1][1]
+            self.stdout.write(f"{label:<24}{medians[label] * 1000:>9.0f} ms "
+                              f"(median of {repeat} cold starts)")
+
+        cost = medians["startup + LLM warm-up"] - medians["startup"]
+        self.stdout.write(f"{'first AI request pays':<24}{cost * 1000:>9.0f} ms "
+                          "(unless LLM_WARM_UP is set)")
+
+        for label, _ in variants:
+            self.stdout.write(f"\nSlowest packages to import ({label}):")
+            for self_us, package in self.by_package(reports[label])[:options['top']]:
+                self.stdout.write(f"  {self_us / 1000:>8.1f} ms  {package}")
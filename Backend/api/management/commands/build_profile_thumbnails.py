@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import jobs, thumbnails
+from core.models import Profile
+
+
+class Command(BaseCommand):
+    help = ("Render thumbnails for profile pictures uploaded before the pipeline existed "
+            "(or after changing PROFILE_THUMBNAIL_SIZES).")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Re-render every picture, not just those without current variants.')
+        parser.add_argument(
+            '--enqueue', action='store_true',
+            help='Queue jobs for the workers instead of rendering here.')
+
+    def handle(self, *args, **options):
+        profiles = Profile.objects.exclude(profile_picture="").exclude(
+            profile_picture__isnull=True).select_related('user').order_by('id')
+        if not options['all']:
+            profiles = [p for p in profiles
+                        if (p.picture_variants or {}).get("source") != p.profile_picture.name]
+
+        started = time.perf_counter()
+        done = failed = 0
+        for profile in profiles:
+            if options['enqueue']:
+                jobs.enqueue("profile_thumbnails", {"profile_id": profile.id}, user=profile.user)
+                done += 1
+                continue
+            body, status_code = thumbnails.build({"profile_id": profile.id})
+            if status_code == 200:
+                done += 1
+            else:
+                failed += 1
+                self.stdout.write(self.style.WARNING(f"  profile {profile.id}: {body['error']}"))
+
+        elapsed = time.perf_counter() - started
+        verb = "Queued" if options['enqueue'] else "Rendered"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} thumbnails for {done} profiles in {elapsed:.1f}s ({failed} failed)"))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import trigram_search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the title trigram table used by typo-tolerant recipe search."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Meals indexed per batch.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        meals, rows = trigram_search.rebuild(
+            chunk_size=options['chunk_size'], stdout=self.stdout)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {meals} titles ({rows} trigrams) in {elapsed:.1f}s"))
@@ -0,0 +1,92 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import synthetic
+from core.models import Favorite, GroceryList, Meal, Profile, RecipeView, User
+
+
+class Command(BaseCommand):
+    help = ("Generate deterministic synthetic users, profiles, meals, favorites, "
+            "recipe views and grocery items for scale testing.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--meals', type=int, default=100000)
+        parser.add_argument('--favorites-per-user', type=int, default=15,
+                            help='Average favorites per user.')
+        parser.add_argument('--views', type=int, default=1000000,
+                            help='Total recipe views.')
+        parser.add_argument('--grocery-items-per-user', type=int, default=5,
+                            help='Average grocery list items per user.')
+        parser.add_argument('--owned-fraction', type=float, default=0.05,
+                            help='Share of meals saved by users (AI recipes) '
+                                 'rather than system recipes.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Rows per bulk_create / transaction.')
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete data previously generated with this seed first.')
+        parser.add_argument('--skip-indexes', action='store_true',
+                            help="Don't rebuild facets, trigrams and parsed ingredients.")
+
+    def handle(self, *args, **options):
+        seed = options['seed']
+        chunk = options['chunk_size']
+        email_prefix = f"synthetic-{seed}-"
+        meal_prefix = f"SYN{seed}-"
+        rng = random.Random(seed)
+
+        existing = User.objects.filter(email__startswith=email_prefix)
+        if options['clear']:
+            self.stdout.write("Removing earlier synthetic data...")
+            # Users cascade to their profiles, favorites, views, lists and meals
+            existing.delete()
+            Meal.objects.filter(mealid__startswith=meal_prefix).delete()
+        elif existing.exists():
+            raise CommandError(f"Synthetic data for seed {seed} already exists; "
+                               "pass --clear to regenerate it or use another --seed.")
+
+        started = time.perf_counter()
+        total = 0
+
+        def stage(label, model, rows, timestamps=()):
+            nonlocal total
+            began = time.perf_counter()
+            with synthetic.explicit_timestamps(model, *timestamps):
+                count = synthetic.bulk_insert(model, rows, chunk_size=chunk)
+            elapsed = time.perf_counter() - began
+            total += count
+            self.stdout.write(f"  {label:<14}{count:>10} rows in {elapsed:6.1f}s "
+                              f"({count / elapsed if elapsed else 0:,.0f} rows/s)")
+
+        stage("users", User, synthetic.make_users(rng, options['users'], prefix=email_prefix))
+        user_ids = list(User.objects.filter(email__startswith=email_prefix)
+                        .order_by("id").values_list("id", flat=True))
+        stage("profiles", Profile, synthetic.make_profiles(rng, user_ids))
+        stage("meals", Meal, synthetic.make_meals(
+            rng, options['meals'], prefix=meal_prefix, owners=user_ids,
+            owned_fraction=options['owned_fraction']), ("created_at",))
+
+        # Only recipes everyone can see get favorited / viewed by strangers
+        rows = list(Meal.objects.filter(mealid__startswith=meal_prefix, is_public=True)
+                    .order_by("id").values_list("id", "mealid"))
+        if not rows or not user_ids:
+            raise CommandError("Need at least one user and one public meal.")
+        meal_ids = [meal_id for meal_id, _ in rows]
+        mealids = [mealid for _, mealid in rows]
+        stage("favorites", Favorite, synthetic.make_favorites(
+            rng, user_ids, meal_ids, options['favorites_per_user']), ("created_at",))
+        stage("recipe views", RecipeView, synthetic.make_views(
+            rng, user_ids, meal_ids, mealids, options['views']), ("viewed_at",))
+        stage("grocery items", GroceryList, synthetic.make_grocery_items(
+            rng, user_ids, options['grocery_items_per_user']))
+
+        if not options['skip_indexes']:
+            self.stdout.write("Rebuilding derived tables...")
+            synthetic.refresh_indexes(stdout=self.stdout)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {total} rows in {elapsed:.1f}s (seed {seed})"))
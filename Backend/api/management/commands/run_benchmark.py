@@ -0,0 +1,171 @@
+import json
+import os
+import shutil
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from api import benchmark
+from api.throttling import TokenBucketThrottle
+
+
+def _levels(value):
+    try:
+        levels = [int(v) for v in value.split(",") if v.strip()]
+    except ValueError:
+        raise CommandError("--concurrency takes comma-separated integers, e.g. 1,8,32")
+    if not levels or min(levels) < 1:
+        raise CommandError("--concurrency levels must be positive")
+    return levels
+
+
+class Command(BaseCommand):
+    help = ("Load-test every API endpoint against a seeded benchmark database with a "
+            "fake LLM backend and stubbed Spoonacular, and compare with a stored baseline.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meals', type=int, default=30000)
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--views', type=int, default=200000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--reseed', action='store_true',
+                            help='Recreate the benchmark database even if it matches.')
+        parser.add_argument('--concurrency', default='1,8,32',
+                            help='Comma-separated client concurrency levels.')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Measured requests per scenario and level.')
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--server-threads', type=int, default=16)
+        parser.add_argument('--gemini-latency', type=float, default=0.8,
+                            help='Seconds the fake LLM takes to answer.')
+        parser.add_argument('--gemini-tail-latency', type=float, default=0.0,
+                            help='Seconds taken by the slow tail of LLM calls.')
+        parser.add_argument('--gemini-tail-rate', type=float, default=0.0,
+                            help='Fraction of LLM calls that take --gemini-tail-latency.')
+        parser.add_argument('--spoonacular-latency', type=float, default=0.3)
+        parser.add_argument('--only', default='',
+                            help='Comma-separated scenario names to run.')
+        parser.add_argument('--keep-limits', action='store_true',
+                            help='Leave AI throttles and upstream concurrency caps on.')
+        parser.add_argument('--baseline', default=None,
+                            help='Baseline file (default var/benchmark/baseline.json).')
+        parser.add_argument('--save-baseline', action='store_true')
+        parser.add_argument('--max-regression', type=float, default=0.25,
+                            help='Fail if p95 grows or throughput drops by more than '
+                                 'this fraction against the baseline.')
+        parser.add_argument('--output', default=None,
+                            help='Also write this run\'s report to a JSON file.')
+
+    def handle(self, *args, **options):
+        levels = _levels(options['concurrency'])
+        directory = benchmark.bench_dir()
+        os.makedirs(directory, exist_ok=True)
+        baseline_path = options['baseline'] or os.path.join(directory, "baseline.json")
+
+        dataset = {key: options[key] for key in
+                   ('meals', 'users', 'favorites_per_user', 'views', 'seed')}
+        self.prepare_database(directory, dataset, options['reseed'])
+
+        settings.ALLOWED_HOSTS = ["127.0.0.1", "localhost"]
+        settings.METRICS_DIR = os.path.join(directory, "metrics")
+        settings.PROFILE_DIR = os.path.join(directory, "profiles")
+        # Start cold every run so image proxy numbers are comparable
+        settings.IMAGE_PROXY_DIR = os.path.join(directory, "image-cache")
+        shutil.rmtree(settings.IMAGE_PROXY_DIR, ignore_errors=True)
+        if not options['keep_limits']:
+            TokenBucketThrottle.THROTTLE_RATES = {"ai_burst": None, "ai_sustained": None}
+            settings.UPSTREAM_CONCURRENCY = {}
+        benchmark.install_stubs(options['gemini_latency'], options['spoonacular_latency'],
+                                seed=options['seed'],
+                                tail_latency=options['gemini_tail_latency'],
+                                tail_rate=options['gemini_tail_rate'])
+
+        server, base_url = benchmark.start_server(options['server_threads'])
+        try:
+            ctx = benchmark.BenchContext(base_url, seed=options['seed'])
+            ctx.setup()
+            selected = {name.strip() for name in options['only'].split(",") if name.strip()}
+            scenarios = [s for s in benchmark.scenarios() if not selected or s.name in selected]
+            if not scenarios:
+                raise CommandError(f"No scenarios match --only {options['only']}")
+
+            results = {}
+            self.stdout.write(f"{'scenario':<28}{'conc':>5}{'p50 ms':>10}{'p95 ms':>10}"
+                              f"{'p99 ms':>10}{'req/s':>9}{'queries':>9}{'5xx':>6}")
+            for level in levels:
+                for scenario in scenarios:
+                    summary = benchmark.run_scenario(ctx, scenario, level, options['requests'],
+                                                     options['warmup'])
+                    results[f"{scenario.name}@{level}"] = summary
+                    self.stdout.write(
+                        f"{scenario.name:<28}{level:>5}{summary['p50_ms']:>10}"
+                        f"{summary['p95_ms']:>10}{summary['p99_ms']:>10}{summary['rps']:>9}"
+                        f"{summary['queries']:>9}{summary['errors']:>6}")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        config = dict(dataset, concurrency=levels, requests=options['requests'],
+                      gemini_latency=options['gemini_latency'],
+                      gemini_tail_latency=options['gemini_tail_latency'],
+                      gemini_tail_rate=options['gemini_tail_rate'],
+                      spoonacular_latency=options['spoonacular_latency'],
+                      server_threads=options['server_threads'],
+                      keep_limits=options['keep_limits'], created=time.strftime("%Y-%m-%d %H:%M:%S"))
+        if options['output']:
+            benchmark.save_report(options['output'], config, results)
+        if options['save_baseline']:
+            benchmark.save_report(baseline_path, config, results)
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {baseline_path}"))
+            return
+        if os.path.exists(baseline_path):
+            self.compare(baseline_path, config, results, options['max_regression'])
+
+    def prepare_database(self, directory, dataset, reseed):
+        """Switch to the benchmark database, (re)seeding it when the dataset changed."""
+        path = os.path.join(directory, "bench.sqlite3")
+        meta_path = os.path.join(directory, "dataset.json")
+        current = None
+        if os.path.exists(meta_path) and os.path.exists(path):
+            with open(meta_path, encoding="utf-8") as f:
+                current = json.load(f)
+        fresh = reseed or current != dataset
+        if fresh:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+        benchmark.use_database(path)
+        call_command("migrate", verbosity=0)
+        if not fresh:
+            return
+        self.stdout.write(f"Seeding benchmark database ({dataset['meals']} meals, "
+                          f"{dataset['users']} users, {dataset['views']} views)...")
+        started = time.perf_counter()
+        benchmark.seed_catalog(dataset['meals'], dataset['users'],
+                               dataset['favorites_per_user'], dataset['views'], dataset['seed'])
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(dataset, f)
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded in {time.perf_counter() - started:.1f}s"))
+
+    def compare(self, baseline_path, config, results, max_regression):
+        baseline = benchmark.load_baseline(baseline_path)
+        base_config = {k: v for k, v in baseline["config"].items() if k != "created"}
+        run_config = {k: v for k, v in config.items() if k != "created"}
+        if base_config != run_config:
+            self.stdout.write(self.style.WARNING(
+                "Baseline was recorded with different settings; deltas may not be comparable."))
+        rows, regressions = benchmark.compare(results, baseline["results"], max_regression)
+        self.stdout.write(f"\nAgainst baseline from {baseline['config'].get('created')}:")
+        for key, before, now, p95_change, rps_change, regressed in rows:
+            line = (f"{key:<33}p95 {before['p95_ms']:>9} -> {now['p95_ms']:<9} ({p95_change:+.0%})"
+                    f"   req/s {before['rps']:>8} -> {now['rps']:<8} ({rps_change:+.0%})")
+            self.stdout.write(self.style.ERROR(line) if regressed else line)
+        if regressions:
+            raise CommandError(f"{len(regressions)} scenario(s) regressed by more than "
+                               f"{max_regression:.0%}: {', '.join(regressions)}")
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
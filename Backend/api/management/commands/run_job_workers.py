@@ -0,0 +1,45 @@
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import jobs
+
+
+class Command(BaseCommand):
+    help = ("Run background workers for queued jobs (GeminiRecipeDetail, GenerateGroceryList, "
+            "profile picture thumbnails).")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=None,
+            help='Worker processes to start (default JOB_WORKERS).')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit when the queue is empty instead of polling.')
+
+    def handle(self, *args, **options):
+        processes = options['processes'] or settings.JOB_WORKERS
+        if processes <= 1:
+            self.stdout.write(f"Worker {jobs.worker_name()} started")
+            try:
+                jobs.work(once=options['once'], stdout=self.stdout)
+            except KeyboardInterrupt:
+                pass
+            return
+
+        # One OS process per worker: a slow or stuck Gemini call only ties up its own
+        command = [sys.executable, sys.argv[0], 'run_job_workers', '--processes', '1']
+        if options['once']:
+            command.append('--once')
+        children = [subprocess.Popen(command) for _ in range(processes)]
+        self.stdout.write(self.style.SUCCESS(f"Started {processes} job workers"))
+        try:
+            for child in children:
+                child.wait()
+        except KeyboardInterrupt:
+            for child in children:
+                child.terminate()
+            for child in children:
+                child.wait()
@@ -0,0 +1,47 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from api.db_router import REPLICA
+
+
+class Command(BaseCommand):
+    help = ("Copy the primary SQLite database into the replica file "
+            "(once, or every --interval seconds).")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Keep syncing every N seconds (0 = sync once and exit).')
+        parser.add_argument(
+            '--pages', type=int, default=1024,
+            help=('Pages copied per backup step. The primary is only read-locked '
+                  'during a step, but a write to it restarts the copy.'))
+
+    def handle(self, *args, **options):
+        if REPLICA not in connections.databases:
+            raise CommandError("No 'replica' database configured (set DB_REPLICA_NAME).")
+        primary = connections.databases["default"]
+        replica = connections.databases[REPLICA]
+        if primary["ENGINE"] != replica["ENGINE"] or "sqlite3" not in primary["ENGINE"]:
+            raise CommandError("sync_replica only handles SQLite; use the server's replication.")
+
+        while True:
+            started = time.perf_counter()
+            source = sqlite3.connect(primary["NAME"])
+            target = sqlite3.connect(replica["NAME"], timeout=30)
+            try:
+                # Online backup: a consistent snapshot written in place, so
+                # replica connections held open by workers stay valid
+                source.backup(target, pages=options['pages'])
+            finally:
+                target.close()
+                source.close()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(
+                f"Replica synced in {elapsed * 1000:.0f} ms"))
+            if not options['interval']:
+                break
+            time.sleep(max(0.0, options['interval'] - elapsed))
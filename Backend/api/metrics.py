@@ -0,0 +1,347 @@
+"""
+Prometheus-style instrumentation without extra dependencies.
+
+Each process accumulates its counters and histograms in memory and writes a
+snapshot to ``METRICS_DIR/<pid>-<start>.json`` every
+``METRICS_FLUSH_SECONDS`` from a daemon thread.  ``GET /metrics`` sums every snapshot, so numbers are correct however
+many gunicorn/runserver processes serve traffic.  Snapshots of exited
+processes are folded into ``retired.json`` and deleted (``prune``), so the
+directory doesn't grow with worker restarts and counters never go
+backwards.  The directory must be local to one host, since liveness is
+checked by PID; clear it on deploy, as with prometheus_client's
+multiprocess mode.
+
+``MetricsMiddleware`` times every request and counts its SQL queries;
+``track_upstream`` wraps calls to the LLM backend / Spoonacular; ``cache_result``
+records cache hits and misses.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+try:
+    import fcntl
+except ImportError:  # Windows: no PID checks, snapshots are kept
+    fcntl = None
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UPSTREAM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+RETIRED = "retired.json"
+
+
+class Metric:
+    def __init__(self, name, kind, help_text, labels, buckets=None):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+
+
+REGISTRY = {}
+
+
+def metrics_dir():
+    return str(getattr(settings, "METRICS_DIR", settings.BASE_DIR / "var" / "metrics"))
+
+
+def _register(name, kind, help_text, labels, buckets=None):
+    REGISTRY[name] = Metric(name, kind, help_text, labels, buckets)
+    return name
+
+
+REQUEST_LATENCY = _register(
+    "http_request_duration_seconds", "histogram",
+    "Request latency by view, method and status code.",
+    ("view", "method", "status"), LATENCY_BUCKETS)
+REQUEST_QUERIES = _register(
+    "http_request_db_queries", "histogram",
+    "SQL queries executed per request, by view.", ("view",), QUERY_BUCKETS)
+UPSTREAM_LATENCY = _register(
+    "upstream_request_duration_seconds", "histogram",
+    "Latency of calls to external APIs.", ("upstream",), UPSTREAM_BUCKETS)
+UPSTREAM_ERRORS = _register(
+    "upstream_errors_total", "counter",
+    "Failed calls to external APIs, by exception type.", ("upstream", "error"))
+LLM_TOKENS = _register(
+    "llm_tokens_total", "counter",
+    "LLM tokens used, as reported by the backend (hedged duplicates included).",
+    ("upstream", "type"))
+LLM_HEDGES = _register(
+    "llm_hedges_total", "counter",
+    "Hedged LLM requests by endpoint and outcome (sent / won / lost / over_budget).",
+    ("endpoint", "outcome"))
+CACHE_REQUESTS = _register(
+    "cache_requests_total", "counter",
+    "Cache lookups by cache and result (hit / miss).", ("cache", "result"))
+
+
+class _ProcessStore:
+    """This process's values: ``{(metric, labels): float | [buckets..., sum, count]}``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.values = {}
+        self.path = None
+        self.pid = None
+
+    def _ensure_started(self):
+        # Also true in a forked child, which must not write to its parent's file
+        if self.pid == os.getpid():
+            return
+        directory = metrics_dir()
+        os.makedirs(directory, exist_ok=True)
+        self.values = {}
+        self.pid = os.getpid()
+        self.path = os.path.join(directory, f"{self.pid}-{time.time_ns()}.json")
+        threading.Thread(target=self._flush_loop, daemon=True).start()
+
+    def inc(self, name, labels, amount=1.0):
+        with self._lock:
+            self._ensure_started()
+            key = (name, labels)
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def observe(self, name, labels, value):
+        buckets = REGISTRY[name].buckets
+        with self._lock:
+            self._ensure_started()
+            key = (name, labels)
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = [0.0] * (len(buckets) + 3)
+            # Per-bucket counts here; made cumulative when rendered
+            series[bisect_left(buckets, value)] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def flush(self):
+        with self._lock:
+            if self.path is None:
+                return
+            payload = [[name, list(labels), value] for (name, labels), value in self.values.items()]
+            path = self.path
+        # Per-thread temp file: request threads calling collect() flush concurrently
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        os.replace(tmp, path)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(getattr(settings, "METRICS_FLUSH_SECONDS", 5))
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"Metrics flush failed: {e}")
+
+
+_store = _ProcessStore()
+
+
+def _enabled():
+    return getattr(settings, "METRICS_ENABLED", True)
+
+
+def inc(name, amount=1.0, **labels):
+    if _enabled():
+        _store.inc(name, tuple(str(labels[l]) for l in REGISTRY[name].labels), amount)
+
+
+def observe(name, value, **labels):
+    if _enabled():
+        _store.observe(name, tuple(str(labels[l]) for l in REGISTRY[name].labels), value)
+
+
+def cache_result(cache, hit):
+    inc(CACHE_REQUESTS, cache=cache, result="hit" if hit else "miss")
+
+
+@contextmanager
+def track_upstream(upstream):
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        inc(UPSTREAM_ERRORS, upstream=upstream, error=type(e).__name__)
+        raise
+    finally:
+        observe(UPSTREAM_LATENCY, time.perf_counter() - started, upstream=upstream)
+
+
+def record_http_error(upstream, response):
+    """Count 4xx/5xx replies, which ``requests`` doesn't raise for."""
+    if response.status_code >= 400:
+        inc(UPSTREAM_ERRORS, upstream=upstream, error=f"HTTP {response.status_code}")
+
+
+def record_llm_usage(upstream, prompt_tokens, response_tokens):
+    for label, count in (("prompt", prompt_tokens), ("response", response_tokens)):
+        if count:
+            inc(LLM_TOKENS, count, upstream=upstream, type=label)
+
+
+# -- exposition ---------------------------------------------------------------
+
+def _read(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None   # removed while we were listing
+
+
+def _add(totals, payload):
+    for name, labels, value in payload:
+        if name not in REGISTRY:
+            continue
+        key = (name, tuple(labels))
+        if isinstance(value, list):
+            current = totals.setdefault(key, [0.0] * len(value))
+            for i, v in enumerate(value):
+                current[i] += v
+        else:
+            totals[key] = totals.get(key, 0.0) + value
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True   # exists, owned by another user
+    return True
+
+
+def prune():
+    """Fold the snapshots of exited processes into ``retired.json`` and delete them."""
+    directory = metrics_dir()
+    if fcntl is None or not os.path.isdir(directory):
+        return
+    dead = []
+    for filename in os.listdir(directory):
+        pid = filename.split("-", 1)[0]
+        if (filename.endswith(".json") and pid.isdigit()
+                and int(pid) != os.getpid() and not _pid_alive(int(pid))):
+            dead.append(os.path.join(directory, filename))
+    if not dead:
+        return
+    # Serializes scrapes from several workers, so each file is folded once
+    with open(os.path.join(directory, "retired.lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        totals = {}
+        _add(totals, _read(os.path.join(directory, RETIRED)) or [])
+        folded = []
+        for path in dead:
+            payload = _read(path)
+            if payload is not None:
+                _add(totals, payload)
+                folded.append(path)
+        if not folded:
+            return
+        tmp = os.path.join(directory, f"{RETIRED}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump([[name, list(labels), value]
+                       for (name, labels), value in totals.items()], f)
+        os.replace(tmp, os.path.join(directory, RETIRED))
+        for path in folded:
+            os.remove(path)
+
+
+def collect():
+    """Sum the snapshots of every process (this one flushed first)."""
+    _store.flush()
+    directory = metrics_dir()
+    totals = {}
+    if not os.path.isdir(directory):
+        return totals
+    try:
+        prune()
+    except OSError as e:
+        print(f"Metrics prune failed: {e}")
+    for filename in os.listdir(directory):
+        if filename.endswith(".json"):
+            _add(totals, _read(os.path.join(directory, filename)) or [])
+    return totals
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def render():
+    """All metrics in the Prometheus text exposition format (0.0.4)."""
+    totals = collect()
+    lines = []
+    for metric in REGISTRY.values():
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for (name, labels), value in sorted(totals.items()):
+            if name != metric.name:
+                continue
+            if metric.kind == "counter":
+                lines.append(f"{name}{_format_labels(metric.labels, labels)} {_number(value)}")
+                continue
+            cumulative = 0.0
+            bounds = [_number(b) for b in metric.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, value[:-2]):
+                cumulative += count
+                lines.append(f"{name}_bucket"
+                             f"{_format_labels(metric.labels, labels, [('le', bound)])} "
+                             f"{_number(cumulative)}")
+            lines.append(f"{name}_sum{_format_labels(metric.labels, labels)} {value[-2]!r}")
+            lines.append(f"{name}_count{_format_labels(metric.labels, labels)} "
+                         f"{_number(value[-1])}")
+    return "\n".join(lines) + "\n"
+
+
+# -- request instrumentation ----------------------------------------------------
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not _enabled():
+            return self.get_response(request)
+
+        queries = [0]
+
+        def count_query(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(count_query))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, "resolver_match", None)
+        # Route names only, never raw paths, to keep label cardinality bounded
+        view = (match.view_name or match._func_path) if match else "unmatched"
+        if view != "metrics":
+            observe(REQUEST_LATENCY, elapsed, view=view, method=request.method,
+                    status=response.status_code)
+            observe(REQUEST_QUERIES, queries[0], view=view)
+        return response
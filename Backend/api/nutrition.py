@@ -0,0 +1,214 @@
+"""
+Local, deterministic nutrition estimates.
+
+The bundled reference table (``api/data/nutrients.csv``, values per 100 g) is
+loaded once per process into compact float32 arrays.  Ingredients (the
+``MealIngredient`` rows parsed at save time, or raw lines from chat context)
+are turned into a weight in grams and matched to a table row, then a whole
+recipe is scored with one gather + multiply over those arrays.  Results are
+cached per meal in ``MealNutrition`` and recomputed when the meal's
+ingredients (or the reference table) change.
+"""
+import csv
+import hashlib
+import json
+import os
+from fractions import Fraction
+from functools import lru_cache
+
+import numpy as np
+
+from core.models import MealNutrition
+from . import metrics
+from .ingredients import canonical_name, parse_ingredient_line
+
+
+NUTRIENTS = ("calories", "protein", "fat", "carbs", "fiber")
+
+TABLE_PATH = os.path.join(os.path.dirname(__file__), "data", "nutrients.csv")
+
+# Grams per unit for weight units, millilitres per unit for volume units
+UNIT_GRAMS = {"mg": 0.001, "g": 1.0, "kg": 1000.0, "oz": 28.35, "lb": 453.6,
+              "pinch": 0.4, "dash": 0.6, "can": 400.0, "packet": 200.0}
+UNIT_ML = {"ml": 1.0, "l": 1000.0, "tsp": 5.0, "tbsp": 15.0, "cup": 240.0,
+           "bottle": 500.0}
+
+# Used when a line has no usable amount ("Salt", "Oil for frying")
+UNMEASURED_GRAMS = 5.0
+DEFAULT_PIECE_GRAMS = 100.0
+
+
+class NutrientTable:
+    def __init__(self, path):
+        names, values, piece, density = [], [], [], []
+        with open(path, encoding="utf-8") as f:
+            raw = f.read()
+        rows = csv.DictReader(line for line in raw.splitlines()
+                              if line and not line.startswith("#"))
+        for row in rows:
+            names.append(row["name"])
+            values.append([float(row[col]) for col in
+                           ("kcal", "protein", "fat", "carbs", "fiber")])
+            piece.append(float(row["piece_g"]) if row["piece_g"] else np.nan)
+            density.append(float(row["density"]) if row["density"] else 1.0)
+
+        self.names = names
+        self.row_of = {name: i for i, name in enumerate(names)}
+        self.values = np.asarray(values, dtype=np.float32)     # (N, 5) per 100 g
+        self.piece_grams = np.asarray(piece, dtype=np.float32)
+        self.density = np.asarray(density, dtype=np.float32)
+        self.version = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+    @lru_cache(maxsize=8192)
+    def match(self, key):
+        """
+        Best table row for a canonical ingredient name, or None.
+        Tries the full name, then drops leading words ("lean minced beef" ->
+        "minced beef"), then trailing words ("chicken stock cube" -> "chicken stock").
+        """
+        if not key:
+            return None
+        words = key.split()
+        for i in range(len(words)):
+            row = self.row_of.get(" ".join(words[i:]))
+            if row is not None:
+                return row
+        for j in range(len(words) - 1, 0, -1):
+            row = self.row_of.get(" ".join(words[:j]))
+            if row is not None:
+                return row
+        return None
+
+
+@lru_cache(maxsize=1)
+def get_table():
+    return NutrientTable(TABLE_PATH)
+
+
+def _quantity_value(quantity):
+    if not quantity:
+        return None
+    try:
+        return float(sum(Fraction(part) for part in quantity.split()))
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def _grams(table, row, amount, unit):
+    if unit in UNIT_GRAMS:
+        return (amount or 1.0) * UNIT_GRAMS[unit]
+    if unit in UNIT_ML:
+        return (amount or 1.0) * UNIT_ML[unit] * float(table.density[row])
+    piece = table.piece_grams[row]
+    piece = DEFAULT_PIECE_GRAMS if np.isnan(piece) else float(piece)
+    if amount is None:
+        # "Salt", "Oil" - a token amount; whole items count as one piece
+        return piece if not np.isnan(table.piece_grams[row]) else UNMEASURED_GRAMS
+    return amount * piece
+
+
+def analyze(lines):
+    """
+    Estimate nutrients for a list of raw ingredient lines.
+    Returns ``{"totals": {...}, "ingredients": [...], "unmatched": [...]}``.
+    """
+    items = []
+    for line in lines or []:
+        quantity, unit, name = parse_ingredient_line(line)
+        items.append((line, _quantity_value(quantity), unit, canonical_name(name)))
+    return _score(items)
+
+
+def analyze_stored(meal):
+    """``analyze`` for a saved meal, from its ``MealIngredient`` rows."""
+    return _score([
+        (item.original_text, float(item.quantity) if item.quantity is not None else None,
+         item.unit, item.name)
+        for item in meal.ingredient_items.all()])
+
+
+def _score(items):
+    """``items`` are ``(text, amount, unit, canonical name)``."""
+    table = get_table()
+    matched_rows, grams, breakdown, unmatched = [], [], [], []
+    for text, amount, unit, key in items:
+        row = table.match(key)
+        if row is None:
+            unmatched.append(text)
+            continue
+        matched_rows.append(row)
+        grams.append(_grams(table, row, amount, unit))
+        breakdown.append({"text": text, "matched": table.names[row]})
+
+    totals = dict.fromkeys(NUTRIENTS, 0.0)
+    if matched_rows:
+        weights = np.asarray(grams, dtype=np.float32)
+        per_line = table.values[matched_rows] * (weights[:, None] / 100.0)
+        for entry, weight, values in zip(breakdown, weights, per_line):
+            entry["grams"] = round(float(weight), 1)
+            entry.update({n: round(float(v), 1) for n, v in zip(NUTRIENTS, values)})
+        totals = {n: round(float(v), 1)
+                  for n, v in zip(NUTRIENTS, per_line.sum(axis=0))}
+
+    return {"totals": totals, "ingredients": breakdown, "unmatched": unmatched}
+
+
+def fingerprint(ingredients):
+    payload = json.dumps(ingredients or [], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(
+        (get_table().version + payload).encode("utf-8")).hexdigest()
+
+
+def meal_nutrition(meal):
+    """Cached nutrition for a Meal; recomputed when its ingredients change."""
+    current = fingerprint(meal.ingredients)
+    cached = MealNutrition.objects.filter(meal=meal).first()
+    metrics.cache_result("nutrition", bool(cached and cached.fingerprint == current))
+    if cached and cached.fingerprint == current:
+        return {"totals": {n: getattr(cached, n) for n in NUTRIENTS},
+                "ingredients": cached.breakdown["ingredients"],
+                "unmatched": cached.breakdown["unmatched"]}
+
+    result = analyze_stored(meal)
+    MealNutrition.objects.update_or_create(
+        meal=meal,
+        defaults={
+            "fingerprint": current,
+            "breakdown": {"ingredients": result["ingredients"],
+                          "unmatched": result["unmatched"]},
+            **result["totals"],
+        },
+    )
+    return result
+
+
+def scale(totals, servings):
+    return {n: round(v / servings, 1) for n, v in totals.items()}
+
+
+def chat_context(result):
+    """Nutrition block injected into RecipeAIChat so Gemini quotes, not guesses."""
+    t = result["totals"]
+    text = (
+        "Nutrition facts (computed locally from the ingredient list, whole recipe): "
+        f"{t['calories']:.0f} kcal, {t['protein']:.1f} g protein, {t['fat']:.1f} g fat, "
+        f"{t['carbs']:.1f} g carbohydrates, {t['fiber']:.1f} g fiber."
+    )
+    if result["unmatched"]:
+        text += " Not included (unknown ingredients): " + ", ".join(result["unmatched"]) + "."
+    return text
+
+
+def ingredients_from_context(text):
+    """Pull the "- item" lines under "Ingredients:" out of a recipe context message."""
+    lines, in_section = [], False
+    for line in (text or "").splitlines():
+        stripped = line.strip()
+        if stripped.lower().startswith("ingredients:"):
+            in_section = True
+            continue
+        if in_section:
+            if not stripped.startswith("- "):
+                break
+            lines.append(stripped[2:].strip())
+    return lines
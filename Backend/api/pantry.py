@@ -0,0 +1,208 @@
+"""
+"What can I cook with what I have" matcher.
+
+Every canonical ingredient name gets a bit position; every meal is kept in
+memory as a row of packed uint64 words.  A pantry becomes one more bitset, and
+ranking the whole catalog is ``popcount(meal & pantry) / popcount(meal)``
+over the matrix - no database scan and no external API.
+
+The index is built lazily per process, kept current in-process by the Meal
+signals in ``api/signals.py``, picks up meals created by other workers every
+``PANTRY_INDEX_REFRESH_SECONDS`` and is fully rebuilt every
+``PANTRY_INDEX_REBUILD_SECONDS``.
+"""
+import threading
+import time
+from functools import lru_cache
+
+import numpy as np
+
+from django.conf import settings
+
+from core.models import Meal
+from .ingredients import canonical_name, ingredient_names
+
+
+# Assumed to be in every kitchen unless the caller opts out
+STAPLES = frozenset({"salt", "water", "pepper", "black pepper"})
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(words):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int32)
+else:  # NumPy < 2.0
+    _BYTE_COUNTS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(words):
+        as_bytes = words.view(np.uint8).reshape(words.shape[:-1] + (-1,))
+        return _BYTE_COUNTS[as_bytes].sum(axis=-1, dtype=np.int32)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class PantryIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built_at = None
+        self._refreshed_at = 0.0
+        self._generation = 0
+        self._reset()
+
+    def _reset(self):
+        # Bit positions are reassigned on rebuild; invalidates _term_bits
+        self._generation += 1
+        self.vocab = {}                                   # ingredient key -> bit
+        self.bits = np.zeros((0, 1), dtype=np.uint64)     # one row per meal slot
+        self.meal_ids = np.zeros(0, dtype=np.int64)
+        self.owner_ids = np.zeros(0, dtype=np.int64)      # 0 = system recipe
+        self.public = np.zeros(0, dtype=bool)
+        self.alive = np.zeros(0, dtype=bool)
+        self.size = 0
+        self.row_of = {}
+        # Highest id seen by a DB sweep.  Signal updates don't move it: other
+        # processes may have committed lower ids this process hasn't loaded yet
+        self.swept_id = 0
+
+    # -- maintenance -----------------------------------------------------
+
+    def _bit(self, key):
+        bit = self.vocab.get(key)
+        if bit is None:
+            bit = self.vocab[key] = len(self.vocab)
+            words = bit // 64 + 1
+            if words > self.bits.shape[1]:
+                self.bits = np.pad(self.bits, ((0, 0), (0, words - self.bits.shape[1])))
+        return bit
+
+    def _grow(self):
+        capacity = max(1024, len(self.meal_ids) * 2)
+        extra = capacity - len(self.meal_ids)
+        self.bits = np.pad(self.bits, ((0, extra), (0, 0)))
+        self.meal_ids = np.pad(self.meal_ids, (0, extra))
+        self.owner_ids = np.pad(self.owner_ids, (0, extra))
+        self.public = np.pad(self.public, (0, extra))
+        self.alive = np.pad(self.alive, (0, extra))
+
+    def _put(self, meal_id, user_id, is_public, names):
+        row = self.row_of.get(meal_id)
+        if row is None:
+            if self.size == len(self.meal_ids):
+                self._grow()
+            row = self.size
+            self.size += 1
+            self.row_of[meal_id] = row
+        self.bits[row] = 0
+        for name in names:
+            bit = self._bit(name)
+            self.bits[row, bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+        self.meal_ids[row] = meal_id
+        self.owner_ids[row] = user_id or 0
+        self.public[row] = bool(is_public)
+        self.alive[row] = True
+
+    def _load(self, queryset):
+        # Meals first: a meal committed in between is picked up by the next sweep
+        rows = list(queryset.values_list("id", "user_id", "is_public"))
+        if not rows:
+            return
+        names = ingredient_names(queryset.filter(id__lte=rows[-1][0]).values("id"))
+        for meal_id, user_id, is_public in rows:
+            self._put(meal_id, user_id, is_public, names.get(meal_id, ()))
+            self.swept_id = max(self.swept_id, meal_id)
+
+    def ensure_fresh(self):
+        now = time.monotonic()
+        with self._lock:
+            rebuild_every = _setting("PANTRY_INDEX_REBUILD_SECONDS", 3600)
+            if self._built_at is None or now - self._built_at >= rebuild_every:
+                self._reset()
+                self._load(Meal.objects.order_by("id"))
+                self._built_at = self._refreshed_at = now
+            elif now - self._refreshed_at >= _setting("PANTRY_INDEX_REFRESH_SECONDS", 30):
+                self._load(Meal.objects.filter(id__gt=self.swept_id).order_by("id"))
+                self._refreshed_at = now
+
+    def update(self, meal):
+        """Re-index one meal (called from the Meal post_save signal)."""
+        with self._lock:
+            if self._built_at is not None:
+                names = ingredient_names([meal.id]).get(meal.id, ())
+                self._put(meal.id, meal.user_id, meal.is_public, names)
+
+    def remove(self, meal_id):
+        with self._lock:
+            row = self.row_of.pop(meal_id, None)
+            if row is not None:
+                self.alive[row] = False
+                self.bits[row] = 0
+
+    # -- querying --------------------------------------------------------
+
+    @lru_cache(maxsize=4096)
+    def _term_bits(self, term, vocab_size, generation):
+        # Pantry "chicken" covers "chicken breast"; "oil" covers "olive oil"
+        term = canonical_name(term)
+        if not term:
+            return ()
+        return tuple(bit for key, bit in self.vocab.items()
+                     if key == term or key.startswith(term + " ")
+                     or key.endswith(" " + term))
+
+    def pantry_bits(self, terms, include_staples=True):
+        mask = np.zeros(self.bits.shape[1], dtype=np.uint64)
+        bits = set()
+        for term in set(terms):
+            bits.update(self._term_bits(term, len(self.vocab), self._generation))
+        if include_staples:
+            # Exact names only: "pepper" must not cover "red pepper"
+            bits.update(self.vocab[key] for key in STAPLES if key in self.vocab)
+        for bit in bits:
+            mask[bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+        return mask
+
+    def rank(self, terms, user_id=None, limit=20, min_coverage=0.0,
+             include_staples=True):
+        """
+        Return ``[(meal_id, coverage, matched, total), ...]`` best first.
+        Only system, public and (if given) the user's own meals are ranked.
+        """
+        self.ensure_fresh()
+        with self._lock:
+            n = self.size
+            if n == 0:
+                return []
+            pantry = self.pantry_bits(terms, include_staples)
+            bits = self.bits[:n]
+            total = _popcount(bits)
+            matched = _popcount(bits & pantry)
+            visible = self.alive[:n] & (
+                (self.owner_ids[:n] == 0) | self.public[:n]
+                | (self.owner_ids[:n] == (user_id or -1)))
+            coverage = np.divide(matched, total, out=np.zeros(n, dtype=np.float64),
+                                 where=total > 0)
+            eligible = visible & (matched > 0) & (coverage >= min_coverage)
+            rows = np.flatnonzero(eligible)
+            if not len(rows):
+                return []
+            # Best coverage first, then the recipe that uses more of the pantry
+            order = np.lexsort((-matched[rows], -coverage[rows]))[:limit]
+            rows = rows[order]
+            return [(int(self.meal_ids[r]), float(coverage[r]), int(matched[r]),
+                     int(total[r])) for r in rows]
+
+    def missing(self, items, terms, include_staples=True):
+        """Original lines of a meal's ``MealIngredient`` rows not covered by the pantry."""
+        with self._lock:
+            pantry = self.pantry_bits(terms, include_staples)
+            result = []
+            for item in items:
+                if not item.name:
+                    continue
+                bit = self.vocab.get(item.name)
+                if bit is None or not int(pantry[bit // 64]) >> (bit % 64) & 1:
+                    result.append(item.original_text)
+            return result
+
+
+index = PantryIndex()
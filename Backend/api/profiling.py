@@ -0,0 +1,233 @@
+"""
+Opt-in per-request profiling.
+
+A request is profiled when it carries a signed token in the ``X-Profile``
+header (issued to admins by ``POST /api/profiles/token/``; never accepted
+from the query string, where it would end up in access logs and Referer
+headers) or when it falls in the ``PROFILE_SAMPLE_RATE`` fraction of
+traffic.  For those requests ``ProfilingMiddleware`` records:
+
+* a statistical profile - the request thread's stack sampled every
+  ``PROFILE_SAMPLE_INTERVAL`` seconds, aggregated into collapsed stacks
+  (flamegraph.pl / speedscope input), so time spent waiting on Gemini shows
+  up as clearly as serializer CPU;
+* every SQL statement with its duration;
+* the top allocation sites from tracemalloc snapshots taken around the view.
+
+Each profile is written to ``PROFILE_DIR`` as JSON and listed by the
+admin-only ``/api/profiles/`` endpoint.  Files beyond ``PROFILE_MAX_FILES``
+are deleted at most every ``PROFILE_PRUNE_SECONDS`` per process.  Unprofiled requests pay one header
+lookup and one comparison.
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+
+
+TOKEN_SALT = "api.profiling"
+HEADER = "X-Profile"
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def profile_dir():
+    return str(_setting("PROFILE_DIR", settings.BASE_DIR / "var" / "profiles"))
+
+
+def issue_token(user):
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(str(user.pk))
+
+
+def _valid_token(token):
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(
+            token, max_age=_setting("PROFILE_TOKEN_MAX_AGE", 3600))
+        return True
+    except signing.BadSignature:
+        return False
+
+
+class StackSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:"
+                             f"{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class _Tracemalloc:
+    """tracemalloc is process-wide; keep it on while any profiled request runs."""
+    _lock = threading.Lock()
+    _users = 0
+    _started_here = False
+
+    @classmethod
+    def acquire(cls):
+        with cls._lock:
+            if cls._users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start(_setting("PROFILE_TRACEMALLOC_FRAMES", 10))
+                cls._started_here = True
+            cls._users += 1
+        return tracemalloc.take_snapshot()
+
+    @classmethod
+    def release(cls, before):
+        after = tracemalloc.take_snapshot()
+        with cls._lock:
+            cls._users -= 1
+            if cls._users == 0 and cls._started_here:
+                tracemalloc.stop()
+                cls._started_here = False
+        return after.compare_to(before, "lineno")
+
+
+_pruned_at = None
+_prune_lock = threading.Lock()
+
+
+def _prune():
+    global _pruned_at
+    # Listing the directory on every profiled request adds up under sampling
+    now = time.monotonic()
+    with _prune_lock:
+        if _pruned_at is not None and now - _pruned_at < _setting("PROFILE_PRUNE_SECONDS", 60):
+            return
+        _pruned_at = now
+    keep = _setting("PROFILE_MAX_FILES", 200)
+    names = sorted(list_profiles(), reverse=True)
+    for name in names[keep:]:
+        try:
+            os.remove(os.path.join(profile_dir(), name))
+        except OSError:
+            pass
+
+
+def list_profiles():
+    directory = profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    return [name for name in os.listdir(directory) if name.endswith(".json")]
+
+
+def load_profile(name):
+    # Names come from the URL; never let them leave the profile directory
+    if os.path.basename(name) != name or not name.endswith(".json"):
+        return None
+    path = os.path.join(profile_dir(), name)
+    if not os.path.isfile(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def collapsed(profile):
+    """The stack samples as ``frame;frame;frame count`` lines."""
+    return "\n".join(f"{stack} {count}" for stack, count in profile["stacks"].items()) + "\n"
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def wants_profile(self, request):
+        token = request.headers.get(HEADER)
+        if token:
+            return _valid_token(token)
+        rate = _setting("PROFILE_SAMPLE_RATE", 0.0)
+        return rate > 0 and random.random() < rate
+
+    def __call__(self, request):
+        if not self.wants_profile(request):
+            return self.get_response(request)
+        return self.profile(request)
+
+    def profile(self, request):
+        queries = []
+
+        def time_query(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries.append({"alias": context["connection"].alias, "sql": sql,
+                                "ms": round((time.perf_counter() - started) * 1000, 3)})
+
+        sampler = StackSampler(threading.get_ident(), _setting("PROFILE_SAMPLE_INTERVAL", 0.005))
+        memory_before = _Tracemalloc.acquire()
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(time_query))
+                response = self.get_response(request)
+        finally:
+            sampler.stop()
+            elapsed = time.perf_counter() - started
+            allocations = _Tracemalloc.release(memory_before)
+
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match and match.view_name else "unmatched"
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{view.replace(':', '_')}-{uuid.uuid4().hex[:8]}"
+        report = {
+            "id": profile_id,
+            "method": request.method,
+            "path": request.path,
+            "view": view,
+            "status": response.status_code,
+            "duration_ms": round(elapsed * 1000, 3),
+            "sample_interval_ms": sampler.interval * 1000,
+            "sql": {
+                "count": len(queries),
+                "total_ms": round(sum(q["ms"] for q in queries), 3),
+                "queries": queries,
+            },
+            "stacks": dict(sampler.stacks.most_common()),
+            "allocations": [
+                {"where": str(stat.traceback), "size_diff_kb": round(stat.size_diff / 1024, 1),
+                 "count_diff": stat.count_diff}
+                for stat in allocations[:_setting("PROFILE_TOP_ALLOCATIONS", 25)]
+            ],
+        }
+        try:
+            os.makedirs(profile_dir(), exist_ok=True)
+            with open(os.path.join(profile_dir(), f"{profile_id}.json"), "w",
+                      encoding="utf-8") as f:
+                json.dump(report, f)
+            _prune()
+            response[f"{HEADER}-Id"] = profile_id
+        except OSError as e:
+            print(f"Failed to write profile: {e}")
+        return response
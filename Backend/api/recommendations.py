@@ -0,0 +1,164 @@
+"""
+Item-item collaborative filtering for the personalized home feed.
+
+``build_recommendations`` reads Favorite and RecipeView rows in chunks into a
+sparse user x meal interaction matrix, derives cosine item-item similarities
+from its co-occurrence counts and scores every user's unseen meals in
+vectorized blocks.  The top-N per user are written to ``Recommendation`` so
+serving the feed is one indexed query.  Rows with ``user=None`` hold the
+global popularity ranking used as the fallback.
+"""
+import numpy as np
+from scipy import sparse
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import Favorite, Meal, Recommendation, RecipeView
+from .similarity import candidate_filter
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _read_pairs(queryset, chunk_size):
+    """Yield ``(user_ids, meal_ids)`` numpy arrays, ``chunk_size`` rows at a time."""
+    rows = queryset.values_list("user_id", "meal_id").iterator(chunk_size=chunk_size)
+    users, meals = [], []
+    for user_id, meal_id in rows:
+        users.append(user_id)
+        meals.append(meal_id)
+        if len(users) >= chunk_size:
+            yield np.asarray(users, dtype=np.int64), np.asarray(meals, dtype=np.int64)
+            users, meals = [], []
+    if users:
+        yield np.asarray(users, dtype=np.int64), np.asarray(meals, dtype=np.int64)
+
+
+def interaction_matrix(chunk_size=50000):
+    """
+    Return ``(matrix, user_ids, meal_ids)``.  Repeated views are summed and
+    log-damped; a favorite counts as ``RECOMMENDATION_FAVORITE_WEIGHT`` views.
+    """
+    user_parts, meal_parts, weight_parts = [], [], []
+    sources = [
+        (RecipeView.objects.all(), 1.0),
+        (Favorite.objects.all(), _setting("RECOMMENDATION_FAVORITE_WEIGHT", 3.0)),
+    ]
+    for queryset, weight in sources:
+        for users, meals in _read_pairs(queryset, chunk_size):
+            user_parts.append(users)
+            meal_parts.append(meals)
+            weight_parts.append(np.full(len(users), weight, dtype=np.float32))
+
+    if not user_parts:
+        return sparse.csr_matrix((0, 0), dtype=np.float32), np.array([]), np.array([])
+
+    users = np.concatenate(user_parts)
+    meals = np.concatenate(meal_parts)
+    weights = np.concatenate(weight_parts)
+    user_ids, rows = np.unique(users, return_inverse=True)
+    meal_ids, cols = np.unique(meals, return_inverse=True)
+    # COO -> CSR sums duplicate (user, meal) pairs
+    matrix = sparse.coo_matrix(
+        (weights, (rows, cols)), shape=(len(user_ids), len(meal_ids))).tocsr()
+    matrix.data = np.log1p(matrix.data)
+    return matrix, user_ids, meal_ids
+
+
+def item_similarity(matrix):
+    """Cosine similarity between meal columns, self-similarity removed."""
+    binary = matrix.copy()
+    binary.data[:] = 1.0
+    co_occurrence = (binary.T @ binary).tocsr()
+    counts = co_occurrence.diagonal()
+    counts[counts == 0] = 1.0
+    inv = sparse.diags(1.0 / np.sqrt(counts))
+    similarity = (inv @ co_occurrence @ inv).tocsr().astype(np.float32)
+    similarity.setdiag(0)
+    similarity.eliminate_zeros()
+    return similarity
+
+
+def _top_n(scores, n):
+    n = min(n, len(scores))
+    if n <= 0:
+        return np.array([], dtype=np.int64)
+    top = np.argpartition(-scores, n - 1)[:n]
+    top = top[np.argsort(-scores[top])]
+    return top[scores[top] > 0]
+
+
+def build_recommendations(chunk_size=50000, user_block=128, stdout=None):
+    """
+    Recompute every user's top-N recommendations plus the popularity fallback.
+    Returns ``(users_scored, rows_written)``.
+    """
+    per_user = _setting("RECOMMENDATIONS_PER_USER", 20)
+    generated_at = timezone.now()
+    matrix, user_ids, meal_ids = interaction_matrix(chunk_size)
+
+    if matrix.shape[0]:
+        # Private AI recipes are never recommended to anyone
+        private = np.fromiter(
+            Meal.objects.exclude(candidate_filter()).values_list("id", flat=True).iterator(),
+            dtype=np.int64)
+        recommendable = ~np.isin(meal_ids, private)
+        similarity = item_similarity(matrix)
+    written = 0
+
+    for start in range(0, matrix.shape[0], user_block):
+        block = matrix[start:start + user_block]
+        scores = (block @ similarity).toarray()
+        scores[:, ~recommendable] = 0.0
+        # Don't recommend what the user has already seen or saved
+        seen_rows, seen_cols = block.nonzero()
+        scores[seen_rows, seen_cols] = 0.0
+
+        batch_users = user_ids[start:start + user_block]
+        rows = []
+        for offset, user_id in enumerate(batch_users):
+            for col in _top_n(scores[offset], per_user):
+                rows.append(Recommendation(
+                    user_id=int(user_id), meal_id=int(meal_ids[col]),
+                    score=float(scores[offset, col]), generated_at=generated_at))
+        with transaction.atomic():
+            Recommendation.objects.filter(user_id__in=batch_users.tolist()).delete()
+            Recommendation.objects.bulk_create(rows, batch_size=5000)
+        written += len(rows)
+        if stdout is not None:
+            stdout.write(f"  {min(start + user_block, matrix.shape[0])}/{matrix.shape[0]} users")
+
+    # Global fallback: most interacted-with recommendable meals
+    popular_rows = []
+    if matrix.shape[0]:
+        popularity = np.asarray(matrix.sum(axis=0)).ravel()
+        popularity[~recommendable] = 0.0
+        popular_rows = [
+            Recommendation(user=None, meal_id=int(meal_ids[col]),
+                           score=float(popularity[col]), generated_at=generated_at)
+            for col in _top_n(popularity, per_user)
+        ]
+    with transaction.atomic():
+        Recommendation.objects.filter(user__isnull=True).delete()
+        Recommendation.objects.bulk_create(popular_rows)
+        # Users without interactions any more keep nothing stale
+        Recommendation.objects.filter(generated_at__lt=generated_at).delete()
+    written += len(popular_rows)
+    return matrix.shape[0], written
+
+
+def recommended_meals(user, limit):
+    """Precomputed feed for ``user``, falling back to globally popular meals."""
+    base = Recommendation.objects.filter(
+        Q(meal__user__isnull=True) | Q(meal__is_public=True)
+    ).select_related("meal", "meal__user").order_by("-score")
+    entries = []
+    if user.is_authenticated:
+        entries = list(base.filter(user=user)[:limit])
+    if not entries:
+        entries = list(base.filter(user__isnull=True)[:limit])
+    return [entry.meal for entry in entries]
@@ -0,0 +1,77 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.models import Meal, Profile
+from . import autocomplete, facets, jobs, pantry, sqlite_tuning, thumbnails, trigram_search
+from .ingredients import store_meal_ingredients
+
+
+connection_created.connect(sqlite_tuning.configure_connection)
+
+
+@receiver(pre_save, sender=Meal)
+def meal_saving(sender, instance, **kwargs):
+    """Remember the stored facets, ingredient lines and title, to diff in meal_saved"""
+    # Stored trimmed so BrowseRecipes' exact ?area= match agrees with the counts
+    instance.area = facets.clean_area(instance.area)
+    instance._facets_before = set()
+    instance._ingredients_before = None
+    instance._title_before = None
+    if instance.pk:
+        row = Meal.objects.filter(pk=instance.pk).values_list(
+            "category", "area", "user_id", "is_public", "ingredients", "title").first()
+        if row:
+            instance._facets_before = facets.meal_facets(*row[:4])
+            instance._ingredients_before, instance._title_before = row[4:]
+
+
+@receiver(post_save, sender=Meal)
+def meal_saved(sender, instance, **kwargs):
+    """Keep in-memory indexes current when a meal is created or edited"""
+    # Parsed once here; the indexes below read the MealIngredient rows
+    if instance.ingredients != getattr(instance, "_ingredients_before", None):
+        store_meal_ingredients([instance])
+    facets.sync_meal(instance, getattr(instance, "_facets_before", set()))
+    pantry.index.update(instance)
+    autocomplete.index.update(instance)
+    # Sharing, favourite counts etc. don't touch the title's trigram rows
+    if instance.title != getattr(instance, "_title_before", None):
+        trigram_search.index_meals([instance])
+        trigram_search.index.update(instance.id, instance.title)
+
+
+@receiver(post_delete, sender=Meal)
+def meal_deleted(sender, instance, **kwargs):
+    facets.remove_meal(facets.snapshot(instance))
+    pantry.index.remove(instance.id)
+    autocomplete.index.remove(instance.id)
+    trigram_search.index.discard(instance.id)
+
+
+@receiver(pre_save, sender=Profile)
+def profile_saving(sender, instance, **kwargs):
+    """Only the worker writes picture_variants: don't save back a stale copy"""
+    if instance.pk:
+        instance.picture_variants = Profile.objects.filter(pk=instance.pk).values_list(
+            "picture_variants", flat=True).first() or {}
+
+
+@receiver(post_save, sender=Profile)
+def profile_saved(sender, instance, **kwargs):
+    """Queue thumbnails when the picture changed (the worker saves with .update())"""
+    source = instance.profile_picture.name if instance.profile_picture else ""
+    # Read back: the worker may have written variants since this instance was loaded
+    stored = Profile.objects.filter(pk=instance.pk).values_list(
+        "picture_variants", flat=True).first() or {}
+    if source == stored.get("source", ""):
+        return
+    if not source:
+        Profile.objects.filter(pk=instance.pk).update(picture_variants={})
+        thumbnails.delete_unused(stored)
+        return
+    # Every save until the job runs lands here; the queued job renders the
+    # picture current when it runs, so one is enough
+    transaction.on_commit(lambda: jobs.enqueue_once(
+        "profile_thumbnails", {"profile_id": instance.pk}, user=instance.user))
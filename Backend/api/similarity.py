@@ -0,0 +1,323 @@
+"""
+Content-based "similar recipes" engine.
+
+Every meal becomes a sparse, L2-normalized feature vector over its canonical
+ingredients (IDF weighted), categories and area.  ``build_index`` computes the
+top-K cosine neighbours of every meal in chunked sparse matrix products and
+stores them in ``SimilarMeal`` so the endpoint is a single indexed lookup.
+Each chunk's lists are swapped in with their own short transaction, so a
+rebuild never holds the database write lock for long and readers always see
+a complete (old or new) list.
+
+The candidate matrix is also saved under ``SIMILARITY_INDEX_DIR``; each worker
+loads it lazily so a newly saved meal can be scored against the catalog with
+one sparse mat-vec (``update_meal``) instead of waiting for the next rebuild.
+Meals appended this way live only in that worker's copy until the batch
+command runs again.
+"""
+import json
+import os
+import threading
+
+import numpy as np
+from scipy import sparse
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from core.models import Meal, SimilarMeal
+from .ingredients import fold, ingredient_names
+
+
+# How many of a new meal's closest candidates get a chance to list it back
+REVERSE_FANOUT = 4
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _top_k():
+    return _setting("SIMILAR_RECIPES_TOP_K", 12)
+
+
+def candidate_filter():
+    """Meals that may be recommended to anyone: system or shared recipes."""
+    return Q(user__isnull=True) | Q(is_public=True)
+
+
+def meal_features(names, category, area):
+    """Return the raw feature names and their base weights for one meal."""
+    features = {}
+    for name in names:
+        features[f"ing:{name}"] = 1.0
+    if isinstance(category, str):
+        category = [category]
+    weight = _setting("SIMILARITY_CATEGORY_WEIGHT", 0.5)
+    for cat in category or []:
+        if cat:
+            features[f"cat:{fold(cat).strip()}"] = weight
+    if area:
+        features[f"area:{fold(area).strip()}"] = _setting(
+            "SIMILARITY_AREA_WEIGHT", 0.5)
+    return features
+
+
+def _normalize_rows(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms).dot(matrix).tocsr()
+
+
+class SimilarityIndex:
+    """Candidate feature matrix plus the vocabulary needed to vectorize new meals."""
+
+    def __init__(self, ids, matrix, vocab, idf):
+        self.ids = ids                # row -> Meal.id
+        self.matrix = matrix          # CSR, rows L2-normalized
+        self.vocab = vocab            # feature name -> column
+        self.idf = idf                # column -> IDF multiplier
+        self.row_of = {int(meal_id): row for row, meal_id in enumerate(ids)}
+        self.stale = np.zeros(len(ids), dtype=bool)
+
+    @classmethod
+    def build(cls, rows):
+        """Build from an iterable of ``(id, ingredient names, category, area)``."""
+        vocab, ids, indptr, indices, data = {}, [], [0], [], []
+        for meal_id, names, category, area in rows:
+            for name, weight in meal_features(names, category, area).items():
+                indices.append(vocab.setdefault(name, len(vocab)))
+                data.append(weight)
+            ids.append(meal_id)
+            indptr.append(len(indices))
+
+        matrix = sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32),
+             np.asarray(indptr, dtype=np.int64)),
+            shape=(len(ids), len(vocab)))
+        df = np.bincount(matrix.indices, minlength=len(vocab))
+        idf = np.log((1 + len(ids)) / (1 + df)).astype(np.float32) + 1.0
+        matrix = _normalize_rows(matrix.dot(sparse.diags(idf)))
+        return cls(np.asarray(ids, dtype=np.int64), matrix, vocab, idf)
+
+    def vectorize(self, names, category, area, grow=False):
+        """Return a normalized 1 x V row; unseen features extend the vocab if ``grow``."""
+        cols, vals = [], []
+        for name, weight in meal_features(names, category, area).items():
+            col = self.vocab.get(name)
+            if col is None:
+                if not grow:
+                    continue
+                col = self.vocab[name] = len(self.vocab)
+                # Unseen feature: treat as occurring in a single document
+                self.idf = np.append(self.idf, np.float32(
+                    np.log((1 + len(self.ids)) / 2.0) + 1.0))
+            cols.append(col)
+            vals.append(weight * self.idf[col])
+        row = sparse.csr_matrix(
+            (np.asarray(vals, dtype=np.float32), (np.zeros(len(cols), dtype=np.int32), cols)),
+            shape=(1, len(self.vocab)))
+        if self.matrix.shape[1] < len(self.vocab):
+            self.matrix.resize((self.matrix.shape[0], len(self.vocab)))
+        return _normalize_rows(row)
+
+    def scores(self, vector):
+        result = np.asarray(self.matrix.dot(vector.T).todense()).ravel()
+        result[self.stale] = 0.0
+        return result
+
+    def append(self, meal_id, vector):
+        old = self.row_of.get(meal_id)
+        if old is not None:
+            self.stale[old] = True
+        self.matrix = sparse.vstack([self.matrix, vector], format="csr")
+        self.ids = np.append(self.ids, meal_id)
+        self.stale = np.append(self.stale, False)
+        self.row_of[meal_id] = len(self.ids) - 1
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        sparse.save_npz(os.path.join(directory, "matrix.npz"), self.matrix)
+        np.save(os.path.join(directory, "ids.npy"), self.ids)
+        np.save(os.path.join(directory, "idf.npy"), self.idf)
+        with open(os.path.join(directory, "vocab.json"), "w", encoding="utf-8") as f:
+            json.dump(self.vocab, f)
+
+    @classmethod
+    def load(cls, directory):
+        matrix = sparse.load_npz(os.path.join(directory, "matrix.npz")).tocsr()
+        ids = np.load(os.path.join(directory, "ids.npy"))
+        idf = np.load(os.path.join(directory, "idf.npy"))
+        with open(os.path.join(directory, "vocab.json"), encoding="utf-8") as f:
+            vocab = json.load(f)
+        return cls(ids, matrix, vocab, idf)
+
+
+def _top_indices(scores, k):
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.array([], dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return top[scores[top] > 0]
+
+
+def _feature_rows(queryset):
+    """``[(id, ingredient names, category, area), ...]`` ordered by id."""
+    names = ingredient_names(queryset.values("id"))
+    rows = queryset.order_by("id").values_list("id", "category", "area")
+    return [(meal_id, names.get(meal_id, ()), category, area)
+            for meal_id, category, area in rows.iterator(chunk_size=2000)]
+
+
+def _index_dir():
+    return str(_setting("SIMILARITY_INDEX_DIR",
+                        os.path.join(settings.BASE_DIR, "var", "similarity")))
+
+
+def build_index(chunk_size=256, batch_size=5000, stdout=None):
+    """
+    Rebuild every meal's neighbour list from scratch.
+    Returns ``(meals_indexed, rows_written)``.
+    """
+    k = _top_k()
+    index = SimilarityIndex.build(_feature_rows(Meal.objects.filter(candidate_filter())))
+
+    # Private AI recipes are queries only; they are never recommended to others
+    private = _feature_rows(Meal.objects.exclude(candidate_filter()))
+    queries = index.matrix
+    query_ids = index.ids
+    if private:
+        queries = sparse.vstack(
+            [queries] + [index.vectorize(*row[1:]) for row in private], format="csr")
+        query_ids = np.concatenate([query_ids, [row[0] for row in private]])
+
+    candidates_t = index.matrix.T.tocsr()
+    written = 0
+    for start in range(0, queries.shape[0], chunk_size):
+        # Stays sparse: memory follows the non-zero scores, not chunk x catalog
+        block = queries[start:start + chunk_size].dot(candidates_t).tocsr()
+        meal_ids = [int(meal_id) for meal_id in query_ids[start:start + chunk_size]]
+        rows = []
+        for offset, meal_id in enumerate(meal_ids):
+            lo, hi = block.indptr[offset], block.indptr[offset + 1]
+            cols, scores = block.indices[lo:hi], block.data[lo:hi]
+            self_row = index.row_of.get(meal_id)
+            if self_row is not None:
+                keep = cols != self_row
+                cols, scores = cols[keep], scores[keep]
+            for pos in _top_indices(scores, k):
+                rows.append(SimilarMeal(
+                    meal_id=meal_id, similar_id=int(index.ids[cols[pos]]),
+                    score=float(scores[pos])))
+        with transaction.atomic():
+            SimilarMeal.objects.filter(meal_id__in=meal_ids).delete()
+            SimilarMeal.objects.bulk_create(rows, batch_size=batch_size)
+        written += len(rows)
+        if stdout is not None:
+            stdout.write(
+                f"  {min(start + chunk_size, queries.shape[0])}/{queries.shape[0]} meals")
+
+    index.save(_index_dir())
+    _reset_cached_index(index)
+    return queries.shape[0], written
+
+
+_lock = threading.Lock()
+_cached = {"index": None, "mtime": None}
+
+
+def _reset_cached_index(index=None):
+    with _lock:
+        _cached["index"] = index
+        _cached["mtime"] = _matrix_mtime()
+
+
+def _matrix_mtime():
+    try:
+        return os.path.getmtime(os.path.join(_index_dir(), "matrix.npz"))
+    except OSError:
+        return None
+
+
+def _get_index():
+    mtime = _matrix_mtime()
+    if mtime is None:
+        return None
+    if _cached["index"] is None or _cached["mtime"] != mtime:
+        _cached["index"] = SimilarityIndex.load(_index_dir())
+        _cached["mtime"] = mtime
+    return _cached["index"]
+
+
+def update_meal(meal):
+    """
+    Incrementally (re)index one meal: store its own top-K neighbours and slot
+    it into the lists of existing meals it now outranks.  No-op until the
+    batch index has been built at least once.
+    """
+    k = _top_k()
+    with _lock:
+        index = _get_index()
+        if index is None:
+            return False
+        is_candidate = meal.user_id is None or meal.is_public
+        names = ingredient_names([meal.id]).get(meal.id, ())
+        vector = index.vectorize(names, meal.category, meal.area, grow=is_candidate)
+        scores = index.scores(vector)
+        own_row = index.row_of.get(meal.id)
+        if own_row is not None:
+            scores[own_row] = 0.0
+        ranked = [(int(index.ids[col]), float(scores[col]))
+                  for col in _top_indices(scores, k * REVERSE_FANOUT)]
+        neighbours = ranked[:k]
+        if is_candidate:
+            index.append(meal.id, vector)
+        elif own_row is not None:
+            # Unshared since the last build: stop recommending it
+            index.stale[own_row] = True
+
+    with transaction.atomic():
+        SimilarMeal.objects.filter(meal=meal).delete()
+        SimilarMeal.objects.bulk_create([
+            SimilarMeal(meal_id=meal.id, similar_id=similar_id, score=score)
+            for similar_id, score in neighbours
+        ])
+        SimilarMeal.objects.filter(similar=meal).delete()
+        if is_candidate:
+            _insert_reverse(meal, ranked, k)
+    return True
+
+
+def _insert_reverse(meal, ranked, k):
+    # Cosine similarity is symmetric, so the meals that should now list this
+    # one are those whose current k-th best score it beats.  Only the closest
+    # few candidates are checked; the next batch rebuild fills in the rest.
+    scores = dict(ranked)
+    current = {}
+    for meal_id, score in SimilarMeal.objects.filter(
+            meal_id__in=scores).values_list("meal_id", "score"):
+        current.setdefault(meal_id, []).append(score)
+    new_rows = []
+    for other_id, score in scores.items():
+        existing = current.get(other_id, [])
+        if len(existing) < k:
+            new_rows.append(SimilarMeal(meal_id=other_id, similar=meal, score=score))
+        elif score > min(existing):
+            weakest = SimilarMeal.objects.filter(
+                meal_id=other_id).order_by("score").values_list("id", flat=True)[:1]
+            SimilarMeal.objects.filter(id__in=list(weakest)).delete()
+            new_rows.append(SimilarMeal(meal_id=other_id, similar=meal, score=score))
+    SimilarMeal.objects.bulk_create(new_rows, ignore_conflicts=True)
+
+
+def similar_meals(meal, limit=None):
+    """Precomputed neighbours of ``meal`` that are still visible to everyone."""
+    limit = limit or _top_k()
+    ids = SimilarMeal.objects.filter(meal=meal).filter(
+        Q(similar__user__isnull=True) | Q(similar__is_public=True)
+    ).order_by("-score").values_list("similar_id", flat=True)[:limit]
+    ids = list(ids)
+    meals = Meal.objects.in_bulk(ids)
+    return [meals[i] for i in ids if i in meals]
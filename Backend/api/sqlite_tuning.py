@@ -0,0 +1,48 @@
+"""
+SQLite connection tuning.
+
+Every new SQLite connection (Django opens one per thread, kept for
+``CONN_MAX_AGE`` seconds) gets the pragmas in ``settings.SQLITE_PRAGMAS``:
+WAL so readers no longer block the single writer, ``synchronous=NORMAL``
+(safe with WAL), a ``busy_timeout`` so writers queue instead of failing with
+"database is locked", and a larger page cache / mmap window for reads.
+``manage.py benchmark_sqlite`` measures the effect on a copy of the database.
+"""
+import re
+
+from django.conf import settings
+
+
+# Applied in this order; journal_mode first since the others assume WAL
+DEFAULT_PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,   # negative = KiB, i.e. 64 MB
+    "temp_store": "memory",
+}
+
+_VALUE = re.compile(r"^-?[A-Za-z0-9_]+$")
+
+
+def configured_pragmas():
+    return getattr(settings, "SQLITE_PRAGMAS", DEFAULT_PRAGMAS)
+
+
+def apply_pragmas(cursor, pragmas):
+    """Run ``PRAGMA name=value`` for each entry (values can't be bound as params)."""
+    for name, value in pragmas.items():
+        if value is None or value == "":
+            continue
+        if not _VALUE.match(name) or not _VALUE.match(str(value)):
+            raise ValueError(f"Invalid SQLite pragma: {name}={value!r}")
+        cursor.execute(f"PRAGMA {name}={value}")
+
+
+def configure_connection(sender, connection, **kwargs):
+    """``connection_created`` receiver (connected in ``api/signals.py``)."""
+    if connection.vendor != "sqlite" or not getattr(settings, "SQLITE_TUNING_ENABLED", True):
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, configured_pragmas())
@@ -0,0 +1,199 @@
+"""
+Deterministic synthetic data for benchmarks and scale testing.
+
+Vocabulary comes from the frontend's static data
+(``Frontend/public/data/{ingredients,categories,areas}.json``).  Every
+generator takes a ``random.Random`` so the same seed always produces the same
+rows, and writes with chunked ``bulk_create``; Meal signals don't fire for
+bulk inserts, so ``refresh_indexes`` rebuilds the derived tables afterwards.
+Used by ``manage.py generate_synthetic_data`` and the HTTP benchmark.
+"""
+import json
+import os
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import UNIT_CHOICES, Favorite, GroceryList, Meal, Profile, RecipeView, User
+
+
+DATA_DIR = os.path.join(settings.BASE_DIR.parent, "Frontend", "public", "data")
+
+UNITS = ["g", "kg", "ml", "tsp", "tbsp", "cup", "pinch", "", "", ""]
+QUANTITIES = ["1", "2", "3", "4", "1/2", "1/4", "100", "200", "250", "500"]
+DISH_WORDS = ["Stew", "Curry", "Pie", "Salad", "Soup", "Roast", "Bake", "Skillet",
+              "Tart", "Stir Fry", "Risotto", "Casserole", "Tacos", "Kebabs", "Pasta"]
+STYLE_WORDS = ["Classic", "Spicy", "Smoky", "Creamy", "Rustic", "Quick", "Slow-Cooked",
+               "Grandma's", "Crispy", "Herby", "Zesty", "Golden", "Sticky", "Fiery"]
+METHOD_STEPS = ["Preheat the oven to 180C.", "Heat the oil in a large pan.",
+                "Fry the onions until soft.", "Add the spices and cook for a minute.",
+                "Stir in the remaining ingredients.", "Simmer for 20 minutes.",
+                "Season to taste.", "Serve hot with fresh herbs."]
+
+DIETS = ["", "", "", "Vegetarian", "Vegan", "Gluten-Free", "Pescatarian", "Keto",
+         "Dairy-Free", "Halal"]
+BIOS = ["", "", "Home cook.", "Weekend baker.", "Always hungry.", "Learning to cook.",
+        "Spice enthusiast.", "Cooking for a family of four."]
+SHOPS = ["Supermarket", "Spices Store", "Vegetable Market", "Dairy Shop", "Meat Shop",
+         "Bakery", "Others"]
+GROCERY_UNITS = [code for code, _ in UNIT_CHOICES]
+
+BENCH_PASSWORD = "benchmark-password"
+
+
+def load_vocabulary():
+    """``(ingredients, categories, areas)`` from the frontend JSON files."""
+    def read(name):
+        with open(os.path.join(DATA_DIR, f"{name}.json"), encoding="utf-8") as f:
+            return [item for item in json.load(f) if isinstance(item, str)]
+    return read("ingredients"), read("categories"), read("areas")
+
+
+def zipf_weights(n, exponent=1.1):
+    """Cumulative weights for picking index ``i`` with probability ~ 1 / (i + 1) ** exponent."""
+    return list(accumulate(1.0 / (rank + 1) ** exponent for rank in range(n)))
+
+
+@contextmanager
+def explicit_timestamps(model, *fields):
+    """Let ``bulk_create`` keep the ``auto_now_add`` values we generated."""
+    fields = [model._meta.get_field(name) for name in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _recent(rng, now, days):
+    # Most activity is recent: squaring skews the offsets towards zero
+    return now - timedelta(seconds=int(rng.random() ** 2 * days * 86400))
+
+
+def _chunks(rows, chunk_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def bulk_insert(model, rows, chunk_size=5000, ignore_conflicts=False):
+    """Write an iterable of unsaved instances, one transaction per chunk. Returns the count."""
+    total = 0
+    for batch in _chunks(rows, chunk_size):
+        with transaction.atomic():
+            model.objects.bulk_create(batch, batch_size=chunk_size,
+                                      ignore_conflicts=ignore_conflicts)
+        total += len(batch)
+    return total
+
+
+def make_users(rng, count, prefix="synthetic"):
+    # One hash for everyone: hashing per user would dominate the run time
+    password = make_password(BENCH_PASSWORD)
+    areas = load_vocabulary()[2]
+    return (User(email=f"{prefix}{i}@example.com", name=f"Synthetic User {i}",
+                 country=rng.choice(areas), age=rng.randint(18, 80),
+                 isCook=rng.random() < 0.2, password=password)
+            for i in range(count))
+
+
+def make_meals(rng, count, prefix="S", owners=(), owned_fraction=0.0):
+    """System recipes, plus ``owned_fraction`` of AI-style recipes spread over ``owners``."""
+    ingredients, categories, areas = load_vocabulary()
+    ingredient_weights = zipf_weights(len(ingredients), 0.8)
+    now = timezone.now()
+    for i in range(count):
+        picked = []
+        for name in rng.choices(ingredients, cum_weights=ingredient_weights,
+                                k=rng.randint(5, 14)):
+            if name not in picked:
+                picked.append(name)
+        lines = [" ".join(part for part in (rng.choice(QUANTITIES), rng.choice(UNITS), name)
+                          if part) for name in picked]
+        owner = rng.choice(owners) if owners and rng.random() < owned_fraction else None
+        yield Meal(
+            mealid=f"{prefix}{i}",
+            title=f"{rng.choice(STYLE_WORDS)} {picked[0]} {rng.choice(DISH_WORDS)}",
+            category=rng.sample(categories, rng.choice((1, 1, 1, 2))),
+            area=rng.choice(areas),
+            instructions="\r\n".join(rng.sample(METHOD_STEPS, 5)),
+            ingredients=lines,
+            image=f"https://www.themealdb.com/images/media/meals/synthetic{i % 500}.jpg",
+            is_user_added=owner is not None,
+            user_id=owner,
+            is_public=owner is None or rng.random() < 0.3,
+            created_at=_recent(rng, now, 730),
+        )
+
+
+def make_profiles(rng, user_ids):
+    for user_id in user_ids:
+        yield Profile(user_id=user_id, bio=rng.choice(BIOS),
+                      dietary_preference=rng.choice(DIETS))
+
+
+def make_favorites(rng, user_ids, meal_ids, per_user, days=365):
+    """Up to ``per_user`` favorites each (duplicates collapse), popular meals first."""
+    weights = zipf_weights(len(meal_ids))
+    now = timezone.now()
+    for user_id in user_ids:
+        # sorted(): set order is stable for ints, but make it obvious
+        for meal_id in sorted(set(rng.choices(meal_ids, cum_weights=weights,
+                                              k=rng.randint(0, per_user * 2)))):
+            yield Favorite(user_id=user_id, meal_id=meal_id, created_at=_recent(rng, now, days))
+
+
+def make_views(rng, user_ids, meal_ids, mealids, count, days=90, chunk_size=10000):
+    """``count`` views; both users and meals follow a long-tailed popularity."""
+    meal_weights = zipf_weights(len(meal_ids))
+    user_weights = zipf_weights(len(user_ids), 0.7)
+    indexes = range(len(meal_ids))
+    now = timezone.now()
+    for start in range(0, count, chunk_size):
+        size = min(chunk_size, count - start)
+        # One choices() call per chunk rather than per row
+        picked = rng.choices(indexes, cum_weights=meal_weights, k=size)
+        viewers = rng.choices(user_ids, cum_weights=user_weights, k=size)
+        for index, user_id in zip(picked, viewers):
+            yield RecipeView(user_id=user_id, meal_id=meal_ids[index], mealid=mealids[index],
+                             viewed_at=_recent(rng, now, days))
+
+
+def make_grocery_items(rng, user_ids, per_user):
+    ingredients = load_vocabulary()[0]
+    for user_id in user_ids:
+        for name in rng.sample(ingredients, min(len(ingredients), rng.randint(0, per_user * 2))):
+            yield GroceryList(user_id=user_id, ingredient_name=name,
+                              quantity=Decimal(rng.randint(1, 2000)) / 4,
+                              unit=rng.choice(GROCERY_UNITS), shop=rng.choice(SHOPS))
+
+
+def refresh_indexes(stdout=None):
+    """Rebuild the tables the Meal signals normally keep current."""
+    from . import facets, trigram_search
+    from .ingredients import store_meal_ingredients
+
+    facets.rebuild(stdout=stdout)
+    trigram_search.rebuild(stdout=stdout)
+    last_id = 0
+    while True:
+        chunk = list(Meal.objects.filter(id__gt=last_id).order_by("id")
+                     .only("id", "ingredients")[:2000])
+        if not chunk:
+            break
+        with transaction.atomic():
+            store_meal_ingredients(chunk)
+        last_id = chunk[-1].id
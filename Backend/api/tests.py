@@ -1,3 +1,1441 @@
-from django.test import TestCase
+import importlib
+import io
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from core.models import (FacetCount, Favorite, GroceryList, Job, Meal, MealCategory,
+                         MealIngredient, MealNutrition, MealTrigram, Profile, RecipeView,
+                         SimilarMeal, User)
+from core.serializers import MEAL_SUMMARY_FIELDS, MealSerializer
+from . import (autocomplete, benchmark, chat_cache, db_router, enrichment, facets, image_proxy,
+               jobs, llm, metrics, nutrition, pantry, profiling, recommendations, similarity,
+               sqlite_tuning, throttling, thumbnails, trigram_search)
+
+
+def make_user(email="cook@example.com", **kwargs):
+    return User.objects.create_user(email=email, password="secret", **kwargs)
+
+
+def make_meal(title="Tomato Soup", user=None, is_public=False,
+              ingredients=("2 Tomatoes", "1 tsp Salt"), **kwargs):
+    kwargs.setdefault("mealid", f"T{Meal.objects.count() + 1}")
+    kwargs.setdefault("category", ["Soup"])
+    kwargs.setdefault("area", "British")
+    kwargs.setdefault("instructions", "")
+    return Meal.objects.create(title=title, user=user, is_public=is_public,
+                               ingredients=list(ingredients), **kwargs)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    METRICS_ENABLED=False)
+class ApiTestCase(TestCase):
+    """Fresh per-process indexes, a local cache and a scratch var/ directory per test."""
+
+    def setUp(self):
+        cache.clear()
+        self.var_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.var_dir, ignore_errors=True)
+        scratch = override_settings(UPSTREAM_LOCK_DIR=os.path.join(self.var_dir, "locks"),
+                                    MEDIA_ROOT=os.path.join(self.var_dir, "media"))
+        scratch.enable()
+        self.addCleanup(scratch.disable)
+        for module, attr, factory in (
+                (pantry, "index", pantry.PantryIndex),
+                (autocomplete, "index", autocomplete.AutocompleteIndex),
+                (trigram_search, "index", trigram_search.TrigramIndex),
+                (chat_cache, "_index", chat_cache.ChatAnswerIndex),
+                (facets, "_category_ids", dict)):
+            patcher = mock.patch.object(module, attr, factory())
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = APIClient()
+
+    def use_fake_llm(self, **kwargs):
+        backend = llm.FakeBackend(**kwargs)
+        previous = llm.set_backend(backend)
+        self.addCleanup(llm.set_backend, previous)
+        return backend
+
+    def login(self, user):
+        self.client.force_authenticate(user)
+        return user
+
+
+# -- user-026: chat answer cache ----------------------------------------------
+
+class ChatCacheTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.backend = self.use_fake_llm(
+            responder=lambda system_instruction, contents: "About 7 minutes.")
+        self.login(make_user())
+
+    def ask(self, *questions):
+        messages = [{"role": "user", "content": q} for q in questions]
+        return self.client.post("/api/chatbot/", {"messages": messages}, format="json")
+
+    def test_near_duplicate_question_is_answered_from_cache(self):
+        first = self.ask("How long to boil an egg?")
+        self.assertEqual(first.json(), {"reply": "About 7 minutes.", "cached": False})
+
+        second = self.ask("how long do I boil an egg")
+        self.assertEqual(second.status_code, 200)
+        self.assertTrue(second.json()["cached"])
+        self.assertEqual(second.json()["reply"], "About 7 minutes.")
+        self.assertEqual(self.backend.calls, 1)
+
+    def test_multi_turn_conversations_are_not_cached(self):
+        self.ask("How long to boil an egg?")
+        self.ask("How long to boil an egg?", "And a duck egg?")
+        self.assertFalse(self.ask("How long to boil an egg?", "And a duck egg?").json()["cached"])
+        self.assertEqual(self.backend.calls, 3)
+
+    def test_cache_hits_skip_throttles(self):
+        with mock.patch.object(throttling.AIBurstRateThrottle, "THROTTLE_RATES",
+                               {"ai_burst": "1/min"}):
+            self.assertEqual(self.ask("How long to boil an egg?").status_code, 200)
+            for _ in range(3):
+                self.assertTrue(self.ask("how long do I boil an egg").json()["cached"])
+            self.assertEqual(self.ask("Best flour for pizza dough?").status_code, 429)
+
+    @override_settings(UPSTREAM_CONCURRENCY={"gemini": 1})
+    def test_cache_hits_skip_upstream_slots(self):
+        self.ask("How long to boil an egg?")
+        slots = throttling.upstream_slots("gemini")
+        held = slots.acquire()
+        self.addCleanup(slots.release, held)
+        self.assertTrue(self.ask("how long do I boil an egg").json()["cached"])
+        self.assertEqual(self.ask("Best flour for pizza dough?").status_code, 429)
+        self.assertEqual(self.backend.calls, 1)
+
+
+# -- user-027: similar recipes -----------------------------------------------
+
+class SimilarRecipesTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        index_dir = override_settings(SIMILARITY_INDEX_DIR=os.path.join(self.var_dir, "sim"))
+        index_dir.enable()
+        self.addCleanup(index_dir.disable)
+        similarity._reset_cached_index()
+        self.addCleanup(similarity._reset_cached_index)
+
+        curry = ("1 Chicken Breast", "2 tbsp Curry powder", "1 cup Rice", "1 Onion")
+        self.curry = make_meal("Chicken Curry", ingredients=curry, area="Indian",
+                               category=["Curry"])
+        self.korma = make_meal("Chicken Korma", area="Indian", category=["Curry"],
+                               ingredients=("1 Chicken Breast", "2 tbsp Curry powder",
+                                            "1 Onion", "2 cloves Garlic"))
+        self.cake = make_meal("Sponge Cake", area="French", category=["Dessert"],
+                              ingredients=("200g Flour", "100g Sugar", "2 Eggs"))
+        self.owner = make_user("owner@example.com")
+        self.private = make_meal("My Curry", user=self.owner, ingredients=curry,
+                                 area="Indian", category=["Curry"])
+
+    def neighbours(self):
+        return sorted(SimilarMeal.objects.values_list("meal_id", "similar_id"))
+
+    def test_neighbours_share_ingredients_and_skip_private_recipes(self):
+        similarity.build_index()
+        response = self.client.get(f"/api/similarrecipes/{self.curry.mealid}/")
+        self.assertEqual([r["title"] for r in response.json()["recipes"]], ["Chicken Korma"])
+
+        # The private recipe gets neighbours but is nobody's neighbour
+        own = SimilarMeal.objects.filter(meal=self.private).values_list("similar_id", flat=True)
+        self.assertEqual(list(own)[:1], [self.curry.id])
+        self.assertFalse(SimilarMeal.objects.filter(similar=self.private).exists())
+
+    def test_chunk_size_does_not_change_the_result(self):
+        similarity.build_index(chunk_size=1)
+        small = self.neighbours()
+        similarity.build_index(chunk_size=256)
+        self.assertEqual(self.neighbours(), small)
+        self.assertEqual(len(small), len(set(small)))
+
+    def test_rebuild_replaces_stale_lists(self):
+        similarity.build_index()
+        SimilarMeal.objects.create(meal=self.curry, similar=self.cake, score=0.99)
+        similarity.build_index()
+        self.assertFalse(SimilarMeal.objects.filter(meal=self.curry, similar=self.cake).exists())
+
+    def test_update_meal_scores_a_new_meal_against_the_catalog(self):
+        similarity.build_index()
+        tikka = make_meal("Chicken Tikka", area="Indian", category=["Curry"],
+                          ingredients=("1 Chicken Breast", "2 tbsp Curry powder", "1 Onion"))
+        self.assertTrue(similarity.update_meal(tikka))
+        similar = set(SimilarMeal.objects.filter(meal=tikka).values_list("similar_id", flat=True))
+        self.assertTrue({self.curry.id, self.korma.id} <= similar)
+        self.assertNotIn(self.cake.id, similar)
+
+
+# -- user-028: personalized home feed -----------------------------------------
+
+class HomeFeedTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.soup, self.stew, self.pie, self.salad = (
+            make_meal(title) for title in ("Soup", "Stew", "Pie", "Salad"))
+        self.owner = make_user("owner@example.com")
+        self.secret = make_meal("Secret Stew", user=self.owner)
+        self.ann, self.bob, self.cat = (
+            make_user(f"{name}@example.com") for name in ("ann", "bob", "cat"))
+        for user, meals in ((self.ann, (self.soup, self.stew, self.secret)),
+                            (self.bob, (self.soup, self.stew, self.pie, self.secret)),
+                            (self.owner, (self.secret, self.soup))):
+            for meal in meals:
+                Favorite.objects.create(user=user, meal=meal)
+        RecipeView.objects.create(user=self.cat, meal=self.soup, mealid=self.soup.mealid)
+
+    def feed(self, **params):
+        response = self.client.get("/api/homerecipes/for-you/", params)
+        self.assertEqual(response.status_code, 200)
+        return [recipe["title"] for recipe in response.json()]
+
+    def test_feed_recommends_co_occurring_unseen_meals(self):
+        recommendations.build_recommendations(user_block=1)
+        self.login(self.cat)
+        titles = self.feed(limit=10)
+        self.assertEqual(titles[0], "Stew")
+        self.assertIn("Pie", titles)
+        self.assertNotIn("Soup", titles)
+
+    def test_private_recipes_are_never_recommended(self):
+        recommendations.build_recommendations()
+        for user in (self.ann, self.bob, self.cat):
+            self.login(user)
+            self.assertNotIn("Secret Stew", self.feed(limit=10))
+        self.client.force_authenticate(None)
+        self.assertNotIn("Secret Stew", self.feed(limit=10))
+
+    def test_anonymous_users_get_the_popular_fallback(self):
+        recommendations.build_recommendations()
+        self.assertEqual(self.feed(limit=2), ["Soup", "Stew"])
+
+    def test_feed_before_the_first_build_hides_private_recipes(self):
+        titles = self.feed(limit=10)
+        self.assertEqual(titles[0], "Salad")
+        self.assertNotIn("Secret Stew", titles)
+
+
+# -- user-029: local nutrition ------------------------------------------------
+
+class NutritionTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.meal = make_meal("Chicken Rice", ingredients=(
+            "200 g Rice", "2 Chicken Breast", "1 pinch Unobtainium"))
+
+    def nutrition(self, meal=None, **params):
+        return self.client.get(f"/api/nutrition/{(meal or self.meal).mealid}/", params)
+
+    def test_totals_are_computed_from_the_reference_table(self):
+        data = self.nutrition(servings=2).json()
+        # 200 g rice (365 kcal/100 g) + 2 x 170 g chicken breast (165 kcal/100 g)
+        self.assertEqual(data["per_recipe"]["calories"], 1291.0)
+        self.assertEqual(data["per_serving"]["calories"], 645.5)
+        self.assertEqual(data["unmatched"], ["1 pinch Unobtainium"])
+
+    def test_results_are_cached_until_the_ingredients_change(self):
+        self.nutrition()
+        with mock.patch.object(nutrition, "analyze_stored",
+                               wraps=nutrition.analyze_stored) as analyze:
+            self.assertEqual(self.nutrition().json()["per_recipe"]["calories"], 1291.0)
+            analyze.assert_not_called()
+
+            self.meal.ingredients = ["100 g Rice"]
+            self.meal.save()
+            self.assertEqual(self.nutrition().json()["per_recipe"]["calories"], 365.0)
+            analyze.assert_called_once()
+        self.assertEqual(MealNutrition.objects.get(meal=self.meal).calories, 365.0)
+
+    def test_invalid_servings_and_private_recipes_are_rejected(self):
+        self.assertEqual(self.nutrition(servings=0).status_code, 400)
+        secret = make_meal("Secret", user=make_user("owner@example.com"))
+        self.assertEqual(self.nutrition(secret).status_code, 404)
+
+    def test_chat_is_given_the_computed_facts(self):
+        backend = self.use_fake_llm(
+            responder=lambda system_instruction, contents: contents[0]["parts"][0])
+        response = self.client.post("/api/detail-page-ai/", {
+            "mealid": self.meal.mealid,
+            "messages": [{"role": "user", "content": "How many calories?"}],
+        }, format="json")
+        self.assertIn("1291 kcal", response.json()["reply"])
+        self.assertEqual(backend.calls, 1)
+
+
+# -- user-030: pantry matching ------------------------------------------------
+
+class PantryTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.omelette = make_meal("Omelette", ingredients=("3 Eggs", "1 tsp Salt", "50 g Cheese"))
+        self.pancakes = make_meal("Pancakes", ingredients=("2 Eggs", "200 g Flour", "300 ml Milk"))
+        self.owner = make_user("owner@example.com")
+        self.shared = make_meal("Shared Frittata", user=self.owner, is_public=True,
+                                ingredients=("4 Eggs", "1 Onion"))
+        self.secret = make_meal("Secret Scramble", user=self.owner, ingredients=("2 Eggs",))
+
+    def titles(self, ingredients="eggs,cheese"):
+        response = self.client.get("/api/pantry/", {"ingredients": ingredients})
+        self.assertEqual(response.status_code, 200)
+        return {r["title"]: r for r in response.json()["recipes"]}
+
+    def test_recipes_are_ranked_by_coverage_with_missing_lines(self):
+        recipes = self.titles()
+        self.assertEqual(recipes["Omelette"]["coverage"], 1.0)
+        self.assertEqual(recipes["Pancakes"]["missing"], ["200 g Flour", "300 ml Milk"])
+
+    def test_private_recipes_are_only_matched_for_their_owner(self):
+        self.assertNotIn("Secret Scramble", self.titles())
+        self.login(self.owner)
+        self.assertIn("Secret Scramble", self.titles())
+
+    def test_unsharing_elsewhere_hides_a_recipe_the_index_still_lists(self):
+        self.assertIn("Shared Frittata", self.titles())
+        # Another worker's edit: no signal reaches this process's index
+        Meal.objects.filter(pk=self.shared.pk).update(is_public=False)
+        self.assertNotIn("Shared Frittata", self.titles())
+        self.login(self.owner)
+        self.assertIn("Shared Frittata", self.titles())
+
+
+# -- user-031: structured ingredient rows -------------------------------------
+
+class MealIngredientTests(ApiTestCase):
+    LINES = ["1½ cups Plain Flour", "200g Chicken Breasts, diced", "Salt", "2-3 Tomatoes",
+             "1 tbsp of Olive Oil", "1/0 Eggs", ""]
+
+    def rows(self, meal):
+        return list(MealIngredient.objects.filter(meal=meal).order_by("position").values_list(
+            "position", "quantity", "unit", "name", "original_text"))
+
+    def test_rows_follow_the_ingredient_list(self):
+        meal = make_meal(ingredients=self.LINES)
+        rows = self.rows(meal)
+        self.assertEqual([row[2:4] for row in rows[:3]],
+                         [("cup", "plain flour"), ("g", "chicken breast"), ("", "salt")])
+        self.assertEqual(str(rows[0][1]), "1.500")
+        self.assertEqual(str(rows[3][1]), "2.000")
+        self.assertIsNone(rows[5][1])
+
+        meal.ingredients = ["3 Eggs"]
+        meal.save()
+        self.assertEqual([row[3] for row in self.rows(meal)], ["egg"])
+
+    def test_backfill_migration_matches_the_live_parser(self):
+        meal = make_meal(ingredients=self.LINES)
+        expected = self.rows(meal)
+        MealIngredient.objects.all().delete()
+
+        from django.apps import apps
+        migration = importlib.import_module("core.migrations.0021_backfill_meal_ingredients")
+        migration.backfill(apps, None)
+        self.assertEqual(self.rows(meal), expected)
+
+
+# -- user-032: typo-tolerant title search -------------------------------------
+
+class TrigramSearchTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.biryani = make_meal("Chicken Biryani")
+        make_meal("Beef Stew")
+        self.owner = make_user("owner@example.com")
+        make_meal("Lamb Biryani", user=self.owner)
+
+    def search(self, name):
+        response = self.client.get(f"/api/recipefilter/{name}/")
+        return [r["title"] for r in response.json()] if response.status_code == 200 else []
+
+    def test_misspelt_titles_are_found_without_private_recipes(self):
+        self.assertEqual(self.search("biryni"), ["Chicken Biryani"])
+        self.login(self.owner)
+        self.assertEqual(sorted(self.search("biryni")), ["Chicken Biryani", "Lamb Biryani"])
+
+    def test_meals_deleted_elsewhere_are_dropped_from_the_index(self):
+        trigram_search.index.ensure_fresh()
+        trigram_search.index.update(999999, "Chicken Biryani")
+        self.assertEqual(self.search("biryni"), ["Chicken Biryani"])
+        self.assertNotIn(999999, trigram_search.index.meal_grams)
+        self.assertIn(self.biryani.id, trigram_search.index.meal_grams)
+
+    def test_backfill_migration_indexes_unindexed_meals(self):
+        expected = sorted(MealTrigram.objects.values_list("meal_id", "trigram"))
+        MealTrigram.objects.filter(meal=self.biryani).delete()
+
+        from django.apps import apps
+        migration = importlib.import_module("core.migrations.0023_backfill_meal_trigrams")
+        migration.backfill(apps, None)
+        self.assertEqual(sorted(MealTrigram.objects.values_list("meal_id", "trigram")), expected)
+
+
+# -- user-033: autocomplete ---------------------------------------------------
+
+class AutocompleteTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        vocabulary = os.path.join(self.var_dir, "ingredients.json")
+        with open(vocabulary, "w") as f:
+            f.write('["Basil", "Chickpeas"]')
+        vocabulary = override_settings(AUTOCOMPLETE_INGREDIENTS_PATH=vocabulary)
+        vocabulary.enable()
+        self.addCleanup(vocabulary.disable)
+        self.biryani = make_meal("Chicken Biryani", mealid="52795")
+        self.owner = make_user("owner@example.com")
+        self.shared = make_meal("Biryani Bowl", user=self.owner, is_public=True, mealid="AI1")
+        make_meal("Secret Biryani", user=self.owner, mealid="AI2")
+
+    def suggest(self, q="bir"):
+        response = self.client.get("/api/autocomplete/", {"q": q})
+        self.assertEqual(response.status_code, 200)
+        return [(s["text"], s.get("mealid")) for s in response.json()]
+
+    def test_prefixes_match_any_word_of_visible_titles(self):
+        self.assertEqual(sorted(self.suggest()),
+                         [("Biryani Bowl", "AI1"), ("Chicken Biryani", "52795")])
+        self.assertEqual(self.suggest("chick"),
+                         [("Chicken Biryani", "52795"), ("Chickpeas", None)])
+
+    def test_recipes_made_private_elsewhere_are_not_suggested(self):
+        self.suggest()
+        # Another worker's edit: no signal reaches this process's index
+        Meal.objects.filter(pk=self.shared.pk).update(is_public=False)
+        self.assertEqual(self.suggest(), [("Chicken Biryani", "52795")])
+        self.assertNotIn(self.shared.id, autocomplete.index.meal_suggestion)
+
+    def test_rebuilds_run_outside_the_index_lock(self):
+        self.suggest()
+        real_build = autocomplete.AutocompleteIndex._build
+        lock_free = []
+
+        def build(fresh):
+            real_build(fresh)
+            probe = threading.Thread(target=lambda: lock_free.append(
+                autocomplete.index._lock.acquire(timeout=1) and
+                autocomplete.index._lock.release() is None))
+            probe.start()
+            probe.join()
+            # Saved while the fresh index is being built: replayed after the swap
+            make_meal("Biryani Burrito", mealid="52999")
+
+        with override_settings(AUTOCOMPLETE_REBUILD_SECONDS=0), \
+                mock.patch.object(autocomplete.AutocompleteIndex, "_build", build):
+            autocomplete.index.ensure_fresh()
+        self.assertEqual(lock_free, [True])
+        self.assertIn(("Biryani Burrito", "52999"), self.suggest())
+
+
+# -- user-034: browse facets --------------------------------------------------
+
+class BrowseTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        make_meal("Tiramisu", category=["Dessert"], area=" Italian ")
+        make_meal("Lasagne", category=["Pasta", "Beef"], area="Italian")
+        make_meal("Trifle", category=["Dessert"], area="British")
+        self.owner = make_user("owner@example.com")
+        self.secret = make_meal("Secret Sundae", user=self.owner, category=["Dessert"],
+                                area="American")
+
+    def browse(self, **params):
+        response = self.client.get("/api/browse/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def counts(self, facet):
+        return {f["value"]: f["count"] for f in self.browse()["facets"][facet]}
+
+    def test_filters_and_counts_cover_visible_recipes_only(self):
+        self.assertEqual(self.counts("category"), {"Dessert": 2, "Pasta": 1, "Beef": 1})
+        self.assertEqual(self.counts("area"), {"Italian": 2, "British": 1})
+        titles = [r["title"] for r in self.browse(category="Dessert,Beef", area="Italian")["results"]]
+        self.assertEqual(titles, ["Lasagne", "Tiramisu"])
+
+    def test_counters_follow_sharing_and_deletes(self):
+        self.secret.is_public = True
+        self.secret.save()
+        self.assertEqual(self.counts("category")["Dessert"], 3)
+        self.assertEqual(self.counts("area")["American"], 1)
+        self.secret.delete()
+        self.assertEqual(self.counts("category")["Dessert"], 2)
+        self.assertNotIn("American", self.counts("area"))
+
+    def test_pages_follow_the_cursor(self):
+        first = self.browse(limit=2)
+        second = self.browse(limit=2, cursor=first["next_cursor"])
+        self.assertEqual([r["title"] for r in first["results"]], ["Trifle", "Lasagne"])
+        self.assertEqual([r["title"] for r in second["results"]], ["Tiramisu"])
+        self.assertIsNone(second["next_cursor"])
+        self.assertNotIn("facets", second)
+
+    def test_backfill_migration_matches_the_signals(self):
+        links = sorted(MealCategory.objects.values_list("meal_id", "category__name"))
+        counts = sorted(FacetCount.objects.filter(count__gt=0).values_list(
+            "facet", "value", "count"))
+        MealCategory.objects.all().delete()
+        FacetCount.objects.all().delete()
+
+        from django.apps import apps
+        migration = importlib.import_module("core.migrations.0022_backfill_facets")
+        migration.backfill(apps, None)
+        self.assertEqual(sorted(MealCategory.objects.values_list("meal_id", "category__name")),
+                         links)
+        self.assertEqual(sorted(FacetCount.objects.values_list("facet", "value", "count")),
+                         counts)
+
+
+# -- user-035: SQLite pragmas -------------------------------------------------
+
+class SqliteTuningTests(ApiTestCase):
+    def pragmas(self, *names, **pragmas):
+        db = sqlite3.connect(os.path.join(self.var_dir, "tuning.sqlite3"))
+        self.addCleanup(db.close)
+        sqlite_tuning.apply_pragmas(db.cursor(), pragmas)
+        return [db.execute(f"PRAGMA {name}").fetchone()[0] for name in names]
+
+    def test_defaults_switch_to_wal_with_a_busy_timeout(self):
+        self.assertEqual(
+            self.pragmas("journal_mode", "synchronous", "busy_timeout", "temp_store",
+                         **sqlite_tuning.DEFAULT_PRAGMAS),
+            ["wal", 1, 5000, 2])
+
+    def test_blank_values_are_skipped_and_bad_ones_rejected(self):
+        self.assertEqual(self.pragmas("journal_mode", journal_mode=""), ["delete"])
+        with self.assertRaises(ValueError):
+            self.pragmas(busy_timeout="1; DROP TABLE core_meal")
+
+    def test_new_connections_are_tuned_unless_disabled(self):
+        connection = mock.MagicMock(vendor="sqlite")
+        cursor = connection.cursor.return_value.__enter__.return_value
+        with override_settings(SQLITE_PRAGMAS={"busy_timeout": 250}):
+            sqlite_tuning.configure_connection(None, connection)
+        cursor.execute.assert_called_once_with("PRAGMA busy_timeout=250")
+
+        cursor.reset_mock()
+        with override_settings(SQLITE_TUNING_ENABLED=False):
+            sqlite_tuning.configure_connection(None, connection)
+        cursor.execute.assert_not_called()
+
+
+# -- user-036: read replica routing -------------------------------------------
+
+class ReplicaRoutingTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.meal = make_meal()
+        self.user = make_user()
+        for patcher in (mock.patch.object(db_router, "replica_configured", return_value=True),
+                        mock.patch.object(db_router.PrimaryReplicaRouter, "db_for_read",
+                                          self.record_read)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def record_read(self, model, **hints):
+        # Remember where the read would go, but serve it from the test database
+        self.reads.append(db_router._read_alias.get() or "default")
+        return None
+
+    def read_aliases(self, path):
+        self.reads = []
+        self.assertEqual(self.client.get(path).status_code, 200)
+        return set(self.reads)
+
+    def test_anonymous_reads_use_the_replica(self):
+        self.assertEqual(self.read_aliases(f"/api/recipedetail/{self.meal.mealid}/"), {"replica"})
+        self.assertIsNone(db_router._read_alias.get())
+
+    def test_a_successful_write_pins_the_user_to_the_primary(self):
+        self.login(self.user)
+        self.assertEqual(self.read_aliases(f"/api/recipedetail/{self.meal.mealid}/"), {"replica"})
+        self.client.post("/api/favorites/toggle/", {"mealid": "missing"}, format="json")
+        self.assertEqual(self.read_aliases(f"/api/recipedetail/{self.meal.mealid}/"), {"replica"})
+
+        self.client.post("/api/favorites/toggle/", {"mealid": self.meal.mealid}, format="json")
+        self.assertEqual(self.read_aliases(f"/api/recipedetail/{self.meal.mealid}/"), {"default"})
+        self.assertFalse(db_router.is_pinned(make_user("other@example.com")))
+
+    def test_signed_in_bundles_read_the_primary(self):
+        path = f"/api/recipedetail/{self.meal.mealid}/bundle/"
+        self.assertEqual(self.read_aliases(path), {"replica"})
+        self.login(self.user)
+        self.assertEqual(self.read_aliases(path), {"default"})
+
+    def test_the_replica_is_never_migrated(self):
+        router = db_router.PrimaryReplicaRouter()
+        self.assertFalse(router.allow_migrate(db_router.REPLICA, "core"))
+        self.assertTrue(router.allow_migrate("default", "core"))
+
+
+# -- user-037: AI throttles and upstream slots -------------------------------
+
+def recipe_json(system_instruction, contents):
+    return '{"title": "Omelette"}'
+
+
+class ThrottlingTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.backend = self.use_fake_llm(responder=recipe_json)
+        self.login(make_user())
+
+    def generate(self, **data):
+        return self.client.post("/api/recipe-ai/", {"prompt": "An omelette", **data}, format="json")
+
+    def rates(self, burst, sustained):
+        return mock.patch.object(throttling.TokenBucketThrottle, "THROTTLE_RATES",
+                                 {"ai_burst": burst, "ai_sustained": sustained})
+
+    def test_a_refused_request_spends_no_tokens(self):
+        with self.rates("2/min", "1/day"):
+            self.assertEqual(self.generate().status_code, 200)
+            refused = self.generate()
+            self.assertEqual(refused.status_code, 429)
+            self.assertGreater(int(refused["Retry-After"]), 60)
+        # The sustained refusal left the burst bucket's second token alone
+        with self.rates("2/min", None):
+            self.assertEqual(self.generate().status_code, 200)
+            self.assertEqual(self.generate().status_code, 429)
+        self.assertEqual(self.backend.calls, 2)
+
+    @override_settings(UPSTREAM_CONCURRENCY={"gemini": 1})
+    def test_busy_slots_reject_requests_without_calling_upstream(self):
+        slots = throttling.upstream_slots("gemini")
+        held = slots.acquire()
+        self.addCleanup(slots.release, held)
+        response = self.generate()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "2")
+        self.assertEqual(self.backend.calls, 0)
+
+    @override_settings(UPSTREAM_CONCURRENCY={"gemini": 1})
+    def test_job_workers_share_the_upstream_slots(self):
+        job_id = self.generate(**{"async": True}).json()["job_id"]
+        slots = throttling.upstream_slots("gemini")
+        held = slots.acquire()
+        jobs.work(worker="w1", once=True)
+        job = Job.objects.get(id=job_id)
+        self.assertEqual((job.status, job.attempts), ("queued", 0))
+        self.assertGreater(job.run_after, job.created_at)
+        self.assertEqual(self.backend.calls, 0)
+
+        slots.release(held)
+        Job.objects.filter(id=job_id).update(run_after=job.created_at)
+        jobs.work(worker="w1", once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("succeeded", 1))
+        self.assertEqual(job.result, {"title": "Omelette"})
+        # The worker gave its slot back
+        held = slots.acquire()
+        self.assertIsNotNone(held)
+        slots.release(held)
+
+
+# -- user-038: background jobs -----------------------------------------------
+
+class JobTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.backend = self.use_fake_llm(responder=recipe_json)
+        self.user = self.login(make_user())
+
+    def enqueue(self):
+        response = self.client.post("/api/recipe-ai/", {"prompt": "An omelette", "async": True},
+                                    format="json")
+        self.assertEqual(response.status_code, 202)
+        return Job.objects.get(id=response.json()["job_id"])
+
+    def status(self, job, **params):
+        return self.client.get(f"/api/jobs/{job.id}/", params)
+
+    def expire(self, job):
+        Job.objects.filter(id=job.id).update(lease_until=timezone.now() - timedelta(seconds=1))
+
+    def test_results_are_only_shown_to_the_requester(self):
+        job = self.enqueue()
+        self.assertEqual(self.status(job).json()["status"], "queued")
+        jobs.work(worker="w1", once=True)
+        self.assertEqual(self.status(job).json()["result"], {"title": "Omelette"})
+        self.login(make_user("other@example.com"))
+        self.assertEqual(self.status(job).status_code, 404)
+
+    def test_long_polls_are_capped(self):
+        job = self.enqueue()
+        with mock.patch.object(jobs, "wait_for", wraps=jobs.wait_for) as wait_for:
+            self.status(job)
+            self.status(job, wait=600)
+        self.assertEqual([c.args[1] for c in wait_for.call_args_list], [0.0, 5])
+
+    def test_an_expired_lease_is_taken_over(self):
+        job = self.enqueue()
+        self.assertEqual(jobs.claim("dead").id, job.id)
+        self.assertIsNone(jobs.claim("w2"))
+        self.expire(job)
+        job = jobs.claim("w2")
+        self.assertEqual((job.leased_by, job.attempts), ("w2", 2))
+        # The original worker coming back late can't overwrite the new lease
+        self.assertEqual(jobs._finish(job, "dead", status="failed"), 0)
+        self.assertEqual(jobs.run(job, "w2"), "succeeded")
+
+    def test_an_expired_lease_on_the_last_attempt_fails_the_job(self):
+        job = self.enqueue()
+        Job.objects.filter(id=job.id).update(max_attempts=1)
+        jobs.claim("dead")
+        self.expire(job)
+        self.assertIsNone(jobs.claim("w2"))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("failed", 1))
+        self.assertIn("last attempt", self.status(job).json()["error"])
+        self.assertEqual(self.backend.calls, 0)
+
+    def test_upstream_errors_are_retried_with_backoff(self):
+        self.backend.responder = lambda system_instruction, contents: "no json here"
+        job = self.enqueue()
+        jobs.work(worker="w1", once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("queued", 1))
+        self.assertGreater(job.run_after, timezone.now())
+
+        for _ in range(2):
+            Job.objects.filter(id=job.id).update(run_after=timezone.now())
+            jobs.work(worker="w1", once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.result_status), ("failed", 3, 500))
+
+
+# -- user-039: Prometheus metrics --------------------------------------------
+
+class MetricsTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = os.path.join(self.var_dir, "metrics")
+        directory = override_settings(METRICS_DIR=self.directory, METRICS_TOKEN="s3cret")
+        directory.enable()
+        self.addCleanup(directory.disable)
+
+    def scrape(self, authorization=None):
+        headers = {"HTTP_AUTHORIZATION": authorization} if authorization else {}
+        return self.client.get("/metrics", **headers)
+
+    def test_scrapes_need_the_metrics_token(self):
+        self.assertEqual(self.scrape().status_code, 403)
+        self.assertEqual(self.scrape("Bearer wrong").status_code, 403)
+        # A user's JWT is not a scrape token
+        self.client.force_authenticate(make_user(is_staff=True))
+        self.assertEqual(self.scrape().status_code, 403)
+        response = self.scrape("Bearer s3cret")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"# TYPE cache_requests_total counter", response.content)
+
+    @override_settings(METRICS_TOKEN="")
+    def test_no_token_configured_means_an_open_endpoint(self):
+        self.assertEqual(self.scrape().status_code, 200)
+
+    @skipIf(metrics.fcntl is None, "snapshots are only pruned where fcntl is available")
+    def test_snapshots_of_exited_processes_are_folded_in_once(self):
+        exited = subprocess.Popen([sys.executable, "-c", "pass"])
+        exited.wait()
+        os.makedirs(self.directory)
+        snapshot = os.path.join(self.directory, f"{exited.pid}-1.json")
+        with open(snapshot, "w") as f:
+            f.write('[["cache_requests_total", ["chat_answers", "hit"], 4.0]]')
+
+        line = b'cache_requests_total{cache="chat_answers",result="hit"} 4'
+        for _ in range(2):
+            self.assertIn(line, self.scrape("Bearer s3cret").content)
+        self.assertEqual(sorted(os.listdir(self.directory)), ["retired.json", "retired.lock"])
+
+
+# -- user-040: request profiling ---------------------------------------------
+
+class ProfilingTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = os.path.join(self.var_dir, "profiles")
+        directory = override_settings(PROFILE_DIR=self.directory, PROFILE_SAMPLE_RATE=0.0)
+        directory.enable()
+        self.addCleanup(directory.disable)
+        patcher = mock.patch.object(profiling, "_pruned_at", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.admin = self.login(make_user("admin@example.com", is_staff=True))
+        self.token = self.client.post("/api/profiles/token/").json()["token"]
+        self.client.force_authenticate(None)
+
+    def get(self, token=None, **params):
+        headers = {"HTTP_X_PROFILE": token} if token else {}
+        return self.client.get("/api/homerecipes/", params, **headers)
+
+    def test_only_a_valid_header_token_profiles_a_request(self):
+        self.assertNotIn("X-Profile-Id", self.get(profile=self.token))
+        self.assertNotIn("X-Profile-Id", self.get("not-a-token"))
+        profile_id = self.get(self.token)["X-Profile-Id"]
+
+        self.assertEqual(self.client.get(f"/api/profiles/{profile_id}/").status_code, 401)
+        self.login(self.admin)
+        profile = self.client.get(f"/api/profiles/{profile_id}/").json()
+        self.assertEqual((profile["path"], profile["status"]), ("/api/homerecipes/", 200))
+        self.assertGreaterEqual(profile["sql"]["count"], 1)
+
+    @override_settings(PROFILE_MAX_FILES=1)
+    def test_old_profiles_are_pruned_at_most_once_per_interval(self):
+        for _ in range(3):
+            self.get(self.token)
+        # Pruned after the first write only
+        self.assertEqual(len(profiling.list_profiles()), 3)
+        with override_settings(PROFILE_PRUNE_SECONDS=0):
+            self.get(self.token)
+        self.assertEqual(len(profiling.list_profiles()), 1)
+
+
+# -- user-041: HTTP benchmark suite ------------------------------------------
+
+class BenchmarkTests(ApiTestCase):
+    def result(self, p95_ms, rps):
+        return {"p95_ms": p95_ms, "rps": rps}
+
+    def test_percentiles_use_the_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual([benchmark.percentile(values, f) for f in (0.5, 0.95, 0.99)],
+                         [50, 95, 99])
+        self.assertEqual(benchmark.percentile([], 0.5), 0.0)
+
+    def test_regressions_are_flagged_against_the_baseline(self):
+        baseline = {"detail@8": self.result(10.0, 100.0), "filter@8": self.result(1.0, 100.0),
+                    "home@8": self.result(10.0, 100.0)}
+        current = {"detail@8": self.result(20.0, 100.0), "filter@8": self.result(2.5, 100.0),
+                   "home@8": self.result(10.0, 70.0), "new@8": self.result(50.0, 1.0)}
+        rows, regressions = benchmark.compare(current, baseline, 0.2)
+        # filter@8 grew 150% but by under 2 ms: noise.  new@8 has no baseline.
+        self.assertEqual(sorted(regressions), ["detail@8", "home@8"])
+        self.assertEqual(len(rows), 3)
+
+    def test_stubs_answer_upstream_calls_offline(self):
+        from . import enrichment, views
+        for module in (views, enrichment, image_proxy):
+            patcher = mock.patch.object(module, "requests", module.requests)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(llm.set_backend, llm.set_backend(None))
+        benchmark.install_stubs(0.0, 0.0)
+
+        self.login(make_user())
+        recipe = self.client.post("/api/recipe-ai/", {"prompt": "A curry"}, format="json")
+        self.assertEqual(recipe.json()["meals"][0]["strMeal"], "Benchmark Chicken Curry")
+        found = self.client.get("/api/spooncularrecipes/", {"ingredients": "chicken"})
+        self.assertEqual(len(found.json()), 5)
+
+    @override_settings(METRICS_TOKEN="")
+    def test_scenarios_report_latency_and_queries_per_request(self):
+        with override_settings(METRICS_DIR=os.path.join(self.var_dir, "metrics"),
+                               ALLOWED_HOSTS=["127.0.0.1"]):
+            server, base_url = benchmark.start_server(threads=2)
+            self.addCleanup(server.server_close)
+            self.addCleanup(server.shutdown)
+            ctx = mock.Mock(base_url=base_url)
+            summary = benchmark.run_scenario(
+                ctx, benchmark.Scenario("metrics", "GET", "/metrics", auth=None),
+                concurrency=2, count=6, warmup=2)
+        self.assertEqual(summary["statuses"], {"200": 6})
+        self.assertEqual((summary["requests"], summary["errors"], summary["queries"]), (6, 0, 0))
+        self.assertLessEqual(summary["p50_ms"], summary["p99_ms"])
+
+
+# -- user-042: synthetic data ------------------------------------------------
+
+class SyntheticDataTests(ApiTestCase):
+    def generate(self, *args, **options):
+        options = {"users": 6, "meals": 40, "views": 300, "seed": 7, "owned_fraction": 0.25,
+                   **options}
+        call_command("generate_synthetic_data", *args, stdout=io.StringIO(), **options)
+
+    def catalog(self):
+        return list(Meal.objects.order_by("mealid").values_list(
+            "mealid", "title", "ingredients", "is_public"))
+
+    def test_generation_is_deterministic_per_seed(self):
+        self.generate()
+        first = self.catalog()
+        self.generate("--clear")
+        self.assertEqual(self.catalog(), first)
+        self.assertEqual(User.objects.count(), 6)
+        with self.assertRaises(CommandError):
+            self.generate()
+
+    def test_every_table_is_filled_and_indexed(self):
+        self.generate()
+        self.assertEqual(Profile.objects.count(), 6)
+        self.assertEqual(RecipeView.objects.count(), 300)
+        self.assertTrue(Favorite.objects.exists() and GroceryList.objects.exists())
+        self.assertTrue(Meal.objects.filter(user__isnull=False).exists())
+        # Bulk inserts skip the signals, so the derived tables are rebuilt
+        self.assertEqual(MealIngredient.objects.values("meal_id").distinct().count(), 40)
+        self.assertEqual(MealTrigram.objects.values("meal_id").distinct().count(), 40)
+        # Strangers never see private recipes, so they aren't viewed or favorited
+        self.assertFalse(RecipeView.objects.filter(meal__user__isnull=False,
+                                                   meal__is_public=False).exists())
+
+    def test_popularity_is_long_tailed(self):
+        self.generate()
+        views = sorted(RecipeView.objects.values("meal_id").annotate(
+            n=Count("id")).values_list("n", flat=True), reverse=True)
+        self.assertGreater(views[0], 5 * views[len(views) // 2])
+
+
+# -- user-043: LLM deadlines and hedging -------------------------------------
+
+@override_settings(LLM_HEDGE_MIN_SAMPLES=5, LLM_HEDGE_MIN_DELAY=0.02, LLM_HEDGE_BUDGET=1.0)
+class HedgingTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        for attr, value in (("_windows", defaultdict(llm.LatencyWindow)),
+                            ("_budget", None), ("_pool", None)):
+            patcher = mock.patch.object(llm, attr, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(llm.metrics, "inc")
+        self.inc = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def warm(self, seconds=0.01):
+        for _ in range(5):
+            llm._windows["test"].add(seconds)
+
+    def hedges(self):
+        return [call.kwargs["outcome"] for call in self.inc.call_args_list
+                if call.args == (llm.metrics.LLM_HEDGES,)]
+
+    def test_a_slow_primary_is_beaten_by_the_hedge(self):
+        self.warm()
+        # Seed 1: the first call draws the 5 s tail, the second doesn't
+        backend = self.use_fake_llm(latency=0.01, tail_latency=5.0, tail_rate=0.5, seed=1)
+        started = time.monotonic()
+        self.assertEqual(llm.generate("test", "", "hi").text, "OK")
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(backend.calls, 2)
+        self.assertEqual(self.hedges(), ["sent", "won"])
+
+    @override_settings(LLM_HEDGE_BUDGET=0.0)
+    def test_hedges_past_the_budget_are_skipped(self):
+        self.warm()
+        backend = self.use_fake_llm(latency=0.01, tail_latency=0.2, tail_rate=0.5, seed=1)
+        self.assertEqual(llm.generate("test", "", "hi").text, "OK")
+        self.assertEqual(backend.calls, 1)
+        self.assertEqual(self.hedges(), ["over_budget"])
+
+    def test_no_hedging_until_the_window_has_enough_samples(self):
+        backend = self.use_fake_llm(latency=0.05)
+        llm.generate("test", "", "hi")
+        self.assertEqual((backend.calls, self.hedges()), (1, []))
+        self.assertIsNone(llm.hedge_delay("test"))
+
+    def test_calls_past_the_deadline_time_out(self):
+        self.use_fake_llm(latency=2.0)
+        started = time.monotonic()
+        with self.assertRaises(llm.LLMTimeout):
+            llm.generate("test", "", "hi", timeout=0.2)
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.login(make_user())
+        with override_settings(LLM_TIMEOUT_SECONDS=0.2):
+            response = self.client.post("/api/recipe-ai/", {"prompt": "Soup"}, format="json")
+        self.assertEqual(response.status_code, 504)
+
+
+# -- user-044: lazy SDK loading ----------------------------------------------
+
+class LazyBackendTests(ApiTestCase):
+    def test_startup_does_not_import_the_gemini_sdk(self):
+        from .management.commands import benchmark_startup
+        code = (benchmark_startup.STARTUP + "; import sys; "
+                "print('google.generativeai' in sys.modules, 'google.ai' in sys.modules)")
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(__file__)),
+                                env=dict(os.environ, LLM_WARM_UP="False"))
+        self.assertEqual(result.stdout.strip(), "False False", result.stderr)
+
+    @override_settings(LLM_BACKEND="api.llm.FakeBackend")
+    def test_the_backend_is_created_on_first_use(self):
+        self.addCleanup(llm.set_backend, llm.set_backend(None))
+        self.assertIsNone(llm._backend)
+        llm.warm_up()
+        backend = llm._backend
+        self.assertIsInstance(backend, llm.FakeBackend)
+        self.assertIs(llm.get_backend(), backend)
+
+    def test_import_times_are_summed_per_package(self):
+        from .management.commands.benchmark_startup import Command
+        report = ("import time: self [us] | cumulative | imported package\n"
+                  "import time:       120 |        120 |     rest_framework.views\n"
+                  "import time:        30 |        150 |   rest_framework\n"
+                  "import time:       400 |        400 | numpy\n")
+        self.assertEqual(Command().by_package(report), [(400, "numpy"), (150, "rest_framework")])
+
+
+# -- user-045: bulk favorites -------------------------------------------------
+
+class BulkFavoritesTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.login(make_user())
+        self.other = make_user("other@example.com")
+        self.soup = make_meal("Tomato Soup", is_public=True, mealid="52772")
+        self.stew = make_meal("Beef Stew", is_public=True, mealid="52773")
+        self.secret = make_meal("Secret Curry", user=self.other, mealid="AI1")
+
+    def test_status_reports_a_flag_per_mealid(self):
+        Favorite.objects.create(user=self.user, meal=self.soup)
+        Favorite.objects.create(user=self.other, meal=self.stew)
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/favorites/status/?mealids=52772,52773,nope")
+        self.assertEqual(response.json()["favorited"],
+                         {"52772": True, "52773": False, "nope": False})
+
+    def test_status_requires_mealids(self):
+        self.assertEqual(self.client.get("/api/favorites/status/").status_code, 400)
+
+    @override_settings(BATCH_MAX_MEALIDS=2)
+    def test_status_caps_the_number_of_mealids(self):
+        response = self.client.get("/api/favorites/status/?mealids=1,2,3")
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_adds_and_removes_idempotently(self):
+        Favorite.objects.create(user=self.user, meal=self.stew)
+        Favorite.objects.create(user=self.user, meal=self.soup)
+        response = self.client.post("/api/favorites/bulk/",
+                                    {"add": ["52772"], "remove": ["52773"]}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"favorited": {"52772": True, "52773": False},
+                                           "not_found": []})
+        self.assertEqual(list(Favorite.objects.filter(user=self.user)
+                              .values_list("meal__mealid", flat=True)), ["52772"])
+
+    def test_remove_wins_when_a_mealid_is_in_both_lists(self):
+        response = self.client.post("/api/favorites/bulk/",
+                                    {"add": ["52772"], "remove": ["52772"]}, format="json")
+        self.assertEqual(response.json()["favorited"], {"52772": False})
+        self.assertFalse(Favorite.objects.exists())
+
+    def test_other_users_private_meals_cannot_be_favorited(self):
+        response = self.client.post("/api/favorites/bulk/",
+                                    {"add": ["AI1", "52772", "missing"]}, format="json")
+        self.assertEqual(response.json()["not_found"], ["AI1", "missing"])
+        self.assertFalse(Favorite.objects.filter(meal=self.secret).exists())
+
+    def test_prefers_the_users_own_copy_of_a_mealid(self):
+        mine = make_meal("My Curry", user=self.user, mealid="AI1")
+        self.client.post("/api/favorites/bulk/", {"add": ["AI1"]}, format="json")
+        self.assertEqual(list(Favorite.objects.values_list("meal", flat=True)), [mine.id])
+
+    def test_rejects_an_empty_payload(self):
+        response = self.client.post("/api/favorites/bulk/", {}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+# -- user-046: batch recipe lookup --------------------------------------------
+
+class BatchRecipeTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.other = make_user("other@example.com")
+        self.system = make_meal("Tomato Soup", mealid="52772")
+        self.shared = make_meal("Shared Stew", user=self.other, is_public=True, mealid="AI2")
+        self.secret = make_meal("Secret Curry", user=self.other, mealid="AI1")
+
+    def batch(self, mealids, **params):
+        return self.client.get("/api/recipes/batch/", {"mealids": mealids, **params}).json()
+
+    def test_other_users_private_meals_are_missing(self):
+        self.login(self.user)
+        data = self.batch("52772,AI1,AI2,nope")
+        self.assertEqual(list(data["recipes"]), ["52772", "AI2"])
+        self.assertEqual(data["missing"], ["AI1", "nope"])
+
+    def test_anonymous_users_only_see_visible_meals(self):
+        data = self.batch("AI1,52772")
+        self.assertEqual(list(data["recipes"]), ["52772"])
+        self.assertEqual(data["missing"], ["AI1"])
+
+    def test_the_users_own_copy_wins(self):
+        mine = make_meal("My Curry", user=self.login(self.user), mealid="AI2")
+        self.assertEqual(self.batch("AI2")["recipes"]["AI2"]["id"], mine.id)
+        self.assertEqual(self.batch("AI1,AI2")["missing"], ["AI1"])
+
+    def test_is_one_query_for_any_number_of_meals(self):
+        for n in range(5):
+            make_meal(f"Extra {n}", mealid=f"X{n}")
+        with self.assertNumQueries(1):
+            data = self.batch("52772,X0,X1,X2,X3,X4", compact="true")
+        self.assertEqual(len(data["recipes"]), 6)
+        self.assertNotIn("instructions", data["recipes"]["X0"])
+
+    @override_settings(BATCH_MAX_MEALIDS=2)
+    def test_rejects_too_many_mealids(self):
+        response = self.client.get("/api/recipes/batch/?mealids=1,2,3")
+        self.assertEqual(response.status_code, 400)
+
+
+# -- user-047: recipe page bundle ---------------------------------------------
+
+class RecipeBundleTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.other = make_user("other@example.com")
+        self.soup = make_meal("Tomato Soup", mealid="52772")
+        self.secret = make_meal("Secret Curry", user=self.other, mealid="AI1")
+
+    def bundle(self, mealid, **params):
+        return self.client.get(f"/api/recipedetail/{mealid}/bundle/", params)
+
+    def test_other_users_private_meals_are_not_found(self):
+        self.assertEqual(self.bundle("AI1").status_code, 404)
+        self.login(self.user)
+        self.assertEqual(self.bundle("AI1").status_code, 404)
+        self.assertFalse(RecipeView.objects.exists())
+
+    def test_signed_in_bundle_records_the_view(self):
+        self.login(self.user)
+        Favorite.objects.create(user=self.user, meal=self.soup)
+        data = self.bundle("52772").json()
+        self.assertEqual(data["recipe"]["title"], "Tomato Soup")
+        self.assertTrue(data["is_favorited"])
+        self.assertEqual([view["mealid"] for view in data["recent_views"]], ["52772"])
+        self.assertEqual(data["missing"], {})
+        self.assertFalse(data["partial"])
+
+    def test_anonymous_bundle_has_no_user_data(self):
+        data = self.bundle("52772").json()
+        self.assertIsNone(data["is_favorited"])
+        self.assertIsNone(data["recent_views"])
+        self.assertFalse(RecipeView.objects.exists())
+
+    def test_unknown_include_is_rejected(self):
+        self.assertEqual(self.bundle("52772", include="nope").status_code, 400)
+
+    @override_settings(BUNDLE_DEADLINE_SECONDS=0.2)
+    def test_enrichment_that_misses_the_deadline_is_reported(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def slow(recipe, timeout):
+            release.wait(5)
+            return []
+
+        def fast(recipe, timeout):
+            return {"lines": len(recipe["ingredients"])}
+
+        with mock.patch.dict(enrichment.ENRICHMENTS, {"slow": slow, "fast": fast}):
+            started = time.monotonic()
+            data = self.bundle("52772", include="fast,slow").json()
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(data["enrichment"], {"fast": {"lines": 2}})
+        self.assertEqual(list(data["missing"]), ["slow"])
+        self.assertTrue(data["partial"])
+
+
+# -- user-048: profile picture thumbnails -------------------------------------
+
+def _picture(color, size=(400, 300), fmt="PNG"):
+    out = io.BytesIO()
+    Image.new("RGB", size, color).save(out, fmt)
+    return ContentFile(out.getvalue())
+
+
+@override_settings(PROFILE_THUMBNAIL_SIZES=[32, 64])
+class ThumbnailTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.profile = Profile.objects.create(user=make_user())
+
+    def upload(self, color):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.profile_picture.save(f"{color}.png", _picture(color))
+
+    def variant_files(self):
+        directory = os.path.join(self.var_dir, "media", thumbnails.VARIANT_DIR)
+        return sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+
+    def test_saves_before_the_job_runs_share_one_job(self):
+        self.upload("red")
+        self.upload("blue")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.bio = "Cook"
+            self.profile.save()
+        self.assertEqual(Job.objects.filter(kind="profile_thumbnails").count(), 1)
+
+    def test_job_renders_square_variants_served_as_immutable(self):
+        self.upload("red")
+        jobs.work(worker="w1", once=True)
+        self.profile.refresh_from_db()
+        urls = thumbnails.variant_urls(self.profile)
+        self.assertEqual(sorted(urls), ["32", "64"])
+        self.assertEqual(len(self.variant_files()), 4)
+
+        response = self.client.get(urls["64"]["webp"])
+        self.assertEqual(response["Content-Type"], "image/webp")
+        self.assertIn("immutable", response["Cache-Control"])
+        with Image.open(io.BytesIO(b"".join(response.streaming_content))) as image:
+            self.assertEqual(image.size, (64, 64))
+        cached = self.client.get(urls["64"]["webp"], HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+    def test_variants_of_a_stale_picture_are_not_served(self):
+        self.upload("red")
+        jobs.work(worker="w1", once=True)
+        self.upload("blue")
+        self.profile.refresh_from_db()
+        self.assertEqual(thumbnails.variant_urls(self.profile), {})
+
+    def test_replaced_variants_are_deleted(self):
+        self.upload("red")
+        jobs.work(worker="w1", once=True)
+        old = self.variant_files()
+        self.upload("blue")
+        jobs.work(worker="w1", once=True)
+        new = self.variant_files()
+        self.assertEqual(len(new), 4)
+        self.assertFalse(set(old) & set(new))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.profile_picture = None
+            self.profile.save()
+        self.assertEqual(self.variant_files(), [])
+
+    def test_shared_variants_are_kept_while_referenced(self):
+        other = Profile.objects.create(user=make_user("other@example.com"))
+        self.upload("red")
+        with self.captureOnCommitCallbacks(execute=True):
+            other.profile_picture.save("red.png", _picture("red"))
+        jobs.work(worker="w1", once=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.profile_picture = None
+            self.profile.save()
+        self.assertEqual(len(self.variant_files()), 4)
+
+    def test_unknown_names_are_not_found(self):
+        self.assertEqual(self.client.get("/api/thumbnails/..%2Fsecret.jpg").status_code, 404)
+        self.assertEqual(self.client.get(f"/api/thumbnails/{'0' * 32}-64.jpg").status_code, 404)
+
+
+# -- user-049: image proxy ----------------------------------------------------
+
+def _jpeg():
+    out = io.BytesIO()
+    Image.new("RGB", (800, 600), (200, 120, 40)).save(out, "JPEG")
+    return out.getvalue()
+
+
+class _ImageHost(BaseHTTPRequestHandler):
+    """``/photo.jpg`` serves a JPEG after ``delay`` seconds; ``/moved.jpg`` redirects to it."""
+    body = _jpeg()
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.hits.append(self.path)
+        if self.path == "/moved.jpg":
+            self.send_response(302)
+            self.send_header("Location", "/photo.jpg")
+            self.end_headers()
+            return
+        time.sleep(self.server.delay)
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@override_settings(IMAGE_PROXY_ALLOWED_HOSTS=["127.0.0.1"], IMAGE_PROXY_WIDTHS=[160, 320],
+                   IMAGE_PROXY_DEFAULT_WIDTH=320, IMAGE_PROXY_TIMEOUT_SECONDS=5)
+class ImageProxyTests(ApiTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _ImageHost)
+        cls.server.lock = threading.Lock()
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.origin = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.server.hits = []
+        self.server.delay = 0
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        settings_override = override_settings(IMAGE_PROXY_DIR=self.cache_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        image_proxy._cache = None
+        self.addCleanup(setattr, image_proxy, "_cache", None)
+
+    def name(self, source_url, width=320, ext="webp"):
+        return f"{image_proxy.digest(source_url)}-{width}.{ext}"
+
+    def test_miss_fetches_once_and_writes_every_variant(self):
+        source = f"{self.origin}/photo.jpg"
+        with image_proxy.variant(source, self.name(source)) as f:
+            with Image.open(f) as image:
+                self.assertEqual(image.size, (320, 240))
+        self.assertEqual(sorted(os.listdir(self.cache_dir)), sorted(
+            self.name(source, width, ext) for width in (160, 320) for ext in ("webp", "jpg")))
+
+        image_proxy.variant(source, self.name(source, 160, "jpg")).close()
+        self.assertEqual(self.server.hits, ["/photo.jpg"])
+
+    def test_concurrent_misses_share_one_fetch(self):
+        source = f"{self.origin}/photo.jpg"
+        self.server.delay = 0.3
+        results, errors = [], []
+
+        def fetch():
+            try:
+                with image_proxy.variant(source, self.name(source)) as f:
+                    results.append(len(f.read()))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=fetch) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(results), 8)
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(self.server.hits, ["/photo.jpg"])
+
+    def test_lru_evicts_least_recently_served(self):
+        store = image_proxy.DiskLRU(self.cache_dir, max_bytes=350)
+        for i, name in enumerate(("a", "b", "c")):
+            store.put(name, b"x" * 100)
+            os.utime(os.path.join(self.cache_dir, name), (1000 + i, 1000 + i))
+        store.open("a").close()   # served: now the most recent
+
+        store.put("d", b"x" * 100)
+        self.assertEqual(sorted(os.listdir(self.cache_dir)), ["a", "c", "d"])
+
+    def test_etag_revalidation_is_304_without_fetch(self):
+        source = f"{self.origin}/photo.jpg"
+        meal = Meal.objects.create(mealid="T1", title="Test", category=["Dessert"],
+                                   ingredients=[], image=source)
+        url = image_proxy.proxy_url(meal)
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/webp")
+        etag = response["ETag"]
+        b"".join(response.streaming_content)
+        response.close()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(self.server.hits, ["/photo.jpg"])
+
+    def test_hosts_outside_the_allowlist_are_not_fetched(self):
+        meal = Meal(id=1, image="http://169.254.169.254/latest/meta-data/")
+        self.assertIsNone(image_proxy.proxy_url(meal))
+        with override_settings(IMAGE_PROXY_ALLOWED_HOSTS=["themealdb.com"]):
+            for source in (f"{self.origin}/photo.jpg",
+                           "http://themealdb.com.evil.test/photo.jpg",
+                           "http://themealdb.com@127.0.0.1/photo.jpg"):
+                with self.assertRaises(image_proxy.ImageUnavailable):
+                    image_proxy.variant(source, self.name(source))
+            self.assertTrue(image_proxy.allowed("https://www.themealdb.com/images/x.jpg"))
+        self.assertEqual(self.server.hits, [])
+
+    def test_redirects_are_not_followed(self):
+        source = f"{self.origin}/moved.jpg"
+        with self.assertRaises(image_proxy.ImageUnavailable):
+            image_proxy.variant(source, self.name(source))
+        self.assertEqual(self.server.hits, ["/moved.jpg"])
+
+
+# -- user-050: sparse fieldsets -----------------------------------------------
+
+class FieldsetTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.login(make_user(name="Ada"))
+        self.soup = make_meal("Tomato Soup", instructions="Simmer for an hour.")
+        self.curry = make_meal("Shared Curry", user=self.user, is_public=True,
+                               is_user_added=True, instructions="Stir.")
+
+    def fetch(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json(), [query["sql"] for query in queries]
+
+    def test_lists_default_to_the_summary(self):
+        data, sql = self.fetch("/api/recipefilter/soup/")
+        sql = " ".join(sql)
+        self.assertEqual(set(data[0]), set(MEAL_SUMMARY_FIELDS))
+        self.assertNotIn('"instructions"', sql)
+        self.assertNotIn('"ingredients"', sql)
+
+    def test_selected_fields_load_only_their_columns(self):
+        data, sql = self.fetch("/api/ingredientfilter/Tomato/", fields="title,thumbnail")
+        sql = " ".join(sql)
+        self.assertEqual(set(data[0]), {"title", "thumbnail"})
+        self.assertIn('"image"', sql)
+        self.assertNotIn('"area"', sql)
+        self.assertNotIn('"instructions"', sql)
+
+    def test_full_returns_every_field(self):
+        data, _ = self.fetch("/api/recipefilter/soup/", fields="full")
+        self.assertEqual(data[0]["instructions"], "Simmer for an hour.")
+        self.assertEqual(set(data[0]), set(MealSerializer.Meta.fields))
+
+    def test_unknown_fields_are_rejected(self):
+        for url in ("/api/recipefilter/soup/", "/api/favorites/", "/api/ai-recipes/"):
+            response = self.client.get(url, {"fields": "title,secret"})
+            self.assertEqual(response.status_code, 400, url)
+            self.assertIn("secret", response.json()["error"])
+
+    def test_user_name_is_joined_in_the_same_query(self):
+        data, sql = self.fetch("/api/ai-recipes/", public="true", fields="title,user_name")
+        self.assertEqual(data["recipes"], [{"title": "Shared Curry", "user_name": "Ada"}])
+        # The count, then the page with its users joined in
+        self.assertEqual(len(sql), 2)
+        self.assertIn('"core_user"', sql[1])
+
+    def test_favorites_load_only_the_selected_meal_columns(self):
+        Favorite.objects.create(user=self.user, meal=self.soup)
+        data, sql = self.fetch("/api/favorites/", fields="title")
+        self.assertEqual(data["favorites"][0]["meal"], {"title": "Tomato Soup"})
+        self.assertNotIn('"instructions"', " ".join(sql))
@@ -0,0 +1,177 @@
+"""
+Rate limiting for endpoints that call paid upstream APIs.
+
+``AIBurstRateThrottle`` / ``AISustainedRateThrottle`` are token buckets kept
+in the shared default cache, keyed by user id (or client IP when anonymous):
+the burst bucket absorbs a few quick messages, the sustained one caps daily
+use.  Rates come from ``REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]``.
+``AIRateThrottle`` checks both and only spends a token from each when both
+have one, so a request the sustained bucket refuses doesn't drain the burst.
+
+``UpstreamConcurrencyMixin`` additionally caps how many requests may be
+talking to one upstream at once across all workers on this host
+(``UPSTREAM_CONCURRENCY``).  When every slot is busy the request fails fast
+with 429 + ``Retry-After`` rather than tying up a worker in a queue.  Slots
+are ``flock`` locks on files under ``var/locks``, so a crashed worker never
+leaks one; where ``fcntl`` is unavailable the cap is per process.
+"""
+import os
+import random
+import threading
+
+from django.conf import settings
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle, SimpleRateThrottle
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """``num/period`` means a bucket of ``num`` tokens refilled over ``period``."""
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+    def peek(self, request, view):
+        """Whether a token is available, without spending it."""
+        self.key = None
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        capacity, period = self.num_requests, self.duration
+        self.now = self.timer()
+        tokens, stamp = self.cache.get(self.key, (capacity, self.now))
+        self.tokens = min(capacity, tokens + (self.now - stamp) * capacity / period)
+        return self.tokens >= 1
+
+    def spend(self):
+        """Take the token ``peek`` found."""
+        if self.key is None:
+            return
+        # Read-modify-write is not atomic across workers; at worst a burst
+        # of simultaneous requests overspends by a token or two
+        self.cache.set(self.key, (self.tokens - 1, self.now), self.duration)
+
+    def allow_request(self, request, view):
+        if not self.peek(request, view):
+            return False
+        self.spend()
+        return True
+
+    def wait(self):
+        return (1 - self.tokens) * self.duration / self.num_requests
+
+
+class AIBurstRateThrottle(TokenBucketThrottle):
+    scope = "ai_burst"
+
+
+class AISustainedRateThrottle(TokenBucketThrottle):
+    scope = "ai_sustained"
+
+
+class AIRateThrottle(BaseThrottle):
+    """Burst and sustained buckets together: a token is spent from both or neither."""
+    buckets = (AIBurstRateThrottle, AISustainedRateThrottle)
+
+    def allow_request(self, request, view):
+        throttles = [bucket() for bucket in self.buckets]
+        self.refused = [t for t in throttles if not t.peek(request, view)]
+        if self.refused:
+            return False
+        for throttle in throttles:
+            throttle.spend()
+        return True
+
+    def wait(self):
+        return max(throttle.wait() for throttle in self.refused)
+
+
+AI_THROTTLES = [AIRateThrottle]
+
+
+class UpstreamSlots:
+    def __init__(self, name, limit):
+        self.name = name
+        self.limit = limit
+        self._semaphore = threading.BoundedSemaphore(limit)
+        self._dir = str(getattr(
+            settings, "UPSTREAM_LOCK_DIR", settings.BASE_DIR / "var" / "locks"))
+
+    def acquire(self):
+        """Return a slot handle, or None if all ``limit`` slots are busy."""
+        if fcntl is None:
+            return self._semaphore if self._semaphore.acquire(blocking=False) else None
+        os.makedirs(self._dir, exist_ok=True)
+        # Random start spreads workers over the slots instead of all racing slot 0
+        start = random.randrange(self.limit)
+        for i in range(self.limit):
+            path = os.path.join(self._dir, f"{self.name}-{(start + i) % self.limit}.lock")
+            handle = open(path, "a")
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return handle
+            except OSError:
+                handle.close()
+        return None
+
+    def release(self, handle):
+        if handle is self._semaphore:
+            self._semaphore.release()
+        else:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+            handle.close()
+
+
+_slots = {}
+_slots_lock = threading.Lock()
+
+
+def upstream_slots(name):
+    limit = getattr(settings, "UPSTREAM_CONCURRENCY", {}).get(name)
+    if not limit:
+        return None
+    with _slots_lock:
+        if name not in _slots or _slots[name].limit != limit:
+            _slots[name] = UpstreamSlots(name, limit)
+        return _slots[name]
+
+
+class UpstreamConcurrencyMixin:
+    """Hold one of the upstream's slots for the duration of the request."""
+    upstream = None
+
+    def needs_upstream_slot(self, request):
+        return True
+
+    def initial(self, request, *args, **kwargs):
+        # Runs after authentication and throttling, so rejected requests never take a slot
+        super().initial(request, *args, **kwargs)
+        self._upstream_slot = None
+        slots = upstream_slots(self.upstream)
+        if slots is None or not self.needs_upstream_slot(request):
+            return
+        slot = slots.acquire()
+        if slot is None:
+            raise Throttled(
+                wait=getattr(settings, "UPSTREAM_RETRY_AFTER", 2),
+                detail=f"Too many requests to {self.upstream} right now. Please retry shortly.")
+        self._upstream_slot = (slots, slot)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        held = getattr(self, "_upstream_slot", None)
+        if held is not None:
+            slots, slot = held
+            slots.release(slot)
+            self._upstream_slot = None
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,137 @@
+"""
+Resized variants of profile pictures.
+
+Uploads are stored as-is under ``MEDIA_ROOT/profiles/``, which can be several
+megabytes for a 40px avatar.  Saving a profile with a new picture enqueues a
+``profile_thumbnails`` job (``signals.profile_saved``); the job worker renders
+a square crop at each of ``PROFILE_THUMBNAIL_SIZES`` as WebP and JPEG, without
+EXIF/ICC/XMP metadata (camera details, GPS), and records the file names in
+``Profile.picture_variants``.  Names are the SHA-256 of the encoded bytes, so a
+URL never changes meaning and ``ProfileThumbnail`` can mark it immutable.
+When a new set replaces the old one, files no profile refers to any more are
+deleted.
+"""
+import hashlib
+import io
+import re
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from PIL import Image, ImageOps
+
+from core.models import Profile
+
+
+VARIANT_DIR = "profiles/variants"
+FORMATS = {"webp": "WEBP", "jpg": "JPEG"}
+NAME = re.compile(r"^[0-9a-f]{32}-\d+\.(webp|jpg)$")
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def sizes():
+    return sorted(int(size) for size in _setting("PROFILE_THUMBNAIL_SIZES", (64, 128, 256)))
+
+
+def encode(image, size, ext):
+    """One variant as bytes: a ``size`` x ``size`` crop with no metadata."""
+    variant = ImageOps.fit(image, (size, size), Image.LANCZOS)
+    if ext == "jpg" and variant.mode != "RGB":
+        # JPEG has no alpha: flatten transparent avatars onto white
+        background = Image.new("RGB", variant.size, (255, 255, 255))
+        background.paste(variant, mask=variant.getchannel("A") if "A" in variant.mode else None)
+        variant = background
+    out = io.BytesIO()
+    # Pillow only writes exif / icc_profile when passed them explicitly
+    variant.save(out, FORMATS[ext], quality=_setting("PROFILE_THUMBNAIL_QUALITY", 80),
+                 optimize=True)
+    return out.getvalue()
+
+
+def render(picture):
+    """``{size: {ext: file name}}`` for an uploaded picture (a file-like object)."""
+    with Image.open(picture) as image:
+        # Phone photos are stored sideways with an EXIF rotation flag
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+        variants = {}
+        for size in sizes():
+            variants[str(size)] = {}
+            for ext in FORMATS:
+                data = encode(image, size, ext)
+                name = f"{hashlib.sha256(data).hexdigest()[:32]}-{size}.{ext}"
+                path = f"{VARIANT_DIR}/{name}"
+                if not default_storage.exists(path):
+                    default_storage.save(path, ContentFile(data))
+                variants[str(size)][ext] = name
+    return variants
+
+
+def file_names(variants):
+    """Every file name in a ``Profile.picture_variants`` value."""
+    return {name for files in (variants or {}).get("sizes", {}).values()
+            for name in files.values()}
+
+
+def delete_unused(variants):
+    """Delete the files of ``variants`` that no profile refers to any more."""
+    for name in file_names(variants):
+        # Identical uploads share files, so another profile may still use it
+        if not Profile.objects.filter(picture_variants__icontains=name).exists():
+            default_storage.delete(f"{VARIANT_DIR}/{name}")
+
+
+def build(payload):
+    """Job handler: ``(body, status)`` like the synchronous endpoints."""
+    profile = Profile.objects.filter(id=payload.get("profile_id")).first()
+    if profile is None:
+        return {"error": "Profile not found."}, 404
+    previous = profile.picture_variants
+    source = profile.profile_picture.name if profile.profile_picture else ""
+    if not source:
+        Profile.objects.filter(id=profile.id).update(picture_variants={})
+        delete_unused(previous)
+        return {"variants": {}}, 200
+    try:
+        with profile.profile_picture.open("rb") as picture:
+            variants = render(picture)
+    except (OSError, Image.DecompressionBombError) as e:
+        # Not an image we can read; retrying won't help
+        return {"error": f"Could not read profile picture: {str(e)}"}, 422
+
+    # Skip the write if the picture was replaced while we worked; its own job follows
+    written = {"source": source, "sizes": variants}
+    if Profile.objects.filter(id=profile.id, profile_picture=source).update(
+            picture_variants=written):
+        delete_unused(previous)
+    else:
+        delete_unused(written)
+    return {"variants": variants}, 200
+
+
+def variant_urls(profile, request=None):
+    """``{size: {"webp": url, "jpg": url}}``; empty until the job has run."""
+    stored = profile.picture_variants or {}
+    if not profile.profile_picture or stored.get("source") != profile.profile_picture.name:
+        return {}
+    urls = {}
+    for size, files in stored.get("sizes", {}).items():
+        urls[size] = {}
+        for ext, name in files.items():
+            url = reverse("profile_thumbnail", args=[name])
+            urls[size][ext] = request.build_absolute_uri(url) if request else url
+    return urls
+
+
+def open_variant(name):
+    """The stored variant ``name`` as a file, or None for unknown / malformed names."""
+    if not NAME.match(name):
+        return None
+    path = f"{VARIANT_DIR}/{name}"
+    if not default_storage.exists(path):
+        return None
+    return default_storage.open(path, "rb")
@@ -0,0 +1,150 @@
+"""
+Typo-tolerant recipe title search.
+
+Titles are accent-folded and split into padded word trigrams (pg_trgm style)
+stored in the indexed ``MealTrigram`` side table.  Each worker mirrors that
+table into in-memory posting lists, sweeping new rows by their monotonic id
+every ``TRIGRAM_INDEX_REFRESH_SECONDS``; because re-indexing a meal deletes
+and re-inserts its rows, edits made by other workers arrive the same way.
+
+A query only walks the posting lists of its own trigrams, rarest first, and
+stops admitting new candidates after ``TRIGRAM_MAX_CANDIDATES`` so lookup
+cost stays bounded as the catalog grows.  Candidates are ranked by the share
+of the query's trigrams found in the title (so "biryni" still finds "Chicken
+Biryani"), ties broken by whole-title Jaccard similarity.
+"""
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from core.models import Meal, MealTrigram
+from .ingredients import fold
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def normalize_title(text):
+    return " ".join(re.findall(r"[a-z0-9]+", fold(text)))
+
+
+def trigrams(text):
+    """Set of trigrams of each word padded as "  word " ("biryani" -> "  b", " bi", ...)."""
+    grams = set()
+    for word in normalize_title(text).split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def index_meals(meals, batch_size=5000):
+    """(Re)write the side-table rows for ``meals``. Returns rows written."""
+    meals = list(meals)
+    rows = [MealTrigram(meal_id=meal.id, trigram=gram)
+            for meal in meals for gram in trigrams(meal.title)]
+    with transaction.atomic():
+        MealTrigram.objects.filter(meal_id__in=[m.id for m in meals]).delete()
+        MealTrigram.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def rebuild(chunk_size=2000, stdout=None):
+    """Rebuild the whole side table. Returns ``(meals, rows)``."""
+    MealTrigram.objects.all().delete()
+    total_meals = total_rows = 0
+    last_id = 0
+    while True:
+        chunk = list(Meal.objects.filter(id__gt=last_id).order_by("id")
+                     .only("id", "title")[:chunk_size])
+        if not chunk:
+            break
+        total_rows += index_meals(chunk)
+        total_meals += len(chunk)
+        last_id = chunk[-1].id
+        if stdout is not None:
+            stdout.write(f"  {total_meals} meals indexed")
+    return total_meals, total_rows
+
+
+class TrigramIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refreshed_at = None
+        self.postings = defaultdict(set)   # trigram -> {meal id}
+        self.meal_grams = {}               # meal id -> frozenset of trigrams
+        self.max_row_id = 0
+
+    def _set_meal(self, meal_id, grams):
+        for gram in self.meal_grams.pop(meal_id, ()):
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(meal_id)
+                if not ids:
+                    del self.postings[gram]
+        if grams:
+            self.meal_grams[meal_id] = frozenset(grams)
+            for gram in grams:
+                self.postings[gram].add(meal_id)
+
+    def _sweep(self):
+        rows = MealTrigram.objects.filter(id__gt=self.max_row_id).order_by(
+            "id").values_list("id", "meal_id", "trigram")
+        fresh = defaultdict(set)
+        for row_id, meal_id, gram in rows.iterator(chunk_size=20000):
+            fresh[meal_id].add(gram)
+            self.max_row_id = row_id
+        for meal_id, grams in fresh.items():
+            self._set_meal(meal_id, grams)
+
+    def ensure_fresh(self):
+        now = time.monotonic()
+        interval = _setting("TRIGRAM_INDEX_REFRESH_SECONDS", 30)
+        with self._lock:
+            if self._refreshed_at is None or now - self._refreshed_at >= interval:
+                self._sweep()
+                self._refreshed_at = now
+
+    def update(self, meal_id, title):
+        with self._lock:
+            self._set_meal(meal_id, trigrams(title))
+
+    def discard(self, meal_id):
+        with self._lock:
+            self._set_meal(meal_id, ())
+
+    def search(self, query, limit=20, min_similarity=None):
+        """Return ``[(meal_id, similarity), ...]`` best first."""
+        if min_similarity is None:
+            min_similarity = _setting("TRIGRAM_MIN_SIMILARITY", 0.5)
+        max_candidates = _setting("TRIGRAM_MAX_CANDIDATES", 2000)
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+
+        self.ensure_fresh()
+        with self._lock:
+            overlap = Counter()
+            # Rare trigrams are the most selective; common ones only add
+            # weight to candidates we already have once the budget is spent
+            for gram in sorted(query_grams, key=lambda g: len(self.postings.get(g, ()))):
+                for meal_id in self.postings.get(gram, ()):
+                    if meal_id in overlap or len(overlap) < max_candidates:
+                        overlap[meal_id] += 1
+
+            scored = []
+            for meal_id, shared in overlap.items():
+                similarity = shared / len(query_grams)
+                if similarity >= min_similarity:
+                    size = len(self.meal_grams.get(meal_id, ()))
+                    jaccard = shared / (len(query_grams) + size - shared)
+                    scored.append((meal_id, similarity, jaccard))
+        scored.sort(key=lambda item: (-item[1], -item[2]))
+        return [(meal_id, similarity) for meal_id, similarity, _ in scored[:limit]]
+
+
+index = TrigramIndex()
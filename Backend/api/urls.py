@@ -1,17 +1,30 @@
 from django.urls import path, include
-from .views import HomeRecipes, RecipeDetail, RecipeFilter, GeminiChat, GeminiRecipeDetail, RecipeAIChat, GenerateGroceryList, SpoonacularRecipeDetail, SpoonacularRecipes, IngredientsFilter, GroceryListCreate, ListFavorites, ToggleFavorite, RecentRecipeViews, SaveAIRecipe, ListAIRecipes, ShareAIRecipe, UnshareAIRecipe, DeleteAIRecipe
+from .views import HomeRecipes, RecipeDetail, RecipeFilter, GeminiChat, GeminiRecipeDetail, RecipeAIChat, GenerateGroceryList, SpoonacularRecipeDetail, SpoonacularRecipes, IngredientsFilter, GroceryListCreate, ListFavorites, ToggleFavorite, RecentRecipeViews, SaveAIRecipe, ListAIRecipes, ShareAIRecipe, UnshareAIRecipe, DeleteAIRecipe, PurgeChatCache, SimilarRecipes, HomeFeed, RecipeNutrition, PantryRecipes, Autocomplete, BrowseRecipes, JobStatus, ProfileToken, ListProfiles, ProfileDetail, FavoriteStatus, BulkFavorites, BatchRecipeDetail, RecipeBundle, ProfileThumbnail, RecipeImage
 
 
 urlpatterns = [
     path('homerecipes/', HomeRecipes.as_view(), name="home_recipes"),
+    path('homerecipes/for-you/', HomeFeed.as_view(), name="home_feed"),
     path('recipedetail/<str:id>/', RecipeDetail.as_view(), name="recipe_detail"),
+    path('recipedetail/<str:id>/bundle/', RecipeBundle.as_view(), name="recipe_bundle"),
+    path('recipes/batch/', BatchRecipeDetail.as_view(), name="batch_recipe_detail"),
+    path('nutrition/<str:id>/', RecipeNutrition.as_view(), name="recipe_nutrition"),
+    path('similarrecipes/<str:id>/', SimilarRecipes.as_view(), name="similar_recipes"),
     path('ingredientfilter/<path:ingredients>/',
          IngredientsFilter.as_view(), name="ingredient_filter"),
+    path('pantry/', PantryRecipes.as_view(), name="pantry_recipes"),
     path('recipefilter/<str:name>/', RecipeFilter.as_view(), name="recipe_filter"),
+    path('autocomplete/', Autocomplete.as_view(), name="autocomplete"),
+    path('browse/', BrowseRecipes.as_view(), name="browse_recipes"),
     path('chatbot/', GeminiChat.as_view(), name="chatbot"),
+    path('chatbot/cache/', PurgeChatCache.as_view(), name="chatbot_cache_purge"),
     path('recipe-ai/', GeminiRecipeDetail.as_view(), name="recipe_ai"),
     path('detail-page-ai/', RecipeAIChat.as_view(), name="detail_page_ai"),
     path('grocery-list/', GenerateGroceryList.as_view(), name="grocery_list"),
+    path('jobs/<uuid:job_id>/', JobStatus.as_view(), name="job_status"),
+    path('profiles/', ListProfiles.as_view(), name="list_profiles"),
+    path('profiles/token/', ProfileToken.as_view(), name="profile_token"),
+    path('profiles/<str:profile_id>/', ProfileDetail.as_view(), name="profile_detail"),
     path('spooncularrecipes/', SpoonacularRecipes.as_view(),
          name='spoonacular_recipes'),
     path('spoonculardetail/<int:recipe_id>/',
@@ -22,6 +35,8 @@ urlpatterns = [
          GroceryListCreate.as_view(), name="grocery-list-delete"),
     path('favorites/', ListFavorites.as_view(), name="list_favorites"),
     path('favorites/toggle/', ToggleFavorite.as_view(), name="toggle_favorite"),
+    path('favorites/status/', FavoriteStatus.as_view(), name="favorite_status"),
+    path('favorites/bulk/', BulkFavorites.as_view(), name="bulk_favorites"),
     path('recent-views/', RecentRecipeViews.as_view(), name="recent_views"),
     path('ai-recipes/save/', SaveAIRecipe.as_view(), name="save_ai_recipe"),
     path('ai-recipes/', ListAIRecipes.as_view(), name="list_ai_recipes"),
@@ -29,4 +44,6 @@ urlpatterns = [
     path('ai-recipes/unshare/', UnshareAIRecipe.as_view(), name="unshare_ai_recipe"),
     path('ai-recipes/<int:meal_id>/',
          DeleteAIRecipe.as_view(), name="delete_ai_recipe"),
+    path('thumbnails/<str:name>', ProfileThumbnail.as_view(), name="profile_thumbnail"),
+    path('images/<int:meal_id>/<str:name>', RecipeImage.as_view(), name="recipe_image"),
 ]
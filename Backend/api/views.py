@@ -1,28 +1,27 @@
-from google.ai.generativelanguage_v1beta.types import permission
 from rest_framework import viewsets
 from rest_framework import status, permissions
 import requests
 from rest_framework.views import APIView
 from rest_framework.response import Response
-import google.generativeai as genai
 from django.conf import settings
+import hmac
 import json
 import re
-from core.models import Meal, GroceryList, Favorite, RecipeView
-from core.serializers import MealSerializer, GroceryListSerializer, FavoriteSerializer, RecipeViewSerializer
+import time
+from core.models import Meal, MealCategory, GroceryList, Favorite, RecipeView
+from core.serializers import MealSerializer, MealCompactSerializer, GroceryListSerializer, FavoriteSerializer, RecipeViewSerializer
 from django.db.models import Q
 from django.db import transaction
-from decimal import Decimal, InvalidOperation, getcontext
-from fractions import Fraction
+from django.http import FileResponse, HttpResponse
+from django.urls import reverse
+from decimal import Decimal, getcontext
+from . import chat_cache, similarity, recommendations, nutrition, pantry, trigram_search, autocomplete, facets, jobs, llm, metrics, profiling, enrichment, thumbnails, image_proxy, fieldsets
+from .ingredients import parse_quantity_to_decimal
+from .db_router import ReplicaReadMixin
+from .throttling import AI_THROTTLES, UpstreamConcurrencyMixin
 
 
-try:
-    genai.configure(api_key=settings.GEMINI_API_KEY)
-except AttributeError:
-    print("FATAL ERROR: Gemini API key not configured. Check settings.py")
-
-
-class HomeRecipes(APIView):
+class HomeRecipes(ReplicaReadMixin, APIView):
     def get(self, request):
         meal = Meal.objects.all().order_by('-id')[:4]
         try:
@@ -35,35 +34,198 @@ class HomeRecipes(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class RecipeDetail(APIView):
+def get_visible_meal(user, mealid):
+    """
+    Resolve a mealid the way RecipeDetail does.
+    Authenticated users get their own recipe first, then a public one, then a
+    system recipe (user=None); anonymous users only see public/system recipes.
+    """
+    if user.is_authenticated:
+        meal = Meal.objects.filter(
+            mealid=mealid,
+            user=user
+        ).first()
+        # If not found, try public recipes or recipes without user
+        if not meal:
+            meal = Meal.objects.filter(
+                mealid=mealid,
+                is_public=True
+            ).first()
+        # If still not found, try system recipes (user=None)
+        if not meal:
+            meal = Meal.objects.filter(
+                mealid=mealid,
+                user__isnull=True
+            ).first()
+        return meal
+
+    # For unauthenticated users, only show public or system recipes
+    return Meal.objects.filter(
+        mealid=mealid
+    ).exclude(
+        user__isnull=False, is_public=False
+    ).first()
+
+
+def parse_mealids(value):
+    """A JSON list or comma-separated string of mealids, deduplicated in order."""
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, (list, tuple)):
+        return None
+    return list(dict.fromkeys(str(v).strip() for v in value if str(v).strip()))
+
+
+class Metrics(APIView):
+    # The scraper's bearer token is METRICS_TOKEN, not a JWT: checked below
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        """Prometheus scrape endpoint; requires `Authorization: Bearer <METRICS_TOKEN>` if set."""
+        token = settings.METRICS_TOKEN
+        if token and not hmac.compare_digest(
+                request.headers.get("Authorization", ""), f"Bearer {token}"):
+            return HttpResponse(status=status.HTTP_403_FORBIDDEN)
+        return HttpResponse(metrics.render(),
+                            content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+class ProfileToken(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        """Signed token that turns on profiling for requests sending it in the X-Profile header."""
+        return Response({
+            "token": profiling.issue_token(request.user),
+            "header": profiling.HEADER,
+            "expires_in": settings.PROFILE_TOKEN_MAX_AGE,
+        }, status=status.HTTP_200_OK)
+
+
+class ListProfiles(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        """Recorded request profiles, newest first."""
+        names = sorted(profiling.list_profiles(), reverse=True)
+        return Response({"profiles": [name[:-len(".json")] for name in names]},
+                        status=status.HTTP_200_OK)
+
+
+class ProfileDetail(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, profile_id):
+        """
+        One profile as JSON.
+        Query params: ?output=collapsed for flamegraph / speedscope input
+        """
+        try:
+            profile = profiling.load_profile(f"{profile_id}.json")
+        except (OSError, ValueError) as e:
+            return Response(
+                {"error": f"Failed to read profile: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        if profile is None:
+            return Response({"error": "Profile not found."}, status=status.HTTP_404_NOT_FOUND)
+        if request.GET.get("output") == "collapsed":
+            return HttpResponse(profiling.collapsed(profile), content_type="text/plain")
+        return Response(profile, status=status.HTTP_200_OK)
+
+
+class ProfileThumbnail(APIView):
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, name):
+        """A resized profile picture; the name is a content hash, so it is cached for good."""
+        variant = thumbnails.open_variant(name)
+        if variant is None:
+            return Response({"error": "Thumbnail not found."}, status=status.HTTP_404_NOT_FOUND)
+        etag = f'"{name.split("-")[0]}"'
+        if request.headers.get("If-None-Match") == etag:
+            variant.close()
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = FileResponse(variant, content_type="image/webp" if name.endswith(
+                ".webp") else "image/jpeg")
+        response["ETag"] = etag
+        response["Cache-Control"] = (f"public, max-age={settings.PROFILE_THUMBNAIL_MAX_AGE}, "
+                                     "immutable")
+        return response
+
+
+class RecipeImage(APIView):
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, meal_id, name):
+        """
+        A resized copy of a meal's image from the proxy cache (api/image_proxy.py).
+        The name carries a hash of the source URL, so the response never changes.
+        """
+        parsed = image_proxy.parse(name)
+        if parsed is None:
+            return Response({"error": "Unknown image size or format."},
+                            status=status.HTTP_404_NOT_FOUND)
+        # No visibility check: the URL hash already proves the caller saw the image URL
+        source = Meal.objects.filter(id=meal_id).values_list('image', flat=True).first()
+        if not source or image_proxy.digest(source) != parsed[0]:
+            return Response({"error": "Image not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        etag = f'"{name.rsplit(".", 1)[0]}-{parsed[2]}"'
+        cache_control = f"public, max-age={settings.IMAGE_PROXY_MAX_AGE}, immutable"
+        if request.headers.get("If-None-Match") == etag:
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            try:
+                variant = image_proxy.variant(source, name)
+            except image_proxy.ImageUnavailable as e:
+                return Response({"error": str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+            response = FileResponse(variant, content_type="image/webp" if parsed[2] == "webp"
+                                    else "image/jpeg")
+        response["ETag"] = etag
+        response["Cache-Control"] = cache_control
+        return response
+
+
+class HomeFeed(APIView):
+    def get(self, request):
+        """
+        Personalized home feed served from the precomputed recommendation
+        table (rebuild with `manage.py build_recommendations`). Anonymous users
+        and users without history get the popular fallback.
+        Query params: ?limit=N (default 4)
+        """
+        try:
+            try:
+                limit = int(request.GET.get('limit', 4))
+            except ValueError:
+                limit = 4
+            limit = max(1, min(limit, settings.RECOMMENDATIONS_PER_USER))
+
+            meals = recommendations.recommended_meals(request.user, limit)
+            if not meals:
+                # Nothing built yet: newest system and public recipes
+                meals = Meal.objects.filter(similarity.candidate_filter()).order_by('-id')[:limit]
+            serializer = MealSerializer(meals, many=True)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response(
+                {"error": f"Failed to fetch recipes: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class RecipeDetail(ReplicaReadMixin, APIView):
     def get(self, request, id):
         try:
             # Search meal by mealid (string in your JSON data)
             # If user is authenticated, prefer their recipe, otherwise get any public or system recipe
-            if request.user.is_authenticated:
-                meal = Meal.objects.filter(
-                    mealid=id,
-                    user=request.user
-                ).first()
-                # If not found, try public recipes or recipes without user
-                if not meal:
-                    meal = Meal.objects.filter(
-                        mealid=id,
-                        is_public=True
-                    ).first()
-                # If still not found, try system recipes (user=None)
-                if not meal:
-                    meal = Meal.objects.filter(
-                        mealid=id,
-                        user__isnull=True
-                    ).first()
-            else:
-                # For unauthenticated users, only show public or system recipes
-                meal = Meal.objects.filter(
-                    mealid=id
-                ).exclude(
-                    user__isnull=False, is_public=False
-                ).first()
+            meal = get_visible_meal(request.user, id)
 
             if not meal:
                 return Response(
@@ -96,19 +258,199 @@ class RecipeDetail(APIView):
             )
 
 
-class RecipeFilter(APIView):
+class RecipeBundle(ReplicaReadMixin, APIView):
+    def use_replica(self, request):
+        # A signed-in user's view is written and then read back in recent_views
+        return not request.user.is_authenticated
+
+    def get(self, request, id):
+        """
+        Everything the recipe page needs in one round trip: the recipe (recorded
+        as a view, like RecipeDetail), whether the user favorited it and their
+        recent views. Optional external data (?include=spoonacular) is fetched
+        concurrently; whatever misses BUNDLE_DEADLINE_SECONDS is listed in
+        "missing" and the rest is returned anyway ("partial": true).
+        """
+        include = [name.strip() for name in request.GET.get(
+            'include', '').split(",") if name.strip()]
+        unknown = [name for name in include if name not in enrichment.ENRICHMENTS]
+        if unknown:
+            return Response(
+                {"error": f"Unknown include: {', '.join(unknown)}. "
+                          f"Available: {', '.join(enrichment.ENRICHMENTS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            deadline = time.monotonic() + settings.BUNDLE_DEADLINE_SECONDS
+            meal = get_visible_meal(request.user, id)
+            if not meal:
+                return Response(
+                    {"error": f"No recipe found with id '{id}'."},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+            # Upstream calls run while we do the local queries
+            pending = enrichment.start(include, {"ingredients": meal.ingredients}, deadline)
+
+            data = {"recipe": MealSerializer(meal).data,
+                    "is_favorited": None, "recent_views": None}
+            if request.user.is_authenticated:
+                try:
+                    RecipeView.objects.create(
+                        user=request.user,
+                        meal=meal,
+                        mealid=id
+                    )
+                except Exception as view_error:
+                    print(f"Failed to track recipe view: {str(view_error)}")
+                data["is_favorited"] = Favorite.objects.filter(
+                    user=request.user, meal=meal).exists()
+                data["recent_views"] = RecipeViewSerializer(
+                    recent_unique_views(request.user), many=True).data
+
+            results, missing = enrichment.collect(pending, deadline)
+            data["enrichment"] = results
+            data["missing"] = missing
+            data["partial"] = bool(missing)
+            return Response(data, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response(
+                {"error": f"Failed to fetch recipe bundle: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class BatchRecipeDetail(ReplicaReadMixin, APIView):
+    def get(self, request):
+        """
+        Several recipes at once, resolved like RecipeDetail (the user's own
+        recipe, then a public one, then a system one) in a single query.
+        Unlike RecipeDetail this doesn't record recipe views.
+        Query params: ?mealids=52772,52773 (up to BATCH_MAX_MEALIDS)
+                      &compact=true for card fields only
+        Returns: {"recipes": {mealid: recipe, ...}, "missing": [mealid, ...]}
+        """
+        mealids = parse_mealids(request.GET.get("mealids", ""))
+        if not mealids:
+            return Response(
+                {"error": "Missing 'mealids' query parameter."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(mealids) > settings.BATCH_MAX_MEALIDS:
+            return Response(
+                {"error": f"At most {settings.BATCH_MAX_MEALIDS} mealids per request."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        compact = request.GET.get("compact", "").lower() == "true"
+
+        try:
+            visible = similarity.candidate_filter()
+            user_id = request.user.id if request.user.is_authenticated else None
+            if user_id:
+                visible |= Q(user_id=user_id)
+            meals = Meal.objects.filter(visible, mealid__in=mealids).order_by("id")
+            if compact:
+                meals = meals.only(*fieldsets.columns(MealCompactSerializer.Meta.fields))
+            else:
+                meals = meals.select_related("user")
+
+            # Signed in: own recipe, then public, then system. Anonymous users
+            # get the lowest id, like .first() does in get_visible_meal
+            def rank(meal):
+                if not user_id:
+                    return 0
+                if meal.user_id == user_id:
+                    return 0
+                return 1 if meal.is_public else 2
+
+            best = {}
+            for meal in meals:
+                current = best.get(meal.mealid)
+                if current is None or rank(meal) < rank(current):
+                    best[meal.mealid] = meal
+
+            serializer_class = MealCompactSerializer if compact else MealSerializer
+            return Response(
+                {
+                    "recipes": {mealid: serializer_class(best[mealid]).data
+                                for mealid in mealids if mealid in best},
+                    "missing": [mealid for mealid in mealids if mealid not in best],
+                },
+                status=status.HTTP_200_OK
+            )
+
+        except Exception as e:
+            return Response(
+                {"error": f"Failed to fetch recipes: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class SimilarRecipes(APIView):
+    def get(self, request, id):
+        """
+        Recipes similar to the given mealid, served from the precomputed
+        neighbour table (rebuild with `manage.py build_similar_recipes`).
+        Query params: ?limit=N (default SIMILAR_RECIPES_TOP_K)
+        """
+        try:
+            meal = get_visible_meal(request.user, id)
+            if not meal:
+                return Response(
+                    {"error": f"No recipe found with id '{id}'."},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+            try:
+                limit = int(request.GET.get('limit', 0)) or None
+            except ValueError:
+                limit = None
+
+            meals = similarity.similar_meals(meal, limit=limit)
+            serializer = MealSerializer(meals, many=True)
+            return Response(
+                {
+                    "count": len(meals),
+                    "recipes": serializer.data
+                },
+                status=status.HTTP_200_OK
+            )
+
+        except Exception as e:
+            return Response(
+                {"error": f"Failed to fetch similar recipes: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class RecipeFilter(ReplicaReadMixin, APIView):
     def get(self, request, name):
+        """
+        Meals whose title contains name, else typo-tolerant matches.
+        Query params: ?fields=title,image,... or ?fields=full (default: summary)
+        """
+        try:
+            fields = fieldsets.requested(request)
+        except fieldsets.InvalidFields as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
             # Search meals by name (case-insensitive)
-            meals = Meal.objects.filter(title__icontains=name)
+            meals = fieldsets.load_only(Meal.objects.filter(title__icontains=name), fields)
 
+            # Nothing matched literally: try typo-tolerant trigram search
             if not meals.exists():
+                meals = self.fuzzy_matches(request, name, fields)
+
+            if not meals:
                 return Response(
                     {"message": f"No recipes found for '{name}'."},
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            serializer = MealSerializer(meals, many=True)
+            serializer = MealSerializer(meals, many=True, context=fieldsets.context(fields))
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         except Exception as e:
@@ -117,9 +459,115 @@ class RecipeFilter(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    def fuzzy_matches(self, request, name, fields):
+        """Visible meals whose titles are trigram-similar to name, best first."""
+        ranked = trigram_search.index.search(name, limit=20)
+        visible = similarity.candidate_filter()
+        if request.user.is_authenticated:
+            visible |= Q(user=request.user)
+        found = fieldsets.load_only(Meal.objects.filter(visible), fields).in_bulk(
+            [meal_id for meal_id, _ in ranked])
+        # Ids that aren't merely hidden were deleted by another worker
+        hidden = {meal_id for meal_id, _ in ranked} - found.keys()
+        if hidden:
+            deleted = hidden - set(Meal.objects.filter(id__in=hidden).values_list('id', flat=True))
+            for meal_id in deleted:
+                trigram_search.index.discard(meal_id)
+        return [found[meal_id] for meal_id, _ in ranked if meal_id in found]
+
+
+class BrowseRecipes(APIView):
+    def get(self, request):
+        """
+        Browse recipes by facet, newest first, with keyset pagination.
+        Query params: ?category=Dessert,Vegan &area=Italian (values within a
+                      facet are OR-ed) &limit=20 &cursor=<next_cursor>
+        The first page also carries the catalog-wide facet counts.
+        """
+        categories = [c.strip() for c in request.GET.get(
+            'category', '').split(",") if c.strip()]
+        areas = [a.strip() for a in request.GET.get('area', '').split(",") if a.strip()]
+        try:
+            limit = max(1, min(int(request.GET.get('limit', 20)), 100))
+            cursor = request.GET.get('cursor')
+            cursor = int(cursor) if cursor else None
+        except ValueError:
+            return Response(
+                {"error": "'limit' and 'cursor' must be numbers."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-class IngredientsFilter(APIView):
+        try:
+            visible = similarity.candidate_filter()
+            if request.user.is_authenticated:
+                visible |= Q(user=request.user)
+            meals = Meal.objects.filter(visible).select_related('user')
+            if categories:
+                meals = meals.filter(id__in=MealCategory.objects.filter(
+                    category__name__in=categories).values('meal_id'))
+            if areas:
+                meals = meals.filter(area__in=areas)
+            if cursor is not None:
+                meals = meals.filter(id__lt=cursor)
+            page = list(meals.order_by('-id')[:limit + 1])
+
+            data = {
+                "results": MealSerializer(page[:limit], many=True).data,
+                "next_cursor": page[limit - 1].id if len(page) > limit else None,
+            }
+            if cursor is None:
+                data["facets"] = facets.facet_counts()
+            return Response(data, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response(
+                {"error": f"Failed to browse recipes: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class Autocomplete(APIView):
+    def get(self, request):
+        """
+        Typeahead suggestions for recipe titles and ingredients.
+        Query params: ?q=bir (required) &limit=8 &type=recipe|ingredient
+        """
+        query = request.GET.get('q', '').strip()
+        kind = request.GET.get('type') or None
+        if kind not in (None, 'recipe', 'ingredient'):
+            return Response(
+                {"error": "'type' must be 'recipe' or 'ingredient'."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = max(1, min(int(request.GET.get('limit', 8)), autocomplete.MAX_SUGGESTIONS))
+        except ValueError:
+            return Response(
+                {"error": "'limit' must be a number."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            return Response(autocomplete.index.suggest(query, limit=limit, kind=kind),
+                            status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response(
+                {"error": f"Failed to fetch suggestions: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class IngredientsFilter(ReplicaReadMixin, APIView):
     def get(self, request, ingredients):
+        """
+        Meals containing every comma-separated ingredient.
+        Query params: ?fields=title,image,... or ?fields=full (default: summary)
+        """
+        try:
+            fields = fieldsets.requested(request)
+        except fieldsets.InvalidFields as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
             # Split comma-separated ingredients and clean spaces
             ingredient_list = [i.strip()
@@ -137,7 +585,7 @@ class IngredientsFilter(APIView):
                 query &= Q(ingredients__icontains=ing)
 
             # Filter meals where all ingredients match (partial match)
-            meals = Meal.objects.filter(query).distinct()
+            meals = fieldsets.load_only(Meal.objects.filter(query).distinct(), fields)
 
             if not meals.exists():
                 return Response(
@@ -145,7 +593,7 @@ class IngredientsFilter(APIView):
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            serializer = MealSerializer(meals, many=True)
+            serializer = MealSerializer(meals, many=True, context=fieldsets.context(fields))
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         except Exception as e:
@@ -155,7 +603,75 @@ class IngredientsFilter(APIView):
             )
 
 
-class GeminiChat(APIView):
+class PantryRecipes(APIView):
+    def get(self, request):
+        """
+        Rank local recipes by how much of them the user's pantry covers.
+        Query params: ?ingredients=chicken,rice,onion (required)
+                      &limit=20 &min_coverage=0.5 &staples=false
+        Each recipe lists the ingredient lines still missing.
+        """
+        ingredient_list = [i.strip() for i in request.GET.get(
+            'ingredients', '').split(",") if i.strip()]
+        if not ingredient_list:
+            return Response(
+                {"message": "No ingredients provided."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            limit = max(1, min(int(request.GET.get('limit', 20)), 100))
+            min_coverage = float(request.GET.get('min_coverage', 0))
+        except ValueError:
+            return Response(
+                {"error": "'limit' and 'min_coverage' must be numbers."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        include_staples = request.GET.get('staples', 'true').lower() != 'false'
+
+        try:
+            user_id = request.user.id if request.user.is_authenticated else None
+            ranked = pantry.index.rank(
+                ingredient_list, user_id=user_id, limit=limit,
+                min_coverage=min_coverage, include_staples=include_staples)
+            # The index's owner/public flags can lag edits made by other workers
+            visible = similarity.candidate_filter()
+            if request.user.is_authenticated:
+                visible |= Q(user=request.user)
+            meals = Meal.objects.filter(visible).select_related('user').prefetch_related(
+                'ingredient_items').in_bulk([meal_id for meal_id, *_ in ranked])
+
+            results = []
+            for meal_id, coverage, matched, total in ranked:
+                meal = meals.get(meal_id)
+                if not meal:
+                    continue
+                data = MealSerializer(meal).data
+                data["coverage"] = round(coverage, 3)
+                data["matched_count"] = matched
+                data["total_count"] = total
+                data["missing"] = pantry.index.missing(
+                    meal.ingredient_items.all(), ingredient_list, include_staples)
+                results.append(data)
+
+            return Response(
+                {
+                    "count": len(results),
+                    "recipes": results
+                },
+                status=status.HTTP_200_OK
+            )
+
+        except Exception as e:
+            return Response(
+                {"error": f"Failed to match pantry: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class GeminiChat(UpstreamConcurrencyMixin, APIView):
+    upstream = "gemini"
+    throttle_classes = AI_THROTTLES
 
     # 2. Define your system instructions
     system_instructions = """
@@ -166,6 +682,33 @@ class GeminiChat(APIView):
     3.  **Be Brief and Concise:** Provide short, summary-style answers.
     """
 
+    def cached_answer(self, request):
+        """(reply, score) from the near-duplicate cache for single-turn questions, else None."""
+        if not hasattr(request, "_chat_cache_hit"):
+            request._chat_cache_hit = None
+            messages = request.data.get("messages", []) if hasattr(request.data, "get") else []
+            # Runs before post() validates the body
+            well_formed = isinstance(messages, list) and all(isinstance(m, dict) for m in messages)
+            question = chat_cache.single_turn_question(messages) if well_formed and messages else None
+            if question:
+                try:
+                    cached_reply, score = chat_cache.lookup(question)
+                    metrics.cache_result("chat_answers", cached_reply is not None)
+                    if cached_reply:
+                        request._chat_cache_hit = (cached_reply, score)
+                except Exception as e:
+                    print("Chat cache lookup error:", e)
+        return request._chat_cache_hit
+
+    def check_throttles(self, request):
+        # Cached answers cost nothing upstream, so they don't spend AI tokens
+        if self.cached_answer(request):
+            return
+        super().check_throttles(request)
+
+    def needs_upstream_slot(self, request):
+        return not self.cached_answer(request)
+
     def post(self, request):
         messages = request.data.get("messages", [])
         if not messages:
@@ -184,28 +727,99 @@ class GeminiChat(APIView):
                 "parts": [msg["content"]]
             })
 
-        try:
-            # 4. --- THIS IS THE NEW CODE ---
-            # We pass the system instructions when creating the model
-            model = genai.GenerativeModel(
-                model_name="gemini-2.5-flash",
-                system_instruction=self.system_instructions
+        # Single-turn questions can be answered from the near-duplicate cache
+        # (looked up before throttling, see cached_answer)
+        question = chat_cache.single_turn_question(messages)
+        hit = self.cached_answer(request)
+        if hit:
+            cached_reply, score = hit
+            return Response(
+                {"reply": cached_reply, "cached": True,
+                    "similarity": round(score, 3)},
+                status=status.HTTP_200_OK
             )
 
-            # 5. Generate the response using the full history
-            response = model.generate_content(
-                api_messages  # Pass the list of messages directly
-            )
+        try:
+            # Generate the response using the full history (hedged, with a deadline)
+            response = llm.generate("chatbot", self.system_instructions, api_messages)
+
+            if question:
+                try:
+                    chat_cache.store(question, response.text)
+                except Exception as e:
+                    print("Chat cache store error:", e)
 
             # 6. Return the text
-            return Response({"reply": response.text}, status=status.HTTP_200_OK)
+            return Response({"reply": response.text, "cached": False}, status=status.HTTP_200_OK)
 
+        except llm.LLMTimeout as e:
+            return Response({"error": str(e)}, status=status.HTTP_504_GATEWAY_TIMEOUT)
         except Exception as e:
             print("Gemini error:", e)
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class GeminiRecipeDetail(APIView):
+class PurgeChatCache(APIView):
+    """Drop every cached chatbot answer (admin only)"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def delete(self, request):
+        try:
+            deleted = chat_cache.purge()
+            return Response(
+                {"message": "Chat cache purged.", "deleted": deleted},
+                status=status.HTTP_200_OK
+            )
+        except Exception as e:
+            return Response(
+                {"error": f"Failed to purge chat cache: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+def job_accepted(request, job):
+    data = jobs.describe(job)
+    data["status_url"] = request.build_absolute_uri(
+        reverse("job_status", args=[job.id]))
+    return data
+
+
+class JobStatus(APIView):
+    def get(self, request, job_id):
+        """
+        Status of a queued AI request; the result is included once finished.
+        Query params: ?wait=N long-polls up to N seconds (max JOB_LONG_POLL_MAX_SECONDS,
+                      5 by default: a waiting request holds a web worker)
+        """
+        try:
+            wait = max(0.0, min(float(request.GET.get('wait', 0)),
+                                settings.JOB_LONG_POLL_MAX_SECONDS))
+        except ValueError:
+            return Response(
+                {"error": "'wait' must be a number."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            job = jobs.wait_for(job_id, wait)
+            # Jobs created by a signed-in user are only visible to them
+            if not job or (job.user_id and job.user_id != request.user.id):
+                return Response(
+                    {"error": "Job not found."},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            return Response(jobs.describe(job), status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response(
+                {"error": f"Failed to fetch job: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class GeminiRecipeDetail(UpstreamConcurrencyMixin, APIView):
+    upstream = "gemini"
+    throttle_classes = AI_THROTTLES
     # System instructions for Gemini
     system_instructions = """
     You are a professional cooking assistant.
@@ -248,6 +862,10 @@ class GeminiRecipeDetail(APIView):
     9. Always output valid JSON that can be parsed directly in Python.
     """
 
+    def needs_upstream_slot(self, request):
+        # Queued requests reach Gemini from a job worker instead
+        return not jobs.wants_async(request)
+
     def post(self, request):
         prompt = request.data.get("prompt", "").strip()
         if not prompt:
@@ -256,50 +874,54 @@ class GeminiRecipeDetail(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            # Initialize Gemini model
-            model = genai.GenerativeModel(
-                model_name="gemini-2.5-flash",
-                system_instruction=self.system_instructions
-            )
+        if jobs.wants_async(request):
+            job = jobs.enqueue("recipe_detail", {"prompt": prompt}, request.user)
+            return Response(job_accepted(request, job), status=status.HTTP_202_ACCEPTED)
+
+        body, status_code = self.generate({"prompt": prompt})
+        return Response(body, status=status_code)
 
+    def generate(self, payload):
+        """Run the Gemini request; returns ``(body, http_status)`` (also used by job workers)."""
+        prompt = payload["prompt"]
+        try:
             # Generate response for the single prompt
-            response = model.generate_content(
-                [{"role": "user", "parts": [prompt]}])
+            response = llm.generate("recipe_ai", self.system_instructions,
+                                    [{"role": "user", "parts": [prompt]}])
 
             # Extract JSON from text
             text = response.text.strip()
             json_match = re.search(r'\{.*\}', text, re.DOTALL)
             if not json_match:
-                return Response(
-                    {"error": "Gemini did not return valid JSON."},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
+                return {"error": "Gemini did not return valid JSON."}, \
+                    status.HTTP_500_INTERNAL_SERVER_ERROR
 
             json_str = json_match.group(0)
             try:
                 parsed_json = json.loads(json_str)
             except json.JSONDecodeError:
-                return Response(
-                    {"error": "Invalid JSON format returned by Gemini."},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
+                return {"error": "Invalid JSON format returned by Gemini."}, \
+                    status.HTTP_500_INTERNAL_SERVER_ERROR
 
-            return Response(parsed_json, status=status.HTTP_200_OK)
+            return parsed_json, status.HTTP_200_OK
 
+        except llm.LLMTimeout as e:
+            return {"error": str(e)}, status.HTTP_504_GATEWAY_TIMEOUT
         except Exception as e:
             print("Gemini error:", e)
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
 
 
-class RecipeAIChat(APIView):
+class RecipeAIChat(UpstreamConcurrencyMixin, APIView):
+    upstream = "gemini"
+    throttle_classes = AI_THROTTLES
     system_instructions = """
         You are a helpful cooking and recipe assistant.
         You will receive a "Recipe context" with ingredients and steps, followed by a user's question.
 
         RULES:
         1. Answer all questions based on the provided recipe context.
-        2. If the user asks for nutritional information (like protein, calories, fat, etc.), you MUST calculate or estimate it based on the ingredient list provided in the context.
+        2. If the user asks for nutritional information (like protein, calories, fat, etc.), use the "Nutrition facts" provided in the context when present. Otherwise you MUST calculate or estimate it based on the ingredient list provided in the context.
         3. If the question is completely off-topic (e.g., "What is the weather?"), politely decline.
         4. Be brief and concise.
         """
@@ -313,19 +935,93 @@ class RecipeAIChat(APIView):
         api_messages = [{"role": m["role"], "parts": [m["content"]]}
                         for m in messages]
 
+        # Give the model locally computed nutrition instead of letting it guess
         try:
-            model = genai.GenerativeModel(
-                model_name="gemini-2.5-flash",
-                system_instruction=self.system_instructions
-            )
-            response = model.generate_content(api_messages)
+            nutrition_facts = self.nutrition_facts(request, messages)
+            if nutrition_facts:
+                api_messages.insert(
+                    0, {"role": "model", "parts": [nutrition_facts]})
+        except Exception as e:
+            print("Nutrition context error:", e)
+
+        try:
+            response = llm.generate("detail_page_ai", self.system_instructions, api_messages)
             return Response({"reply": response.text}, status=status.HTTP_200_OK)
 
+        except llm.LLMTimeout as e:
+            return Response({"error": str(e)}, status=status.HTTP_504_GATEWAY_TIMEOUT)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def nutrition_facts(self, request, messages):
+        """
+        Nutrition block for the recipe being discussed: from the cached meal
+        when a 'mealid' is sent, else from the "Recipe context" message.
+        """
+        mealid = request.data.get("mealid")
+        if mealid:
+            meal = get_visible_meal(request.user, mealid)
+            if meal:
+                return nutrition.chat_context(nutrition.meal_nutrition(meal))
+
+        for m in messages:
+            content = m.get("content") or ""
+            if content.startswith("Recipe context:"):
+                lines = nutrition.ingredients_from_context(content)
+                if lines:
+                    return nutrition.chat_context(nutrition.analyze(lines))
+        return None
+
+
+class RecipeNutrition(APIView):
+    def get(self, request, id):
+        """
+        Local nutrition estimate for a recipe (cached per meal).
+        Query params: ?servings=N to also get per-serving values
+        """
+        try:
+            meal = get_visible_meal(request.user, id)
+            if not meal:
+                return Response(
+                    {"error": f"No recipe found with id '{id}'."},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+            result = nutrition.meal_nutrition(meal)
+            data = {
+                "mealid": meal.mealid,
+                "title": meal.title,
+                "per_recipe": result["totals"],
+                "ingredients": result["ingredients"],
+                "unmatched": result["unmatched"],
+            }
+
+            servings = request.GET.get('servings')
+            if servings:
+                try:
+                    servings = int(servings)
+                    if servings < 1:
+                        raise ValueError
+                except ValueError:
+                    return Response(
+                        {"error": "'servings' must be a positive integer."},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                data["servings"] = servings
+                data["per_serving"] = nutrition.scale(result["totals"], servings)
 
-class GenerateGroceryList(APIView):
+            return Response(data, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response(
+                {"error": f"Failed to compute nutrition: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class GenerateGroceryList(UpstreamConcurrencyMixin, APIView):
+    upstream = "gemini"
+    throttle_classes = AI_THROTTLES
     system_instructions = """
         You are an expert in food ingredient classification and grocery organization.
 
@@ -368,22 +1064,30 @@ class GenerateGroceryList(APIView):
         ]
         """
 
+    def needs_upstream_slot(self, request):
+        return not jobs.wants_async(request)
+
     def post(self, request):
         ingredients = request.data.get("ingredients", [])
 
         if not ingredients or not isinstance(ingredients, list):
             return Response({"error": "Missing or invalid 'ingredients' list."}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            model = genai.GenerativeModel(
-                model_name="gemini-2.5-flash",
-                system_instruction=self.system_instructions
-            )
+        if jobs.wants_async(request):
+            job = jobs.enqueue("grocery_list", {"ingredients": ingredients}, request.user)
+            return Response(job_accepted(request, job), status=status.HTTP_202_ACCEPTED)
+
+        body, status_code = self.generate({"ingredients": ingredients})
+        return Response(body, status=status_code)
 
+    def generate(self, payload):
+        """Run the Gemini request; returns ``(body, http_status)`` (also used by job workers)."""
+        ingredients = payload["ingredients"]
+        try:
             # Build clean input prompt for the model
             prompt = "Sort and structure these ingredients:\n" + \
                 json.dumps(ingredients, ensure_ascii=False)
-            response = model.generate_content(prompt)
+            response = llm.generate("grocery_list", self.system_instructions, prompt)
 
             # Try to extract valid JSON from response
             try:
@@ -393,13 +1097,17 @@ class GenerateGroceryList(APIView):
                 parsed_output = json.loads(match.group(0)) if match else {
                     "error": "Failed to parse AI response"}
 
-            return Response({"ingredients_sorted": parsed_output}, status=status.HTTP_200_OK)
+            return {"ingredients_sorted": parsed_output}, status.HTTP_200_OK
 
+        except llm.LLMTimeout as e:
+            return {"error": str(e)}, status.HTTP_504_GATEWAY_TIMEOUT
         except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
+
 
+class SpoonacularRecipes(UpstreamConcurrencyMixin, APIView):
+    upstream = "spoonacular"
 
-class SpoonacularRecipes(APIView):
     def get(self, request):
         ingredients = request.GET.get('ingredients', '')
         url = "https://api.spoonacular.com/recipes/findByIngredients"
@@ -408,64 +1116,28 @@ class SpoonacularRecipes(APIView):
             "number": 5,
             "apiKey": settings.SPOONACULAR_API_KEY
         }
-        response = requests.get(url, params=params)
+        with metrics.track_upstream("spoonacular"):
+            response = requests.get(url, params=params)
+        metrics.record_http_error("spoonacular", response)
         return Response(response.json())
 
 
 # 🍽 2️⃣ Recipe details by ID
-class SpoonacularRecipeDetail(APIView):
+class SpoonacularRecipeDetail(UpstreamConcurrencyMixin, APIView):
+    upstream = "spoonacular"
+
     def get(self, request, recipe_id):
         url = f"https://api.spoonacular.com/recipes/{recipe_id}/information"
         params = {"apiKey": settings.SPOONACULAR_API_KEY}
-        response = requests.get(url, params=params)
+        with metrics.track_upstream("spoonacular"):
+            response = requests.get(url, params=params)
+        metrics.record_http_error("spoonacular", response)
         return Response(response.json())
 
 
 getcontext().prec = 9
 
 
-def parse_quantity_to_decimal(q):
-    """
-    Accepts numbers or strings like: "100", "1.5", "1/2", "1 1/2"
-    Returns a Decimal or raises ValueError on invalid input.
-    """
-    if q is None or (isinstance(q, str) and q.strip() == ""):
-        raise ValueError("Quantity is required")
-
-    # if already Decimal or int/float
-    if isinstance(q, Decimal):
-        return q
-    if isinstance(q, (int, float)):
-        return Decimal(str(q))
-
-    s = str(q).strip()
-    # Mixed number like "1 1/2"
-    if " " in s:
-        parts = s.split()
-        if len(parts) == 2:
-            whole, frac = parts
-            try:
-                f = Fraction(frac)
-                total = Fraction(int(whole)) + f
-                return Decimal(total.numerator) / Decimal(total.denominator)
-            except Exception:
-                pass
-
-    # simple fraction like "1/2"
-    if "/" in s:
-        try:
-            f = Fraction(s)
-            return Decimal(f.numerator) / Decimal(f.denominator)
-        except Exception as e:
-            raise ValueError(f"Invalid fraction quantity: {q}") from e
-
-    # decimal or integer string
-    try:
-        return Decimal(s)
-    except (InvalidOperation, ValueError) as e:
-        raise ValueError(f"Invalid numeric quantity: {q}") from e
-
-
 class GroceryListCreate(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -596,11 +1268,19 @@ class ListFavorites(APIView):
         """
         Get all favorites for the authenticated user.
         Returns a list of favorite meals ordered by most recently added.
+        Query params: ?fields=title,image,... or ?fields=full (default: summary)
         """
         try:
-            favorites = Favorite.objects.filter(
-                user=request.user).order_by('-created_at')
-            serializer = FavoriteSerializer(favorites, many=True)
+            fields = fieldsets.requested(request)
+        except fieldsets.InvalidFields as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            favorites = fieldsets.load_only(
+                Favorite.objects.filter(user=request.user).order_by('-created_at'),
+                fields, prefix="meal__", extra=('id', 'created_at', 'meal'))
+            serializer = FavoriteSerializer(favorites, many=True,
+                                            context=fieldsets.context(fields))
             return Response(
                 {
                     "count": favorites.count(),
@@ -683,6 +1363,131 @@ class ToggleFavorite(APIView):
             )
 
 
+def favorited_mealids(user, mealids):
+    """The subset of ``mealids`` the user has favorited, in one indexed IN query."""
+    return set(Favorite.objects.filter(
+        user=user, meal__mealid__in=mealids
+    ).values_list("meal__mealid", flat=True))
+
+
+class FavoriteStatus(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        """
+        Favorited flags for a grid of recipe cards.
+        Query params: ?mealids=52772,52773,AI1F2E3D (up to BATCH_MAX_MEALIDS)
+        Returns: {"favorited": {"52772": true, "52773": false, ...}}
+        """
+        mealids = parse_mealids(request.GET.get("mealids", ""))
+        if not mealids:
+            return Response(
+                {"error": "Missing 'mealids' query parameter."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(mealids) > settings.BATCH_MAX_MEALIDS:
+            return Response(
+                {"error": f"At most {settings.BATCH_MAX_MEALIDS} mealids per request."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            favorited = favorited_mealids(request.user, mealids)
+            return Response(
+                {"favorited": {mealid: mealid in favorited for mealid in mealids}},
+                status=status.HTTP_200_OK
+            )
+        except Exception as e:
+            return Response(
+                {"error": f"Failed to fetch favorite status: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class BulkFavorites(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        """
+        Add and/or remove many favorites at once. Idempotent: adding a meal
+        that is already a favorite, or removing one that isn't, is a no-op.
+        Expected payload: {"add": ["52772", ...], "remove": ["52773", ...]}
+        Returns: {"favorited": {mealid: bool, ...}, "not_found": [mealid, ...]}
+        """
+        add = parse_mealids(request.data.get("add", []))
+        remove = parse_mealids(request.data.get("remove", []))
+        if add is None or remove is None or not (add or remove):
+            return Response(
+                {"error": "Expected 'add' and/or 'remove' lists of mealids."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(add) + len(remove) > settings.BATCH_MAX_MEALIDS:
+            return Response(
+                {"error": f"At most {settings.BATCH_MAX_MEALIDS} mealids per request."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # The last word wins if a mealid is in both lists
+        removing = set(remove)
+        add = [mealid for mealid in add if mealid not in removing]
+
+        try:
+            meal_ids = {}
+            if add:
+                # Same preference as RecipeDetail: the user's own copy, else a visible one
+                rows = Meal.objects.filter(
+                    similarity.candidate_filter() | Q(user=request.user),
+                    mealid__in=add
+                ).values_list("id", "mealid", "user_id")
+                for meal_id, mealid, owner_id in rows:
+                    if mealid not in meal_ids or owner_id == request.user.id:
+                        meal_ids[mealid] = meal_id
+
+            with transaction.atomic():
+                if meal_ids:
+                    Favorite.objects.bulk_create(
+                        [Favorite(user=request.user, meal_id=meal_id)
+                         for meal_id in meal_ids.values()],
+                        ignore_conflicts=True
+                    )
+                if remove:
+                    Favorite.objects.filter(
+                        user=request.user, meal__mealid__in=remove
+                    ).delete()
+
+            requested = add + remove
+            favorited = favorited_mealids(request.user, requested)
+            return Response(
+                {
+                    "favorited": {mealid: mealid in favorited for mealid in requested},
+                    "not_found": [mealid for mealid in add if mealid not in meal_ids],
+                },
+                status=status.HTTP_200_OK
+            )
+        except Exception as e:
+            return Response(
+                {"error": f"Failed to update favorites: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+def recent_unique_views(user, limit=5):
+    """The user's latest ``limit`` recipe views, one per mealid."""
+    # Stream newest first and stop early instead of loading the whole history
+    views = RecipeView.objects.filter(
+        user=user).order_by('-viewed_at').select_related('meal__user')
+
+    # Remove duplicates, keeping the most recent view for each mealid
+    seen_mealids = set()
+    unique_views = []
+    for view in views.iterator(chunk_size=50):
+        if view.mealid not in seen_mealids:
+            unique_views.append(view)
+            seen_mealids.add(view.mealid)
+        if len(unique_views) >= limit:
+            break
+    return unique_views
+
+
 class RecentRecipeViews(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -692,20 +1497,7 @@ class RecentRecipeViews(APIView):
         Returns a list of viewed meals ordered by most recently viewed.
         """
         try:
-            # Get 5 most recent views, removing duplicates (latest view per meal)
-            views = RecipeView.objects.filter(
-                user=request.user).order_by('-viewed_at')
-
-            # Remove duplicates, keeping the most recent view for each mealid
-            seen_mealids = set()
-            unique_views = []
-            for view in views:
-                if view.mealid not in seen_mealids:
-                    unique_views.append(view)
-                    seen_mealids.add(view.mealid)
-                if len(unique_views) >= 5:
-                    break
-
+            unique_views = recent_unique_views(request.user)
             serializer = RecipeViewSerializer(unique_views, many=True)
             return Response(
                 {
@@ -762,35 +1554,43 @@ class SaveAIRecipe(APIView):
             mealid = meal_data.get(
                 'idMeal', f"AI{str(uuid.uuid4())[:8].upper()}")
 
-            # Create or update meal
-            meal, created = Meal.objects.get_or_create(
-                mealid=mealid,
-                user=request.user,
-                defaults={
-                    'title': meal_data.get('strMeal', 'Untitled Recipe'),
-                    'category': category,
-                    'area': meal_data.get('strArea', ''),
-                    'instructions': meal_data.get('strInstructions', ''),
-                    'ingredients': ingredients_list,
-                    'image': None ,
-                    'youtube':None,
-                    'source': meal_data.get('strSource', ''),
-                    'is_user_added': True,
-                    'is_public': False,  # Default to private
-                }
-            )
-
-            if not created:
-                # Update existing recipe
-                meal.title = meal_data.get('strMeal', meal.title)
-                meal.category = category
-                meal.area = meal_data.get('strArea', meal.area)
-                meal.instructions = meal_data.get(
-                    'strInstructions', meal.instructions)
-                meal.ingredients = ingredients_list
-                meal.image = meal_data.get('strMealThumb', meal.image)
-                meal.youtube = meal_data.get('strYoutube', meal.youtube)
-                meal.save()
+            # Create or update meal; the meal_saved signal rewrites its
+            # MealIngredient rows inside the same transaction
+            with transaction.atomic():
+                meal, created = Meal.objects.get_or_create(
+                    mealid=mealid,
+                    user=request.user,
+                    defaults={
+                        'title': meal_data.get('strMeal', 'Untitled Recipe'),
+                        'category': category,
+                        'area': meal_data.get('strArea', ''),
+                        'instructions': meal_data.get('strInstructions', ''),
+                        'ingredients': ingredients_list,
+                        'image': None ,
+                        'youtube':None,
+                        'source': meal_data.get('strSource', ''),
+                        'is_user_added': True,
+                        'is_public': False,  # Default to private
+                    }
+                )
+
+                if not created:
+                    # Update existing recipe
+                    meal.title = meal_data.get('strMeal', meal.title)
+                    meal.category = category
+                    meal.area = meal_data.get('strArea', meal.area)
+                    meal.instructions = meal_data.get(
+                        'strInstructions', meal.instructions)
+                    meal.ingredients = ingredients_list
+                    meal.image = meal_data.get('strMealThumb', meal.image)
+                    meal.youtube = meal_data.get('strYoutube', meal.youtube)
+                    meal.save()
+
+            # Keep the similar-recipes table current without a full rebuild
+            try:
+                similarity.update_meal(meal)
+            except Exception as index_error:
+                print(f"Failed to update similar recipes: {str(index_error)}")
 
             serializer = MealSerializer(meal)
             return Response(
@@ -808,15 +1608,25 @@ class SaveAIRecipe(APIView):
             )
 
 
-class ListAIRecipes(APIView):
+class ListAIRecipes(ReplicaReadMixin, APIView):
     """List AI-generated recipes for the authenticated user"""
     permission_classes = [permissions.IsAuthenticated]
 
+    def use_replica(self, request):
+        # A user's own list must reflect their saves immediately
+        return request.GET.get('public', '').lower() == 'true'
+
     def get(self, request):
         """
         Get all AI-generated recipes for the logged-in user.
-        Query params: ?public=true to get public recipes from all users
+        Query params: ?public=true to get public recipes from all users;
+        ?fields=title,image,... or ?fields=full (default: summary)
         """
+        try:
+            fields = fieldsets.requested(request)
+        except fieldsets.InvalidFields as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
             public_only = request.GET.get('public', '').lower() == 'true'
 
@@ -825,7 +1635,7 @@ class ListAIRecipes(APIView):
                 meals = Meal.objects.filter(
                     is_user_added=True,
                     is_public=True
-                ).select_related('user').order_by('-created_at')
+                ).order_by('-created_at')
             else:
                 # Get user's own AI recipes
                 meals = Meal.objects.filter(
@@ -833,7 +1643,8 @@ class ListAIRecipes(APIView):
                     is_user_added=True
                 ).order_by('-created_at')
 
-            serializer = MealSerializer(meals, many=True)
+            meals = fieldsets.load_only(meals, fields)
+            serializer = MealSerializer(meals, many=True, context=fieldsets.context(fields))
             return Response(
                 {
                     "count": meals.count(),
@@ -881,6 +1692,11 @@ class ShareAIRecipe(APIView):
             meal.is_public = True
             meal.save()
 
+            try:
+                similarity.update_meal(meal)
+            except Exception as index_error:
+                print(f"Failed to update similar recipes: {str(index_error)}")
+
             serializer = MealSerializer(meal)
             return Response(
                 {
@@ -930,6 +1746,11 @@ class UnshareAIRecipe(APIView):
             meal.is_public = False
             meal.save()
 
+            try:
+                similarity.update_meal(meal)
+            except Exception as index_error:
+                print(f"Failed to update similar recipes: {str(index_error)}")
+
             serializer = MealSerializer(meal)
             return Response(
                 {
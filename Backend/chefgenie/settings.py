@@ -38,6 +38,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
      'corsheaders.middleware.CorsMiddleware',
@@ -46,6 +48,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.db_router.ReadYourWritesMiddleware',
     
 ]
 
@@ -76,9 +79,50 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections (and their pragmas / page cache) between requests
+        'CONN_MAX_AGE': config("DB_CONN_MAX_AGE", default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Take the write lock at BEGIN so transactions queue on busy_timeout
+            # instead of failing when they upgrade from a read lock
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Optional read replica for read-only endpoints (api/db_router.py). Locally a
+# second SQLite file refreshed with `python manage.py sync_replica`
+DB_REPLICA_NAME = config("DB_REPLICA_NAME", default="")
+if DB_REPLICA_NAME:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': DB_REPLICA_NAME,
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['api.db_router.PrimaryReplicaRouter']
+# How long a user reads from the primary after writing
+READ_YOUR_WRITES_SECONDS = config("READ_YOUR_WRITES_SECONDS", default=10, cast=int)
+
+# Shared between workers (replica pinning, ...). Point at Redis/Memcached in production
+CACHES = {
+    'default': {
+        'BACKEND': config("CACHE_BACKEND", default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config("CACHE_LOCATION", default=str(BASE_DIR / 'var' / 'cache')),
+    }
+}
+
+# Applied to every new SQLite connection (api/sqlite_tuning.py)
+SQLITE_TUNING_ENABLED = config("SQLITE_TUNING_ENABLED", default=True, cast=bool)
+SQLITE_PRAGMAS = {
+    "journal_mode": config("SQLITE_JOURNAL_MODE", default="wal"),
+    "synchronous": config("SQLITE_SYNCHRONOUS", default="normal"),
+    "busy_timeout": config("SQLITE_BUSY_TIMEOUT_MS", default=5000, cast=int),
+    "mmap_size": config("SQLITE_MMAP_SIZE", default=256 * 1024 * 1024, cast=int),
+    # Negative = KiB
+    "cache_size": config("SQLITE_CACHE_SIZE", default=-64 * 1024, cast=int),
+    "temp_store": config("SQLITE_TEMP_STORE", default="memory"),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -135,9 +179,73 @@ CORS_ALLOW_ALL_ORIGINS = True
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+    ),
+    # Token buckets for the Gemini-backed endpoints (api/throttling.py)
+    'DEFAULT_THROTTLE_RATES': {
+        'ai_burst': config("AI_THROTTLE_BURST", default="10/min"),
+        'ai_sustained': config("AI_THROTTLE_SUSTAINED", default="300/day"),
+    },
 }
 
+# Max simultaneous requests per upstream API on this host; extra requests get
+# an immediate 429 with Retry-After (seconds)
+UPSTREAM_CONCURRENCY = {
+    'gemini': config("GEMINI_MAX_CONCURRENCY", default=8, cast=int),
+    'spoonacular': config("SPOONACULAR_MAX_CONCURRENCY", default=4, cast=int),
+}
+UPSTREAM_RETRY_AFTER = config("UPSTREAM_RETRY_AFTER", default=2, cast=int)
+
+# Prometheus metrics at /metrics (api/metrics.py); one snapshot file per process
+METRICS_ENABLED = config("METRICS_ENABLED", default=True, cast=bool)
+METRICS_DIR = config("METRICS_DIR", default=str(BASE_DIR / 'var' / 'metrics'))
+METRICS_FLUSH_SECONDS = config("METRICS_FLUSH_SECONDS", default=5, cast=int)
+# If set, scrapers must send `Authorization: Bearer <token>`
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
+
+# Per-request profiling (api/profiling.py): signed X-Profile token or sampling
+PROFILE_SAMPLE_RATE = config("PROFILE_SAMPLE_RATE", default=0.0, cast=float)
+PROFILE_SAMPLE_INTERVAL = config("PROFILE_SAMPLE_INTERVAL", default=0.005, cast=float)
+PROFILE_TOKEN_MAX_AGE = config("PROFILE_TOKEN_MAX_AGE", default=3600, cast=int)
+PROFILE_DIR = config("PROFILE_DIR", default=str(BASE_DIR / 'var' / 'profiles'))
+PROFILE_MAX_FILES = config("PROFILE_MAX_FILES", default=200, cast=int)
+# Old profiles are deleted at most this often per process
+PROFILE_PRUNE_SECONDS = config("PROFILE_PRUNE_SECONDS", default=60, cast=int)
+
+# Background AI jobs ("async": true; run with `python manage.py run_job_workers`)
+JOB_WORKERS = config("JOB_WORKERS", default=2, cast=int)
+JOB_LEASE_SECONDS = config("JOB_LEASE_SECONDS", default=120, cast=int)
+JOB_MAX_ATTEMPTS = config("JOB_MAX_ATTEMPTS", default=3, cast=int)
+# Doubles on every retry
+JOB_RETRY_BACKOFF_SECONDS = config("JOB_RETRY_BACKOFF_SECONDS", default=5, cast=int)
+JOB_POLL_INTERVAL = config("JOB_POLL_INTERVAL", default=1.0, cast=float)
+# Cap for GET /api/jobs/<id>/?wait=N.  Every waiting client holds a sync web
+# worker for up to this long, so only raise it with spare worker capacity;
+# clients that don't pass ?wait get a plain poll
+JOB_LONG_POLL_MAX_SECONDS = config("JOB_LONG_POLL_MAX_SECONDS", default=5, cast=int)
+
+# Profile picture thumbnails (api/thumbnails.py), rendered by the job workers
+PROFILE_THUMBNAIL_SIZES = [int(size) for size in config(
+    "PROFILE_THUMBNAIL_SIZES", default="64,128,256").split(",")]
+PROFILE_THUMBNAIL_QUALITY = config("PROFILE_THUMBNAIL_QUALITY", default=80, cast=int)
+# Variant names are content hashes, so browsers may keep them forever
+PROFILE_THUMBNAIL_MAX_AGE = config("PROFILE_THUMBNAIL_MAX_AGE", default=31536000, cast=int)
+
+# Recipe image proxy (api/image_proxy.py): resized copies of Meal.image in an on-disk LRU
+IMAGE_PROXY_DIR = config("IMAGE_PROXY_DIR", default=str(BASE_DIR / 'var' / 'image-cache'))
+# Only these hosts (and subdomains) are fetched; Meal.image is user-controlled
+IMAGE_PROXY_ALLOWED_HOSTS = [host.strip().lower() for host in config(
+    "IMAGE_PROXY_ALLOWED_HOSTS", default="themealdb.com,spoonacular.com").split(",")
+    if host.strip()]
+IMAGE_PROXY_MAX_BYTES = config("IMAGE_PROXY_MAX_BYTES", default=256 * 1024 * 1024, cast=int)
+IMAGE_PROXY_WIDTHS = [int(width) for width in config(
+    "IMAGE_PROXY_WIDTHS", default="160,320,640").split(",")]
+# Width of the `thumbnail` URL in meal responses (recipe grids)
+IMAGE_PROXY_DEFAULT_WIDTH = config("IMAGE_PROXY_DEFAULT_WIDTH", default=320, cast=int)
+IMAGE_PROXY_QUALITY = config("IMAGE_PROXY_QUALITY", default=80, cast=int)
+IMAGE_PROXY_TIMEOUT_SECONDS = config("IMAGE_PROXY_TIMEOUT_SECONDS", default=10, cast=int)
+IMAGE_PROXY_MAX_SOURCE_BYTES = config("IMAGE_PROXY_MAX_SOURCE_BYTES", default=10 * 1024 * 1024, cast=int)
+IMAGE_PROXY_MAX_AGE = config("IMAGE_PROXY_MAX_AGE", default=31536000, cast=int)
+
 AUTH_USER_MODEL = 'core.User'
 
 MEDIA_URL = '/media/'
@@ -145,8 +253,65 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 GEMINI_API_KEY = config("GEMINI_API_KEY")
 
+# LLM calls (api/llm.py). LLM_BACKEND may be api.llm.FakeBackend for offline work
+LLM_BACKEND = config("LLM_BACKEND", default="api.llm.GeminiBackend")
+LLM_MODEL = config("LLM_MODEL", default="gemini-2.5-flash")
+# Overall deadline per request, hedges included; past it the view answers 504
+LLM_TIMEOUT_SECONDS = config("LLM_TIMEOUT_SECONDS", default=30, cast=float)
+# Send a duplicate request once a call outlives this percentile of recent latencies
+LLM_HEDGE_ENABLED = config("LLM_HEDGE_ENABLED", default=True, cast=bool)
+LLM_HEDGE_PERCENTILE = config("LLM_HEDGE_PERCENTILE", default=95, cast=float)
+LLM_HEDGE_MIN_SAMPLES = config("LLM_HEDGE_MIN_SAMPLES", default=20, cast=int)
+# Hedges allowed per call (0.1 = at most ~10% extra upstream spend)
+LLM_HEDGE_BUDGET = config("LLM_HEDGE_BUDGET", default=0.1, cast=float)
+LLM_MAX_WORKERS = config("LLM_MAX_WORKERS", default=32, cast=int)
+# Import the LLM SDK in the background at startup (web workers) instead of on
+# the first AI request; leave off for management commands and CI
+LLM_WARM_UP = config("LLM_WARM_UP", default=False, cast=bool)
+
 SPOONACULAR_API_KEY = config("SPOONACULAR_API_KEY")
 
+# Near-duplicate answer cache for single-turn chatbot questions
+CHAT_CACHE_ENABLED = config("CHAT_CACHE_ENABLED", default=True, cast=bool)
+# Minimum TF-IDF cosine similarity (0-1) to serve a cached answer
+CHAT_CACHE_THRESHOLD = config("CHAT_CACHE_THRESHOLD", default=0.7, cast=float)
+CHAT_CACHE_MAX_ENTRIES = config("CHAT_CACHE_MAX_ENTRIES", default=2000, cast=int)
+# How often each worker reloads its in-memory index from the database
+CHAT_CACHE_REFRESH_SECONDS = config("CHAT_CACHE_REFRESH_SECONDS", default=60, cast=int)
+
+# Similar recipes (rebuild with `python manage.py build_similar_recipes`)
+SIMILAR_RECIPES_TOP_K = config("SIMILAR_RECIPES_TOP_K", default=12, cast=int)
+SIMILARITY_CATEGORY_WEIGHT = config("SIMILARITY_CATEGORY_WEIGHT", default=0.5, cast=float)
+SIMILARITY_AREA_WEIGHT = config("SIMILARITY_AREA_WEIGHT", default=0.5, cast=float)
+SIMILARITY_INDEX_DIR = config("SIMILARITY_INDEX_DIR", default=str(BASE_DIR / 'var' / 'similarity'))
+
+# Personalized home feed (rebuild with `python manage.py build_recommendations`)
+RECOMMENDATIONS_PER_USER = config("RECOMMENDATIONS_PER_USER", default=20, cast=int)
+# A favorite counts as this many recipe views
+RECOMMENDATION_FAVORITE_WEIGHT = config("RECOMMENDATION_FAVORITE_WEIGHT", default=3.0, cast=float)
+
+# In-memory pantry matcher: sweep for new meals / full rebuild intervals
+PANTRY_INDEX_REFRESH_SECONDS = config("PANTRY_INDEX_REFRESH_SECONDS", default=30, cast=int)
+PANTRY_INDEX_REBUILD_SECONDS = config("PANTRY_INDEX_REBUILD_SECONDS", default=3600, cast=int)
+
+# Typo-tolerant title search (rebuild with `python manage.py build_trigram_index`)
+TRIGRAM_MIN_SIMILARITY = config("TRIGRAM_MIN_SIMILARITY", default=0.5, cast=float)
+# Upper bound on titles scored per query
+TRIGRAM_MAX_CANDIDATES = config("TRIGRAM_MAX_CANDIDATES", default=2000, cast=int)
+TRIGRAM_INDEX_REFRESH_SECONDS = config("TRIGRAM_INDEX_REFRESH_SECONDS", default=30, cast=int)
+
+# Max mealids per batch request (favorite status, bulk favorites, recipes/batch)
+BATCH_MAX_MEALIDS = config("BATCH_MAX_MEALIDS", default=100, cast=int)
+
+# Recipe page bundle: external extras (?include=) that miss this are left out
+BUNDLE_DEADLINE_SECONDS = config("BUNDLE_DEADLINE_SECONDS", default=1.5, cast=float)
+ENRICHMENT_WORKERS = config("ENRICHMENT_WORKERS", default=8, cast=int)
+
+# Typeahead suggestions (titles + Frontend/public/data/ingredients.json)
+AUTOCOMPLETE_REFRESH_SECONDS = config("AUTOCOMPLETE_REFRESH_SECONDS", default=30, cast=int)
+# Full rebuild also refreshes popularity weights
+AUTOCOMPLETE_REBUILD_SECONDS = config("AUTOCOMPLETE_REBUILD_SECONDS", default=3600, cast=int)
+
 # JWT Settings
 from datetime import timedelta
 
@@ -2,9 +2,11 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from api.views import Metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', Metrics.as_view(), name='metrics'),
     path('api/', include('api.urls')),
     path('auth/',include('core.urls'))
 ]
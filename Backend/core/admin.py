@@ -1,3 +1,19 @@
 from django.contrib import admin
 
+from .models import ChatAnswer
+
 # Register your models here.
+
+
+@admin.register(ChatAnswer)
+class ChatAnswerAdmin(admin.ModelAdmin):
+    list_display = ('question', 'hits', 'last_used_at', 'created_at')
+    search_fields = ('question', 'normalized_question')
+    ordering = ('-last_used_at',)
+    actions = ['purge_cache']
+
+    @admin.action(description="Purge the entire chat answer cache")
+    def purge_cache(self, request, queryset):
+        from api import chat_cache
+        deleted = chat_cache.purge()
+        self.message_user(request, f"Purged {deleted} cached answers.")
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:53
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_meal_created_at_meal_is_public_meal_user_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatAnswer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question', models.TextField()),
+                ('normalized_question', models.CharField(max_length=500, unique=True)),
+                ('answer', models.TextField()),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-last_used_at'], name='core_chatan_last_us_204ba5_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_chatanswer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarMeal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('meal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_entries', to='core.meal')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.meal')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['meal', '-score'], name='core_simila_meal_id_afc9d7_idx')],
+                'unique_together': {('meal', 'similar')},
+            },
+        ),
+    ]
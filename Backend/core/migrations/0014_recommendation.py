@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_similarmeal'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Recommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('generated_at', models.DateTimeField()),
+                ('meal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.meal')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-score'], name='core_recomm_user_id_9f1552_idx'), models.Index(fields=['generated_at'], name='core_recomm_generat_e4582f_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_recommendation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MealNutrition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=40)),
+                ('calories', models.FloatField()),
+                ('protein', models.FloatField()),
+                ('fat', models.FloatField()),
+                ('carbs', models.FloatField()),
+                ('fiber', models.FloatField()),
+                ('breakdown', models.JSONField(default=dict)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('meal', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='nutrition', to='core.meal')),
+            ],
+        ),
+    ]
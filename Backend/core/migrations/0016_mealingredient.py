@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_mealnutrition'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MealIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField()),
+                ('quantity', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True)),
+                ('unit', models.CharField(blank=True, choices=[('mg', 'milligram'), ('g', 'gram'), ('kg', 'kilogram'), ('oz', 'ounce'), ('lb', 'pound'), ('ml', 'milliliter'), ('l', 'liter'), ('tsp', 'teaspoon'), ('tbsp', 'tablespoon'), ('cup', 'cup'), ('pinch', 'pinch'), ('dash', 'dash'), ('pcs', 'pieces'), ('packet', 'packet'), ('can', 'can'), ('bottle', 'bottle')], max_length=10)),
+                ('name', models.CharField(max_length=255)),
+                ('original_text', models.TextField()),
+                ('meal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ingredient_items', to='core.meal')),
+            ],
+            options={
+                'ordering': ['meal', 'position'],
+                'indexes': [models.Index(fields=['meal', 'position'], name='core_mealin_meal_id_ac99f8_idx'), models.Index(fields=['name'], name='core_mealin_name_abedb5_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_mealingredient'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MealTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('meal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.meal')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['trigram', 'meal'], name='core_mealtr_trigram_46e14f_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_mealtrigram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='meal',
+            name='area',
+            field=models.CharField(blank=True, db_index=True, max_length=200, null=True),
+        ),
+        migrations.CreateModel(
+            name='FacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(choices=[('category', 'Category'), ('area', 'Area')], max_length=10)),
+                ('value', models.CharField(max_length=200)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('facet', 'value')},
+            },
+        ),
+        migrations.CreateModel(
+            name='MealCategory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.category')),
+                ('meal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_links', to='core.meal')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='meal',
+            name='categories',
+            field=models.ManyToManyField(blank=True, related_name='meals', through='core.MealCategory', to='core.category'),
+        ),
+        migrations.AddIndex(
+            model_name='mealcategory',
+            index=models.Index(fields=['category', 'meal'], name='core_mealca_categor_b92c63_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='mealcategory',
+            unique_together={('meal', 'category')},
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='picture_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='kind',
+            field=models.CharField(choices=[('recipe_detail', 'AI recipe generation'), ('grocery_list', 'AI grocery list'), ('profile_thumbnails', 'Profile picture thumbnails')], max_length=20),
+        ),
+    ]
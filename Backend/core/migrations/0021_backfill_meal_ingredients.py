@@ -0,0 +1,148 @@
+import re
+import unicodedata
+from decimal import Decimal, InvalidOperation
+from fractions import Fraction
+
+from django.db import migrations
+
+
+# Frozen copy of api.ingredients as of this migration, so later parser
+# changes can't alter (or break) what the backfill writes.
+UNICODE_FRACTIONS = {
+    "¼": "1/4", "½": "1/2", "¾": "3/4", "⅓": "1/3", "⅔": "2/3",
+    "⅛": "1/8", "⅜": "3/8", "⅝": "5/8", "⅞": "7/8", "⅕": "1/5",
+}
+
+UNIT_ALIASES = {
+    "mg": "mg", "milligram": "mg", "milligrams": "mg",
+    "g": "g", "gr": "g", "gram": "g", "grams": "g", "grammes": "g",
+    "kg": "kg", "kilo": "kg", "kilogram": "kg", "kilograms": "kg",
+    "oz": "oz", "ounce": "oz", "ounces": "oz",
+    "lb": "lb", "lbs": "lb", "pound": "lb", "pounds": "lb",
+    "ml": "ml", "milliliter": "ml", "milliliters": "ml", "millilitre": "ml",
+    "millilitres": "ml",
+    "l": "l", "liter": "l", "liters": "l", "litre": "l", "litres": "l",
+    "tsp": "tsp", "tsps": "tsp", "teaspoon": "tsp", "teaspoons": "tsp",
+    "tbsp": "tbsp", "tbsps": "tbsp", "tbs": "tbsp", "tblsp": "tbsp",
+    "tablespoon": "tbsp", "tablespoons": "tbsp",
+    "cup": "cup", "cups": "cup",
+    "pinch": "pinch", "pinches": "pinch",
+    "dash": "dash", "dashes": "dash",
+    "pc": "pcs", "pcs": "pcs", "piece": "pcs", "pieces": "pcs",
+    "packet": "packet", "packets": "packet", "pack": "packet",
+    "can": "can", "cans": "can", "tin": "can", "tins": "can",
+    "bottle": "bottle", "bottles": "bottle",
+}
+
+DESCRIPTORS = frozenset("""
+    chopped diced minced sliced grated crushed ground peeled fresh freshly
+    finely roughly thinly large small medium whole halved quartered beaten
+    softened melted boneless skinless cubed shredded to taste of handful
+    optional about approx heaped level rounded
+""".split())
+
+IRREGULAR_PLURALS = {"leaves": "leaf", "loaves": "loaf", "halves": "half"}
+
+QUANTITY_RE = re.compile(
+    r"^\s*(\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?)"
+    r"(?:\s*(?:-|to)\s*\d+(?:\.\d+)?)?"
+)
+
+QUANTITY_STEP = Decimal("0.001")
+
+
+def singular(word):
+    if word in IRREGULAR_PLURALS:
+        return IRREGULAR_PLURALS[word]
+    if len(word) <= 3 or word.endswith(("ss", "us")):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("oes"):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def canonical_name(name):
+    name = unicodedata.normalize("NFKD", name or "")
+    name = "".join(c for c in name if not unicodedata.combining(c)).lower()
+    name = re.sub(r"\(.*?\)", " ", name).split(",")[0]
+    return " ".join(singular(w) for w in re.findall(r"[a-z]+", name)
+                    if w not in DESCRIPTORS)
+
+
+def parse_line(line):
+    text = line
+    for char, frac in UNICODE_FRACTIONS.items():
+        text = re.sub(rf"(\d){char}", rf"\1 {frac}", text)
+        text = text.replace(char, f" {frac} ")
+    text = text.strip()
+
+    quantity = None
+    match = QUANTITY_RE.match(text)
+    if match:
+        quantity = " ".join(match.group(1).split())
+        text = text[match.end():].strip()
+
+    unit = None
+    word_match = re.match(r"([A-Za-z]+)\.?(?:\s+|$)", text)
+    if word_match and word_match.group(1).lower() in UNIT_ALIASES:
+        unit = UNIT_ALIASES[word_match.group(1).lower()]
+        text = text[word_match.end():].strip()
+        if text.lower().startswith("of "):
+            text = text[3:].strip()
+
+    return quantity, unit, " ".join(text.split())
+
+
+def quantity_decimal(quantity):
+    if not quantity:
+        return None
+    try:
+        value = Fraction(sum(Fraction(part) for part in quantity.split()))
+        return (Decimal(value.numerator) / Decimal(value.denominator)).quantize(QUANTITY_STEP)
+    except (ValueError, ZeroDivisionError, InvalidOperation):
+        return None
+
+
+def backfill(apps, schema_editor):
+    # Pantry, similarity and nutrition read these rows instead of re-parsing
+    Meal = apps.get_model('core', 'Meal')
+    MealIngredient = apps.get_model('core', 'MealIngredient')
+    meals = Meal.objects.filter(ingredient_items__isnull=True).order_by('id').only(
+        'id', 'ingredients')
+    last_id = 0
+    while True:
+        chunk = list(meals.filter(id__gt=last_id)[:2000])
+        if not chunk:
+            break
+        rows = []
+        for meal in chunk:
+            for position, line in enumerate(meal.ingredients or []):
+                text = str(line or "").strip()
+                if not text:
+                    continue
+                quantity, unit, name = parse_line(text)
+                rows.append(MealIngredient(
+                    meal_id=meal.id,
+                    position=position,
+                    quantity=quantity_decimal(quantity),
+                    unit=unit or "",
+                    name=canonical_name(name)[:255],
+                    original_text=text,
+                ))
+        MealIngredient.objects.bulk_create(rows, batch_size=5000)
+        last_id = chunk[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_profile_picture_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,74 @@
+from collections import Counter
+
+from django.db import migrations
+
+
+# Frozen copies of the api.facets helpers as of this migration
+def category_names(category):
+    if isinstance(category, str):
+        category = [category]
+    names = []
+    for name in category or []:
+        if isinstance(name, str) and name.strip() and name.strip() not in names:
+            names.append(name.strip()[:100])
+    return names
+
+
+def clean_area(area):
+    return area.strip()[:200] if isinstance(area, str) else area
+
+
+def meal_facets(category, area, user_id, is_public):
+    if user_id is not None and not is_public:
+        return set()
+    facets = {("category", name) for name in category_names(category)}
+    area = clean_area(area)
+    if area:
+        facets.add(("area", area))
+    return facets
+
+
+def backfill(apps, schema_editor):
+    # Same result as `manage.py rebuild_facets`, against the historical models
+    Meal = apps.get_model('core', 'Meal')
+    Category = apps.get_model('core', 'Category')
+    MealCategory = apps.get_model('core', 'MealCategory')
+    FacetCount = apps.get_model('core', 'FacetCount')
+
+    category_ids = dict(Category.objects.values_list('name', 'id'))
+    counts = Counter()
+    last_id = 0
+    while True:
+        chunk = list(Meal.objects.filter(id__gt=last_id).order_by('id').only(
+            'id', 'category', 'area', 'user_id', 'is_public')[:2000])
+        if not chunk:
+            break
+        links, untrimmed = [], []
+        for meal in chunk:
+            if clean_area(meal.area) != meal.area:
+                meal.area = clean_area(meal.area)
+                untrimmed.append(meal)
+            for name in category_names(meal.category):
+                if name not in category_ids:
+                    category_ids[name] = Category.objects.get_or_create(name=name)[0].id
+                links.append(MealCategory(meal_id=meal.id, category_id=category_ids[name]))
+            counts.update(meal_facets(meal.category, meal.area, meal.user_id, meal.is_public))
+        MealCategory.objects.bulk_create(links, batch_size=5000, ignore_conflicts=True)
+        Meal.objects.bulk_update(untrimmed, ['area'], batch_size=5000)
+        last_id = chunk[-1].id
+
+    FacetCount.objects.all().delete()
+    FacetCount.objects.bulk_create(
+        [FacetCount(facet=facet, value=value, count=n)
+         for (facet, value), n in counts.items()], batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_backfill_meal_ingredients'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
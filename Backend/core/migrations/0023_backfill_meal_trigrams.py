@@ -0,0 +1,46 @@
+import re
+import unicodedata
+
+from django.db import migrations
+from django.db.models import Exists, OuterRef
+
+
+# Frozen copy of api.trigram_search.trigrams as of this migration
+def trigrams(text):
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    grams = set()
+    for word in re.findall(r"[a-z0-9]+", text):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def backfill(apps, schema_editor):
+    # Same rows as `manage.py build_trigram_index`, for meals not indexed yet
+    Meal = apps.get_model('core', 'Meal')
+    MealTrigram = apps.get_model('core', 'MealTrigram')
+    meals = Meal.objects.filter(
+        ~Exists(MealTrigram.objects.filter(meal_id=OuterRef('pk')))
+    ).order_by('id').only('id', 'title')
+    last_id = 0
+    while True:
+        chunk = list(meals.filter(id__gt=last_id)[:2000])
+        if not chunk:
+            break
+        MealTrigram.objects.bulk_create(
+            [MealTrigram(meal_id=meal.id, trigram=gram)
+             for meal in chunk for gram in trigrams(meal.title)],
+            batch_size=5000)
+        last_id = chunk[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_backfill_facets'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
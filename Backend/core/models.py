@@ -1,7 +1,10 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import (
     BaseUserManager, AbstractBaseUser, PermissionsMixin)
 from django.conf import settings
+from django.utils import timezone
 
 
 class UserManager(BaseUserManager):
@@ -55,6 +58,8 @@ class Profile(models.Model):
     bio = models.TextField(blank=True)
     profile_picture = models.ImageField(
         upload_to='profiles/', blank=True, null=True)
+    # Resized copies of profile_picture, written by the job worker (api/thumbnails.py)
+    picture_variants = models.JSONField(default=dict, blank=True)
     dietary_preference = models.CharField(
         max_length=100, blank=True, help_text='e.g., Vegan, Gluten-Free, etc.')
 
@@ -67,7 +72,10 @@ class Meal(models.Model):
     mealid = models.CharField(max_length=50)
     title = models.CharField(max_length=200)
     category = models.JSONField()  # <-- store one or many categories
-    area = models.CharField(max_length=200, blank=True, null=True)
+    area = models.CharField(max_length=200, blank=True, null=True, db_index=True)
+    # Normalized copy of `category` for indexed filtering (api/facets.py)
+    categories = models.ManyToManyField(
+        'Category', through='MealCategory', related_name='meals', blank=True)
     instructions = models.TextField(blank=True, null=True)
     ingredients = models.JSONField()
     image = models.URLField(blank=True, null=True)
@@ -98,6 +106,47 @@ class Meal(models.Model):
         return self.title
 
 
+class Category(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+class MealCategory(models.Model):
+    meal = models.ForeignKey(
+        'Meal', on_delete=models.CASCADE, related_name='category_links')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+
+    class Meta:
+        unique_together = ('meal', 'category')
+        indexes = [
+            models.Index(fields=['category', 'meal']),
+        ]
+
+    def __str__(self):
+        return f"{self.meal_id} -> {self.category_id}"
+
+
+FACET_CHOICES = [
+    ('category', 'Category'),
+    ('area', 'Area'),
+]
+
+
+class FacetCount(models.Model):
+    """Number of visible (system or public) meals per category / area"""
+    facet = models.CharField(max_length=10, choices=FACET_CHOICES)
+    value = models.CharField(max_length=200)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('facet', 'value')
+
+    def __str__(self):
+        return f"{self.facet}={self.value} ({self.count})"
+
+
 UNIT_CHOICES = [
     ('mg', 'milligram'),
     ('g', 'gram'),
@@ -118,6 +167,29 @@ UNIT_CHOICES = [
 ]
 
 
+class MealIngredient(models.Model):
+    """One parsed line of Meal.ingredients (filled by api/ingredients.py)"""
+    meal = models.ForeignKey(
+        'Meal', on_delete=models.CASCADE, related_name='ingredient_items')
+    position = models.PositiveSmallIntegerField()
+    quantity = models.DecimalField(
+        max_digits=10, decimal_places=3, null=True, blank=True)
+    unit = models.CharField(max_length=10, choices=UNIT_CHOICES, blank=True)
+    # Canonical name, e.g. "Chicken Breasts, diced" -> "chicken breast"
+    name = models.CharField(max_length=255)
+    original_text = models.TextField()
+
+    class Meta:
+        ordering = ['meal', 'position']
+        indexes = [
+            models.Index(fields=['meal', 'position']),
+            models.Index(fields=['name']),
+        ]
+
+    def __str__(self):
+        return self.original_text
+
+
 class GroceryList(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -167,3 +239,137 @@ class RecipeView(models.Model):
 
     def __str__(self):
         return f"{self.user.email} viewed {self.mealid} at {self.viewed_at}"
+
+
+class ChatAnswer(models.Model):
+    """Cached chatbot answer for a normalized single-turn question"""
+    question = models.TextField()
+    normalized_question = models.CharField(max_length=500, unique=True)
+    answer = models.TextField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-last_used_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.question[:50]} ({self.hits} hits)"
+
+
+class SimilarMeal(models.Model):
+    """Precomputed nearest neighbours of a meal (see api/similarity.py)"""
+    meal = models.ForeignKey(
+        'Meal', on_delete=models.CASCADE, related_name='similar_entries')
+    similar = models.ForeignKey(
+        'Meal', on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+
+    class Meta:
+        unique_together = ('meal', 'similar')
+        indexes = [
+            models.Index(fields=['meal', '-score']),
+        ]
+
+    def __str__(self):
+        return f"{self.meal_id} ~ {self.similar_id} ({self.score:.3f})"
+
+
+class Recommendation(models.Model):
+    """Precomputed home feed entry; rows with user=None are the popular fallback"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        related_name='recommendations', null=True, blank=True)
+    meal = models.ForeignKey(
+        'Meal', on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    generated_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-score']),
+            models.Index(fields=['generated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id or 'popular'} -> {self.meal_id} ({self.score:.3f})"
+
+
+class MealNutrition(models.Model):
+    """Cached local nutrition estimate for a meal (see api/nutrition.py)"""
+    meal = models.OneToOneField(
+        'Meal', on_delete=models.CASCADE, related_name='nutrition')
+    # Hash of the ingredient list + reference table; stale when it differs
+    fingerprint = models.CharField(max_length=40)
+    calories = models.FloatField()
+    protein = models.FloatField()
+    fat = models.FloatField()
+    carbs = models.FloatField()
+    fiber = models.FloatField()
+    breakdown = models.JSONField(default=dict)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.meal_id}: {self.calories:.0f} kcal"
+
+
+class MealTrigram(models.Model):
+    """Title trigram side table for typo-tolerant search (api/trigram_search.py)"""
+    meal = models.ForeignKey(
+        'Meal', on_delete=models.CASCADE, related_name='+')
+    trigram = models.CharField(max_length=3)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['trigram', 'meal']),
+        ]
+
+    def __str__(self):
+        return f"{self.meal_id}: '{self.trigram}'"
+
+
+JOB_KIND_CHOICES = [
+    ('recipe_detail', 'AI recipe generation'),
+    ('grocery_list', 'AI grocery list'),
+    ('profile_thumbnails', 'Profile picture thumbnails'),
+]
+
+JOB_STATUS_CHOICES = [
+    ('queued', 'Queued'),
+    ('running', 'Running'),
+    ('succeeded', 'Succeeded'),
+    ('failed', 'Failed'),
+]
+
+
+class Job(models.Model):
+    """Background AI request, run by `manage.py run_job_workers` (api/jobs.py)"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=20, choices=JOB_KIND_CHOICES)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(
+        max_length=10, choices=JOB_STATUS_CHOICES, default='queued')
+    # Response body and HTTP status the synchronous endpoint would have returned
+    result = models.JSONField(null=True, blank=True)
+    result_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    lease_until = models.DateTimeField(null=True, blank=True)
+    leased_by = models.CharField(max_length=100, blank=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        related_name='jobs', null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.id} ({self.status})"
@@ -3,10 +3,16 @@ from .models import User, Profile, Meal, GroceryList, Favorite, RecipeView
 
 
 class ProfileSerializer(serializers.ModelSerializer):
+    picture_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Profile
-        fields = ['bio', 'profile_picture', 'dietary_preference']
+        fields = ['bio', 'profile_picture', 'picture_variants', 'dietary_preference']
+
+    def get_picture_variants(self, obj):
+        """Thumbnail URLs by size and format ({"64": {"webp": ..., "jpg": ...}})"""
+        from api import thumbnails
+        return thumbnails.variant_urls(obj, self.context.get('request'))
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -81,12 +87,24 @@ class UserDetailSerializer(serializers.ModelSerializer):
         return instance
 
 
+def meal_thumbnail(meal):
+    """Resized copy of meal.image served by our image proxy (api/image_proxy.py)"""
+    from api import image_proxy
+    return image_proxy.proxy_url(meal)
+
+
+# Default for list endpoints (api/fieldsets.py): a recipe card, no instructions/ingredients
+MEAL_SUMMARY_FIELDS = ['id', 'mealid', 'title', 'category', 'area', 'image', 'thumbnail',
+                       'is_user_added', 'user_name', 'is_public', 'created_at']
+
+
 class MealSerializer(serializers.ModelSerializer):
     # JSONFields automatically handled by DRF, but we can make them more readable
     ingredients = serializers.JSONField()
     category = serializers.JSONField()  # in case you made category JSONField
     user_name = serializers.SerializerMethodField()
     is_public = serializers.BooleanField(read_only=True)
+    thumbnail = serializers.SerializerMethodField()
 
     class Meta:
         model = Meal
@@ -99,6 +117,7 @@ class MealSerializer(serializers.ModelSerializer):
             'instructions',
             'ingredients',
             'image',
+            'thumbnail',
             'youtube',
             'source',
             'is_user_added',
@@ -109,12 +128,37 @@ class MealSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at']
 
+    def get_fields(self):
+        """Only the fields in context["meal_fields"] (sparse fieldsets), when given"""
+        fields = super().get_fields()
+        selected = self.context.get('meal_fields')
+        if selected is not None:
+            fields = {name: field for name, field in fields.items() if name in selected}
+        return fields
+
     def get_user_name(self, obj):
         """Return user's name if recipe is public and has a user"""
         if obj.is_public and obj.user:
             return obj.user.name or obj.user.email
         return None
 
+    def get_thumbnail(self, obj):
+        return meal_thumbnail(obj)
+
+
+class MealCompactSerializer(serializers.ModelSerializer):
+    """Just what a recipe card needs"""
+    category = serializers.JSONField()
+    thumbnail = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Meal
+        fields = ['id', 'mealid', 'title', 'category', 'area', 'image', 'thumbnail',
+                  'is_user_added', 'is_public']
+
+    def get_thumbnail(self, obj):
+        return meal_thumbnail(obj)
+
 
 class GroceryListSerializer(serializers.ModelSerializer):
     class Meta: